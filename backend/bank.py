@@ -1,42 +1,137 @@
 import hashlib
-from datetime import datetime
-from pymongo import MongoClient
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from group_commit import GroupCommitter
+from rsa_engine import RSADecryptor
+from rsa_keygen import bank_key
+from storage import MongoStorage
+
+SAVE_FAILED = "Error: Transaction could not be saved"
 
 class Bank:
-    def __init__(self, mongo_uri="mongodb://localhost:27017/", db_name="bank_db"):
-        self.client = MongoClient(mongo_uri)
-        self.db = self.client[db_name]
-        self.blockchain = self.db["blockchain"]
+    def __init__(self, mongo_uri="mongodb://localhost:27017/", db_name="bank_db", storage=None,
+                 group_commit=False, commit_batch_size=64, commit_window=0.005, lock_stripes=64, rsa_key=None):
+        # storage: a MongoStorage or MemoryStorage; defaults to MongoDB at mongo_uri
+        # rsa_key: a key dict from rsa_keygen; defaults to BANK_RSA_KEY or the demo key (n=32639)
+        self.storage = storage if storage is not None else MongoStorage(mongo_uri, db_name)
         self.users = {}
         self.merchants = {}
+        self.user_index = {}  # mmid -> ifsc
+        self.merchant_index = {}  # mid -> ifsc
         self.ifsc_codes = [
             "SBIN0001234", "SBIN0005678", "SBIN0009101",
             "HDFC0002345", "HDFC0006789", "HDFC0001122",
             "ICIC0003456", "ICIC0007890", "ICIC0002233"
         ]
+        key = rsa_key or bank_key()
+        self.decryptor = RSADecryptor(p=key['p'], q=key['q'], d=key['d'], e=key['e'])
+        self.chain_lock = threading.Lock()
+        self.account_locks = [threading.Lock() for _ in range(lock_stripes)]
+        self.chain_tip = "0" * 64
+        self.chain_time = ""
         self.load_from_db()
-
-    def get_collections(self, ifsc):
-        return (
-            self.db[f"users_{ifsc}"],
-            self.db[f"merchants_{ifsc}"]
-        )
+        self.load_chain_tip()
+        self.committer = None
+        if group_commit:
+            self.committer = GroupCommitter(self.storage, commit_batch_size, commit_window, self.commit_failed)
 
     def load_from_db(self):
         self.users.clear()
         self.merchants.clear()
+        self.user_index.clear()
+        self.merchant_index.clear()
         for ifsc in self.ifsc_codes:
-            users_coll, merchants_coll = self.get_collections(ifsc)
-            for user in users_coll.find():
-                mmid = user.pop("_id")
+            for mmid, user in self.storage.load_accounts("users", ifsc):
                 self.users[(ifsc, mmid)] = user
-            for merchant in merchants_coll.find():
-                mid = merchant.pop("_id")
+                self.user_index.setdefault(mmid, ifsc)
+            for mid, merchant in self.storage.load_accounts("merchants", ifsc):
                 self.merchants[(ifsc, mid)] = merchant
+                self.merchant_index.setdefault(mid, ifsc)
+
+    def load_chain_tip(self):
+        # Seed the tip once from storage; appends advance it in memory
+        tip = self.storage.latest_block()
+        if tip is not None:
+            self.chain_tip = tip["_id"]
+            self.chain_time = tip["Timestamp"]
+
+    def link_block(self, block):
+        timestamp = datetime.now().isoformat()
+        if timestamp <= self.chain_time:
+            # Timestamps strictly increase so (Timestamp, _id) pages through blocks in chain order
+            timestamp = (datetime.fromisoformat(self.chain_time) + timedelta(microseconds=1)).isoformat()
+        block["Previous Block Hash"] = self.chain_tip
+        block["Timestamp"] = timestamp
+        self.chain_tip = block["_id"]
+        self.chain_time = timestamp
+
+    def append_blocks(self, blocks):
+        with self.chain_lock:
+            tip, tip_time = self.chain_tip, self.chain_time
+            for block in blocks:
+                self.link_block(block)
+            try:
+                self.storage.insert_blocks(blocks)
+            except Exception:
+                # The blocks were never written, so the next block must not link to them
+                self.chain_tip, self.chain_time = tip, tip_time
+                raise
+        return blocks
 
-    def save_to_db(self, collection, key, data):
-        print(f"Saving to {collection.name}: {key}")
-        collection.update_one({"_id": key}, {"$set": data}, upsert=True)
+    def commit_failed(self, batch, error):
+        # Called by the group committer when a flush fails. Commits queued behind the batch
+        # link to its blocks, so they fail too; the tip goes back to the last written block.
+        # Each waiter reverts its own balances (see revert_transfers).
+        with self.chain_lock:
+            self.committer.drain(error)
+            for commit in batch:
+                if commit.blocks:
+                    self.chain_tip = commit.blocks[0]["Previous Block Hash"]
+                    break
+
+    def persist_transaction(self, updates, blocks, timings=None):
+        # updates: [(kind, ifsc, key, data)] written alongside the blocks
+        # Returns the pending group commit, if any, for the caller to wait on
+        start = time.perf_counter()
+        if self.committer is None:
+            self.save_many_to_db(updates)
+            saved = time.perf_counter()
+            self.append_blocks(blocks)
+            if timings is not None:
+                timings["persist"] = saved - start
+                timings["chain"] = time.perf_counter() - saved
+            return None
+        with self.chain_lock:
+            # Linking and queueing under one lock keeps batches in chain order
+            for block in blocks:
+                self.link_block(block)
+            commit = self.committer.submit(updates, blocks)
+        if timings is not None:
+            timings["chain"] = time.perf_counter() - start  # the block insert itself is part of the commit
+        return commit
+
+    @contextmanager
+    def lock_accounts(self, *keys):
+        # Stripes are always taken in ascending order so two transfers cannot deadlock
+        stripes = sorted({hash(key) % len(self.account_locks) for key in keys})
+        for stripe in stripes:
+            self.account_locks[stripe].acquire()
+        try:
+            yield
+        finally:
+            for stripe in reversed(stripes):
+                self.account_locks[stripe].release()
+
+    def save_to_db(self, kind, ifsc, key, data):
+        print(f"Saving to {kind}_{ifsc}: {key}")
+        self.storage.save_account(kind, ifsc, key, data)
+
+    def save_many_to_db(self, updates):
+        for kind, ifsc, key, _ in updates:
+            print(f"Saving to {kind}_{ifsc}: {key}")
+        self.storage.save_accounts(updates)
 
     def generate_mid(self, name, password):
         current_time = datetime.now().isoformat()
@@ -57,16 +152,16 @@ class Bank:
         return ifsc in self.ifsc_codes
 
     def find_user(self, mmid):
-        for ifsc in self.ifsc_codes:
-            if (ifsc, mmid) in self.users:
-                return ifsc, self.users[(ifsc, mmid)]
-        return None, None
+        ifsc = self.user_index.get(mmid)
+        if ifsc is None:
+            return None, None
+        return ifsc, self.users[(ifsc, mmid)]
 
     def find_merchant(self, mid):
-        for ifsc in self.ifsc_codes:
-            if (ifsc, mid) in self.merchants:
-                return ifsc, self.merchants[(ifsc, mid)]
-        return None, None
+        ifsc = self.merchant_index.get(mid)
+        if ifsc is None:
+            return None, None
+        return ifsc, self.merchants[(ifsc, mid)]
 
     def register_user(self, name, ifsc, password, pin, mobile_number, initial_balance=0):
         if not self.valid_ifsc(ifsc):
@@ -87,8 +182,8 @@ class Bank:
             "Pin": pin
         }
         self.users[(ifsc, mmid)] = user_data
-        users_coll, _ = self.get_collections(ifsc)
-        self.save_to_db(users_coll, mmid, user_data)
+        self.user_index.setdefault(mmid, ifsc)
+        self.save_to_db("users", ifsc, mmid, user_data)
         return mmid, uid
 
     def register_merchant(self, name, ifsc, password, initial_balance=0):
@@ -108,8 +203,8 @@ class Bank:
             "Balance": initial_balance
         }
         self.merchants[(ifsc, mid)] = merchant_data
-        _, merchants_coll = self.get_collections(ifsc)
-        self.save_to_db(merchants_coll, mid, merchant_data)
+        self.merchant_index.setdefault(mid, ifsc)
+        self.save_to_db("merchants", ifsc, mid, merchant_data)
         return mid
 
     def verify_user(self, mmid, pin):
@@ -120,68 +215,190 @@ class Bank:
         ifsc, _ = self.find_merchant(mid)
         return ifsc is not None
 
-    def decrypt(self, cipher, priv_key):
-        d, n = priv_key
+    def decrypt(self, cipher, priv_key=None):
         try:
+            if priv_key is None or priv_key == self.decryptor.private_key:
+                return self.decryptor.decrypt(cipher)
+            d, n = priv_key
             return ''.join([chr(pow(char, d, n)) for char in cipher])
         except Exception as e:
             print(f"Decryption error: {e}")
             return None
 
-    def process_transaction(self, encrypted_sender_mmid, encrypted_sender_pin, receiver_mid, amount):
-        priv_key = (6305, 32639)  # p=127,q=257,n=32639
-        sender_mmid = self.decrypt(encrypted_sender_mmid, priv_key)
-        sender_pin = self.decrypt(encrypted_sender_pin, priv_key)
-        
+    def validate_transaction(self, sender_mmid, sender_pin, receiver_mid, amount):
+        # Returns (error, None) or (None, transfer) with transfer = (sender_ifsc, sender_mmid, receiver_ifsc, receiver_mid, amount)
         if sender_mmid is None or sender_pin is None:
-            return "Decryption failed"
-        
+            return "Decryption failed", None
+
         sender_ifsc, sender_data = self.find_user(sender_mmid)
         if sender_ifsc is None:
-            return "Invalid sender MMID"
-        
-        is_valid_user, _ = self.verify_user(sender_mmid, sender_pin)
-        if not is_valid_user:
-            return "Incorrect Pin"
-            
-        receiver_ifsc, receiver_data = self.find_merchant(receiver_mid)
+            return "Invalid sender MMID", None
+
+        if sender_data["Pin"] != sender_pin:
+            return "Incorrect Pin", None
+
+        receiver_ifsc, _ = self.find_merchant(receiver_mid)
         if receiver_ifsc is None:
-            return "Merchant not found"
-            
+            return "Merchant not found", None
+
         try:
             amount = int(amount)
         except ValueError:
-            return "Invalid amount"
-            
-        sender_bal = sender_data["Balance"]
-        if sender_bal < amount:
-            return "Error: Insufficient balance"
-            
-        receiver_bal = receiver_data["Balance"]
-        self.merchants[(receiver_ifsc, receiver_mid)]["Balance"] = receiver_bal + amount
-        self.users[(sender_ifsc, sender_mmid)]["Balance"] = sender_bal - amount
-
-        sender_coll, _ = self.get_collections(sender_ifsc)
-        _, receiver_coll = self.get_collections(receiver_ifsc)
-        self.save_to_db(sender_coll, sender_mmid, self.users[(sender_ifsc, sender_mmid)])
-        self.save_to_db(receiver_coll, receiver_mid, self.merchants[(receiver_ifsc, receiver_mid)])
-
-        tx_id = hashlib.sha256(f"{sender_mmid}{receiver_mid}{datetime.now()}{amount}".encode()).hexdigest()
+            return "Invalid amount", None
+        return None, (sender_ifsc, sender_mmid, receiver_ifsc, receiver_mid, amount)
+
+    def transfer_accounts(self, transfer):
+        sender_ifsc, sender_mmid, receiver_ifsc, receiver_mid, _ = transfer
+        return ("user", sender_ifsc, sender_mmid), ("merchant", receiver_ifsc, receiver_mid)
+
+    def transfer_updates(self, transfers):
+        updates = {}
+        for sender_ifsc, sender_mmid, receiver_ifsc, receiver_mid, _ in transfers:
+            updates[("user", sender_ifsc, sender_mmid)] = ("users", sender_ifsc, sender_mmid, self.users[(sender_ifsc, sender_mmid)])
+            updates[("merchant", receiver_ifsc, receiver_mid)] = ("merchants", receiver_ifsc, receiver_mid, self.merchants[(receiver_ifsc, receiver_mid)])
+        return list(updates.values())
+
+    def revert_transfers(self, transfers):
+        # Undoes apply_transfer after a failed write; caller must hold the account locks.
+        # Balances are saved before blocks, so a failed block insert can leave the new
+        # balances stored: the reverted ones are written back, through the committer in
+        # group-commit mode so they land after any batch already holding these accounts.
+        # If that write fails too, storage keeps balances no block explains until the
+        # accounts are next saved.
+        for sender_ifsc, sender_mmid, receiver_ifsc, receiver_mid, amount in transfers:
+            self.merchants[(receiver_ifsc, receiver_mid)]["Balance"] -= amount
+            self.users[(sender_ifsc, sender_mmid)]["Balance"] += amount
+        updates = self.transfer_updates(transfers)
+        try:
+            if self.committer is None:
+                self.storage.save_accounts(updates)
+            else:
+                self.committer.submit(updates).wait()
+        except Exception as e:
+            print(f"Bank: Reverted balances not saved: {e}")
+
+    def apply_transfer(self, transfer, salt=""):
+        # Caller must hold the account locks for this transfer
+        sender_ifsc, sender_mmid, receiver_ifsc, receiver_mid, amount = transfer
+        sender_data = self.users[(sender_ifsc, sender_mmid)]
+        receiver_data = self.merchants[(receiver_ifsc, receiver_mid)]
+        if sender_data["Balance"] < amount:
+            return "Error: Insufficient balance", None
+
+        receiver_data["Balance"] += amount
+        sender_data["Balance"] -= amount
+
+        tx_id = hashlib.sha256(f"{sender_mmid}{receiver_mid}{datetime.now()}{amount}{salt}".encode()).hexdigest()
         block = {
             "_id": tx_id,
-            "Previous Block Hash": self.blockchain.find_one(sort=[("Timestamp", -1)])["_id"] if self.blockchain.count_documents({}) > 0 else "0" * 64,
-            "Timestamp": datetime.now().isoformat(),
             "Sender MMID": sender_mmid,
             "Sender IFSC": sender_ifsc,
             "Receiver MID": receiver_mid,
             "Receiver IFSC": receiver_ifsc,
             "Amount": amount
         }
-        self.blockchain.insert_one(block)
-        print(f"Bank: Transaction logged in Blockchain - {tx_id}")
+        return None, block
+
+    def process_transaction(self, encrypted_sender_mmid, encrypted_sender_pin, receiver_mid, amount, timings=None):
+        # timings, if given, receives seconds spent per stage: decrypt, validate, persist, chain
+        start = time.perf_counter()
+        sender_mmid = self.decrypt(encrypted_sender_mmid)
+        sender_pin = self.decrypt(encrypted_sender_pin)
+        decrypted = time.perf_counter()
+        if timings is not None:
+            timings["decrypt"] = decrypted - start
+
+        error, transfer = self.validate_transaction(sender_mmid, sender_pin, receiver_mid, amount)
+        if error is not None:
+            return error
+
+        accounts = self.transfer_accounts(transfer)
+        with self.lock_accounts(*accounts):
+            error, block = self.apply_transfer(transfer)
+            if error is not None:
+                return error
+            if timings is not None:
+                timings["validate"] = time.perf_counter() - decrypted
+            try:
+                commit = self.persist_transaction(self.transfer_updates([transfer]), [block], timings)
+            except Exception as e:
+                print(f"Bank: Transaction not saved: {e}")
+                self.revert_transfers([transfer])
+                return SAVE_FAILED
+        if commit is not None:
+            waited = time.perf_counter()
+            try:
+                commit.wait()
+            except Exception:
+                with self.lock_accounts(*accounts):
+                    self.revert_transfers([transfer])
+                return SAVE_FAILED
+            if timings is not None:
+                timings["persist"] = time.perf_counter() - waited
+        print(f"Bank: Transaction logged in Blockchain - {block['_id']}")
 
         return "Transaction successful"
 
+    def process_transactions(self, batch):
+        """
+        Settle a list of payments in one call. Each item is a dict with the same
+        fields as a 'transaction' request. Returns one result string per item,
+        in order; successful payments share one round of database writes.
+        """
+        plaintexts = {}  # textbook RSA is deterministic, so repeated ciphertexts decrypt once
+
+        def decrypt_once(cipher):
+            key = tuple(cipher)
+            if key not in plaintexts:
+                plaintexts[key] = self.decrypt(cipher)
+            return plaintexts[key]
+
+        results = [None] * len(batch)
+        pending = []
+        for i, item in enumerate(batch):
+            try:
+                error, transfer = self.validate_transaction(
+                    decrypt_once(item['encrypted_sender_mmid']), decrypt_once(item['encrypted_sender_pin']),
+                    item['receiver_mid'], item['amount']
+                )
+            except (KeyError, TypeError):
+                error = "Malformed transaction"
+            if error is not None:
+                results[i] = error
+            else:
+                pending.append((i, transfer))
+
+        applied = []
+        blocks = []
+        commit = None
+        keys = [key for _, transfer in pending for key in self.transfer_accounts(transfer)]
+        with self.lock_accounts(*keys):
+            for i, transfer in pending:
+                error, block = self.apply_transfer(transfer, salt=i)
+                if error is not None:
+                    results[i] = error
+                    continue
+                results[i] = "Transaction successful"
+                applied.append(transfer)
+                blocks.append(block)
+            if blocks:
+                try:
+                    commit = self.persist_transaction(self.transfer_updates(applied), blocks)
+                except Exception as e:
+                    print(f"Bank: Batch not saved: {e}")
+                    self.revert_transfers(applied)
+                    return [SAVE_FAILED if result == "Transaction successful" else result for result in results]
+        if commit is not None:
+            try:
+                commit.wait()
+            except Exception:
+                with self.lock_accounts(*keys):
+                    self.revert_transfers(applied)
+                return [SAVE_FAILED if result == "Transaction successful" else result for result in results]
+        print(f"Bank: {len(blocks)} of {len(batch)} batched transactions logged in Blockchain")
+
+        return results
+
     def get_balance_user(self, mmid, pin):
         is_valid, ifsc = self.verify_user(mmid, pin)
         if is_valid:
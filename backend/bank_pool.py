@@ -0,0 +1,137 @@
+import select
+import socket
+import threading
+import time
+from framing import ConnectionClosed, negotiate, send_request
+
+class PoolExhausted(ConnectionError):
+    pass
+
+class BankConnectionPool:
+    """
+    Keeps up to size framed connections to the bank open so callers borrow a
+    warm socket instead of paying for TCP setup and codec negotiation on every
+    request. Connections are opened lazily. On borrow, an idle connection is
+    checked without a round trip (a readable socket is closed or out of sync)
+    and with a 'ping' once it has been idle for ping_after seconds. Broken
+    connections are dropped and reopened, backing off exponentially from
+    backoff up to max_backoff seconds while the bank is unreachable.
+    """
+
+    def __init__(self, address, size=8, ping_after=30.0, connect_timeout=5.0, backoff=0.1, max_backoff=5.0,
+                 connect_attempts=5):
+        self.address = address
+        self.size = size
+        self.ping_after = ping_after
+        self.connect_timeout = connect_timeout
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.connect_attempts = connect_attempts
+        self.idle = []  # [(socket, time it was returned)], most recently used last
+        self.open_count = 0
+        self.closed = False
+        self.cond = threading.Condition()
+        self.stats = {'connects': 0, 'reused': 0, 'discarded': 0, 'failed_connects': 0}
+
+    def _connect(self):
+        delay = self.backoff
+        for attempt in range(self.connect_attempts):
+            try:
+                sock = socket.create_connection(self.address, timeout=self.connect_timeout)
+                sock.settimeout(None)
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                negotiate(sock)
+                with self.cond:
+                    self.stats['connects'] += 1
+                return sock
+            except (OSError, ValueError, ConnectionClosed) as e:
+                with self.cond:
+                    self.stats['failed_connects'] += 1
+                if attempt + 1 == self.connect_attempts:
+                    raise ConnectionError(f"Could not connect to bank at {self.address}: {e}")
+                time.sleep(delay)
+                delay = min(delay * 2, self.max_backoff)
+
+    def _healthy(self, sock, idle_since):
+        try:
+            readable, _, _ = select.select([sock], [], [], 0)
+            if readable:
+                return False  # EOF, or a reply nobody is waiting for
+            if time.monotonic() - idle_since >= self.ping_after:
+                return send_request(sock, {'type': 'ping'}).get('status') == 'success'
+            return True
+        except (OSError, ValueError, ConnectionClosed):
+            return False
+
+    def _discard(self, sock):
+        try:
+            sock.close()
+        except OSError:
+            pass
+        with self.cond:
+            self.open_count -= 1
+            self.stats['discarded'] += 1
+            self.cond.notify()
+
+    def acquire(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self.cond:
+                while not self.idle and self.open_count >= self.size:
+                    if self.closed:
+                        raise PoolExhausted("Bank connection pool is closed")
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise PoolExhausted(f"No bank connection free after {timeout}s")
+                    self.cond.wait(remaining)
+                if self.closed:
+                    raise PoolExhausted("Bank connection pool is closed")
+                if self.idle:
+                    sock, idle_since = self.idle.pop()
+                else:
+                    sock = None
+                    self.open_count += 1  # reserve the slot before connecting outside the lock
+            if sock is None:
+                try:
+                    return self._connect()
+                except ConnectionError:
+                    with self.cond:
+                        self.open_count -= 1
+                        self.cond.notify()
+                    raise
+            if self._healthy(sock, idle_since):
+                with self.cond:
+                    self.stats['reused'] += 1
+                return sock
+            self._discard(sock)
+
+    def release(self, sock, broken=False):
+        if broken:
+            self._discard(sock)
+            return
+        with self.cond:
+            if not self.closed:
+                self.idle.append((sock, time.monotonic()))
+                self.cond.notify()
+                return
+        self._discard(sock)
+
+    def request(self, request, timeout=None):
+        # A connection that fails mid-request is dropped; the error goes to the caller,
+        # since the bank may already have applied the request
+        sock = self.acquire(timeout)
+        try:
+            response = send_request(sock, request)
+        except (OSError, ValueError, ConnectionClosed):
+            self.release(sock, broken=True)
+            raise
+        self.release(sock)
+        return response
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            idle, self.idle = self.idle, []
+            self.cond.notify_all()
+        for sock, _ in idle:
+            self._discard(sock)
@@ -1,65 +1,130 @@
+import asyncio
 import socket
 import threading
-import json
+import os
+from concurrent.futures import ThreadPoolExecutor
 from bank import Bank
+from codec import JSON
+from framing import ConnectionClosed, hello_response, read_frame, recv_frame, send_frame, set_codec, write_frame
+from storage import MemoryStorage
+from vmid_verifier import VmidVerifier
+from wal_storage import WalStorage
 
-bank = Bank()
+def make_bank():
+    # BANK_STORAGE=memory runs the bank without MongoDB, e.g. for load tests;
+    # BANK_STORAGE=wal keeps it durable in BANK_DATA_DIR without a database server
+    storage = os.environ.get("BANK_STORAGE", "mongo")
+    if storage == "memory":
+        return Bank(storage=MemoryStorage())
+    if storage == "wal":
+        return Bank(storage=WalStorage(os.environ.get("BANK_DATA_DIR", "bank_data")), group_commit=True)
+    return Bank()
+
+bank = make_bank()
+BANK_HOST = os.environ.get("BANK_HOST", "172.16.122.54")  # Bank's IP
+BANK_PORT = int(os.environ.get("BANK_PORT", 5000))
+# Lets a transaction name its merchant by a fresh VMID instead of the MID, so any
+# machine can take the payment without knowing when the QR code was generated
+vmid_verifier = VmidVerifier(list(bank.merchant_index), window=int(os.environ.get("VMID_WINDOW", 120)),
+                             skew=int(os.environ.get("VMID_SKEW", 5)))
+
+def handle_request(request):
+    response = {'status': 'error', 'message': f"Unknown request type {request.get('type')}"}
+
+    if request['type'] == 'ping':
+        response = {'status': 'success'}
+
+    elif request['type'] == 'register_user':
+        mmid, uid = bank.register_user(
+            request['name'], request['ifsc'], request['password'],
+            request['pin'], request['mobile'], request.get('balance', 0)
+        )
+        response = {'status': 'success', 'mmid': mmid, 'uid': uid} if mmid not in ["INVALID IFSC", "MMID already exists", "Invalid balance"] else {'status': 'error', 'message': mmid}
+        if response['status'] == 'success':
+            print(f"Successfully registered a user [{request['name']},{request['ifsc']},{request['password']},{request['pin']},{request['mobile']}]")
+
+    elif request['type'] == 'register_merchant':
+        mid = bank.register_merchant(
+            request['name'], request['ifsc'], request['password'], request.get('balance', 0)
+        )
+        response = {'status': 'success', 'mid': mid} if mid not in ["INVALID IFSC", "MID already exists", "Invalid balance"] else {'status': 'error', 'message': mid}
+        if response['status'] == 'success':
+            vmid_verifier.add_merchant(mid)
+            print(f"Successfully registered a merchant [{request['name']},{request['ifsc']},{request['password']}]")
+
+    elif request['type'] == 'transaction':
+        receiver_mid = request.get('receiver_mid')
+        if receiver_mid is None:
+            receiver_mid, _ = vmid_verifier.verify(request['encrypted_receiver_mid'])
+        print(f"MMID: {request['encrypted_sender_mmid']}\nPin: {request['encrypted_sender_pin']}\nReceiver MID: {receiver_mid}")
+        timings = {} if request.get('trace') else None
+        if receiver_mid is None:
+            result = "Invalid or expired QR code"
+        else:
+            result = bank.process_transaction(
+                request['encrypted_sender_mmid'], request['encrypted_sender_pin'],
+                receiver_mid, request['amount'], timings
+            )
+        response = {'status': 'success', 'message': result} if result == "Transaction successful" else {'status': 'error', 'message': result}
+        if timings is not None:
+            # Per-stage milliseconds for load tests that set 'trace'
+            response['timings'] = {stage: round(seconds * 1000, 3) for stage, seconds in timings.items()}
+
+    elif request['type'] == 'transaction_batch':
+        print(f"Batch of {len(request['transactions'])} transactions")
+        results = bank.process_transactions(request['transactions'])
+        response = {'status': 'success', 'results': [
+            {'status': 'success', 'message': result} if result == "Transaction successful" else {'status': 'error', 'message': result}
+            for result in results
+        ]}
+
+    elif request['type'] == 'get_balance_user':
+        result = bank.get_balance_user(request['mmid'], request['pin'])
+        response = {'status': 'success', 'balance': result} if "Current Balance" in result else {'status': 'error', 'message': result}
+    
+    elif request['type'] == 'get_balance_merchant':
+        result = bank.get_balance_merchant(request['mid'])
+        response = {'status': 'success', 'balance': result} if "Current Balance" in result else {'status': 'error', 'message': result}
+
+    return response
 
 def handle_client(client_socket, address):
     print(f"Connected to {address}")
     while True:
         try:
-            data = client_socket.recv(1024).decode('utf-8')
-            if not data:
+            request_id, request = recv_frame(client_socket)
+        except (OSError, ValueError) as e:
+            print(f"Error with {address}: {e}")
+            break
+        if request is None:
+            break
+        if request.get('type') == 'hello':
+            response, codec = hello_response(request)
+            try:
+                send_frame(client_socket, request_id, response)
+            except OSError as e:
+                print(f"Error with {address}: {e}")
                 break
-            request = json.loads(data)
-            response = {}
-
-            if request['type'] == 'register_user':
-                mmid, uid = bank.register_user(
-                    request['name'], request['ifsc'], request['password'],
-                    request['pin'], request['mobile'], request.get('balance', 0)
-                )
-                response = {'status': 'success', 'mmid': mmid, 'uid': uid} if mmid not in ["INVALID IFSC", "MMID already exists", "Invalid balance"] else {'status': 'error', 'message': mmid}
-                if response['status'] == 'success':
-                    print(f"Successfully registered a user [{request['name']},{request['ifsc']},{request['password']},{request['pin']},{request['mobile']}]")
-
-            elif request['type'] == 'register_merchant':
-                mid = bank.register_merchant(
-                    request['name'], request['ifsc'], request['password'], request.get('balance', 0)
-                )
-                response = {'status': 'success', 'mid': mid} if mid not in ["INVALID IFSC", "MID already exists", "Invalid balance"] else {'status': 'error', 'message': mid}
-                if response['status'] == 'success':
-                    print(f"Successfully registered a merchant [{request['name']},{request['ifsc']},{request['password']}]")
-
-            elif request['type'] == 'transaction':
-                print(f"MMID: {request['encrypted_sender_mmid']}\nPin: {request['encrypted_sender_pin']}\nReceiver MID: {request['receiver_mid']}")
-                result = bank.process_transaction(
-                    request['encrypted_sender_mmid'], request['encrypted_sender_pin'],
-                    request['receiver_mid'], request['amount']
-                )
-                response = {'status': 'success', 'message': result} if result == "Transaction successful" else {'status': 'error', 'message': result}
-
-            elif request['type'] == 'get_balance_user':
-                result = bank.get_balance_user(request['mmid'], request['pin'])
-                response = {'status': 'success', 'balance': result} if "Current Balance" in result else {'status': 'error', 'message': result}
-            
-            elif request['type'] == 'get_balance_merchant':
-                result = bank.get_balance_merchant(request['mid'])
-                response = {'status': 'success', 'balance': result} if "Current Balance" in result else {'status': 'error', 'message': result}
-
-            client_socket.send(json.dumps(response).encode('utf-8'))
+            set_codec(client_socket, codec)
+            continue
+        try:
+            response = handle_request(request)
         except Exception as e:
+            # Only this request fails; later pipelined requests on the connection still run
             print(f"Error with {address}: {e}")
             response = {'status': 'error', 'message': str(e)}
-            client_socket.send(json.dumps(response).encode('utf-8'))
+        try:
+            send_frame(client_socket, request_id, response)
+        except OSError as e:
+            print(f"Error with {address}: {e}")
             break
     client_socket.close()
 
-def start_bank_server():
+def start_bank_server(host=BANK_HOST, port=BANK_PORT, backlog=5):
     server = socket.socket()
-    server.bind(('172.16.122.54', 5000))  # Bank's IP
-    server.listen(5)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind((host, port))
+    server.listen(backlog)
     print("Bank server is running")
 
     while True:
@@ -67,5 +132,54 @@ def start_bank_server():
         thread = threading.Thread(target=handle_client, args=(client_socket, address))
         thread.start()
 
+async def handle_connection(reader, writer, executor):
+    address = writer.get_extra_info('peername')
+    loop = asyncio.get_running_loop()
+    codec = JSON
+    while True:
+        try:
+            request_id, request = await read_frame(reader, codec)
+        except (OSError, ValueError, ConnectionClosed) as e:
+            print(f"Error with {address}: {e}")
+            break
+        if request is None:
+            break
+        if request.get('type') == 'hello':
+            response, next_codec = hello_response(request)
+            write_frame(writer, request_id, response, codec)
+            codec = next_codec
+            continue
+        try:
+            # Decryption and the bank's locks run on the executor, never on the event loop
+            response = await loop.run_in_executor(executor, handle_request, request)
+        except Exception as e:
+            print(f"Error with {address}: {e}")
+            response = {'status': 'error', 'message': str(e)}
+        try:
+            write_frame(writer, request_id, response, codec)
+            await writer.drain()
+        except OSError as e:
+            print(f"Error with {address}: {e}")
+            break
+    writer.close()
+
+async def serve_async(host, port, backlog, workers):
+    executor = ThreadPoolExecutor(max_workers=workers)
+    server = await asyncio.start_server(
+        lambda reader, writer: handle_connection(reader, writer, executor),
+        host, port, backlog=backlog, reuse_address=True
+    )
+    print("Bank server is running (asyncio)")
+    async with server:
+        await server.serve_forever()
+
+def start_async_bank_server(host=BANK_HOST, port=BANK_PORT, backlog=1024, workers=None):
+    # One event loop holds every connection; only requests in progress use a worker thread
+    asyncio.run(serve_async(host, port, backlog, workers))
+
 if __name__ == "__main__":
-    start_bank_server()
\ No newline at end of file
+    # BANK_SERVER=async serves all connections from one event loop; BANK_BACKLOG sets the accept backlog
+    if os.environ.get("BANK_SERVER") == "async":
+        start_async_bank_server(backlog=int(os.environ.get("BANK_BACKLOG", 1024)))
+    else:
+        start_bank_server(backlog=int(os.environ.get("BANK_BACKLOG", 5)))
\ No newline at end of file
@@ -0,0 +1,63 @@
+import os
+import socket
+import subprocess
+import sys
+import time
+from framing import recv_frame, send_frame
+
+HOST = "127.0.0.1"
+PORT = 5600
+CONNECTION_COUNTS = (100, 500, 1000)
+
+def start_server(mode):
+    env = dict(os.environ, BANK_STORAGE="memory", BANK_SERVER=mode, BANK_HOST=HOST, BANK_PORT=str(PORT),
+               BANK_BACKLOG="2048")
+    server = subprocess.Popen([sys.executable, "bank_socket.py"], env=env, cwd=os.path.dirname(os.path.abspath(__file__)),
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _ in range(100):
+        try:
+            socket.create_connection((HOST, PORT)).close()
+            return server
+        except OSError:
+            time.sleep(0.05)
+    server.kill()
+    raise RuntimeError("Bank server did not start")
+
+def server_stats(pid):
+    stats = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("VmRSS", "Threads"):
+                stats[key] = int(value.split()[0])
+    return stats
+
+def run(mode, count):
+    server = start_server(mode)
+    try:
+        start = time.perf_counter()
+        clients = [socket.create_connection((HOST, PORT)) for _ in range(count)]
+        connect_time = time.perf_counter() - start
+        # Every connection sends one request; all are in flight before any reply is read
+        start = time.perf_counter()
+        for i, client in enumerate(clients):
+            send_frame(client, i, {'type': 'get_balance_merchant', 'mid': 'benchmark'})
+        for client in clients:
+            recv_frame(client)
+        round_time = time.perf_counter() - start
+        stats = server_stats(server.pid)
+        for client in clients:
+            client.close()
+    finally:
+        server.kill()
+        server.wait()
+    return connect_time, round_time, stats
+
+if __name__ == "__main__":
+    print(f"{'server':>9} {'conns':>6} {'connect ms':>11} {'1 req/conn ms':>14} {'RSS MB':>7} {'threads':>8}")
+    for mode in ("threaded", "async"):
+        for count in CONNECTION_COUNTS:
+            connect_time, round_time, stats = run(mode, count)
+            print(f"{mode:>9} {count:>6} {connect_time * 1000:>11.1f} {round_time * 1000:>14.1f} "
+                  f"{stats['VmRSS'] / 1024:>7.1f} {stats['Threads']:>8}")
+            time.sleep(0.5)  # give the killed server time to release the port
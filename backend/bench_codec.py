@@ -0,0 +1,52 @@
+import random
+import time
+from codec import BINARY, JSON
+from rsa_engine import RSADecryptor
+
+ITERATIONS = 20000
+engine = RSADecryptor(p=127, q=257, d=6305)
+
+def encrypted(text):
+    return [pow(ord(c), engine.public_key[0], engine.public_key[1]) for c in text]
+
+def sample_messages():
+    transaction = {
+        'type': 'transaction',
+        'encrypted_sender_mmid': encrypted("9f86d081884c7d65"),
+        'encrypted_sender_pin': encrypted("1234"),
+        'receiver_mid': "60303ae22b998861",
+        'amount': 250
+    }
+    batch_items = [{key: value for key, value in transaction.items() if key != 'type'} for _ in range(100)]
+    return {
+        'transaction': transaction,
+        'transaction reply': {'status': 'success', 'message': 'Transaction successful'},
+        'balance request': {'type': 'get_balance_user', 'mmid': "9f86d081884c7d65", 'pin': "1234"},
+        'balance reply': {'status': 'success', 'balance': 'Current Balance: 4750'},
+        'register_user': {'type': 'register_user', 'name': 'Asha', 'ifsc': 'HDFC0001', 'password': 'secret',
+                          'pin': '1234', 'mobile': '9876543210', 'balance': '5000'},
+        'batch of 100': {'type': 'transaction_batch', 'transactions': batch_items},
+        'batch reply': {'status': 'success',
+                        'results': [{'status': random.choice(('success', 'error')), 'message': 'Transaction successful'}
+                                    for _ in range(100)]},
+    }
+
+def measure(codec, message, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        data = codec.encode(message)
+    encode_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(iterations):
+        decoded = codec.decode(data)
+    decode_time = time.perf_counter() - start
+    assert decoded == message, f"{codec.name} round trip changed the message"
+    return len(data), encode_time / iterations * 1e6, decode_time / iterations * 1e6
+
+if __name__ == "__main__":
+    print(f"{'message':>18} {'codec':>7} {'bytes':>7} {'encode us':>10} {'decode us':>10}")
+    for label, message in sample_messages().items():
+        iterations = ITERATIONS // 100 if 'batch' in label else ITERATIONS
+        for codec in (JSON, BINARY):
+            size, encode_us, decode_us = measure(codec, message, iterations)
+            print(f"{label:>18} {codec.name:>7} {size:>7} {encode_us:>10.2f} {decode_us:>10.2f}")
@@ -0,0 +1,66 @@
+import json
+import random
+import time
+from codebook_attack import CodebookCracker, captured_transactions
+from rsa_engine import RSADecryptor
+from rsa_keygen import bank_key
+
+KEY = bank_key()  # BANK_RSA_KEY, or the demo key; the private half checks the cracked output
+PUBLIC_KEY = (KEY['e'], KEY['n'])
+PRIVATE_KEY = (KEY['d'], KEY['n'])
+TRANSACTIONS = 200000
+# Transactions decrypted with the private key per character; a full-size exponent makes that slow
+SAMPLE = TRANSACTIONS // 20 if KEY['n'].bit_length() <= 64 else 20
+
+def make_capture(count):
+    # Captured transaction requests, as JSON lines; encrypted with a codebook since the key is fixed
+    encrypt = {char: pow(ord(char), KEY['e'], KEY['n']) for char in "0123456789abcdef"}
+    lines = []
+    for _ in range(count):
+        mmid = format(random.getrandbits(64), '016x')
+        pin = f"{random.randrange(10000):04d}"
+        lines.append(json.dumps({'type': 'transaction', 'encrypted_sender_mmid': [encrypt[char] for char in mmid],
+                                 'encrypted_sender_pin': [encrypt[char] for char in pin],
+                                 'encrypted_receiver_mid': format(random.getrandbits(64), '016x'), 'amount': 10}))
+    return lines
+
+def naive_decrypt(cipher, priv_key):
+    # Bank.decrypt before the engine: one full pow per character
+    d, n = priv_key
+    return ''.join([chr(pow(char, d, n)) for char in cipher])
+
+def rate(label, crack, transactions, expected):
+    start = time.perf_counter()
+    result = crack(transactions)
+    elapsed = time.perf_counter() - start
+    assert result == expected, label
+    print(f"{label:>28}: {len(transactions) / elapsed:>12,.0f} MMID+PIN recoveries/s")
+
+if __name__ == "__main__":
+    capture = make_capture(TRANSACTIONS)
+    start = time.perf_counter()
+    transactions = list(captured_transactions(capture, PUBLIC_KEY[1]))
+    print(f"parse {TRANSACTIONS} captured requests: {(time.perf_counter() - start) * 1000:.0f} ms")
+    sample = transactions[:SAMPLE]
+    expected = [(naive_decrypt(t['encrypted_sender_mmid'], PRIVATE_KEY), naive_decrypt(t['encrypted_sender_pin'], PRIVATE_KEY))
+                for t in sample]
+
+    codebook = RSADecryptor(p=KEY['p'], q=KEY['q'], d=KEY['d'])
+    start = time.perf_counter()
+    cracker = CodebookCracker(PUBLIC_KEY)
+    print(f"codebook from the public key: {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    def per_char(batch):
+        return [(naive_decrypt(t['encrypted_sender_mmid'], PRIVATE_KEY), naive_decrypt(t['encrypted_sender_pin'], PRIVATE_KEY))
+                for t in batch]
+
+    def dict_codebook(batch):
+        return [(codebook.decrypt(t['encrypted_sender_mmid']), codebook.decrypt(t['encrypted_sender_pin'])) for t in batch]
+
+    rate("private key, pow per char", per_char, sample, expected)
+    rate("private key, dict codebook", dict_codebook, sample, expected)
+    # Moduli of 2^63 and up are looked up in a dict, since NumPy cannot hold their ciphertexts
+    rate("public key, " + ("vectorized" if cracker.codebook is None else "dict"), cracker.crack, sample, expected)
+    start = time.perf_counter()
+    recovered = sum(1 for mmid, pin in cracker.stream(transactions))
+    print(f"{'streamed, all ' + str(TRANSACTIONS):>28}: {recovered / (time.perf_counter() - start):>12,.0f} MMID+PIN recoveries/s")
@@ -0,0 +1,127 @@
+import csv
+import os
+import random
+import sys
+import time
+import tracemalloc
+from math import gcd
+from bench_order import sample_modulus
+from factoring import pollard_p_minus_1, pollard_rho, trial_division
+from user_socket import shors_algorithm
+
+try:
+    import numpy as np
+    from statevector import StatevectorShor
+except ImportError:  # the statevector simulation needs numpy
+    np = None
+
+try:
+    from hershith import QuantumCryptography
+except ImportError:  # hershith needs sympy and cryptography
+    QuantumCryptography = None
+
+# Configured through the environment, like loadgen; FACTOR_CSV=- writes CSV to stdout instead of the table
+MODULUS_BITS = [int(bits) for bits in os.environ.get("FACTOR_BITS", "8,12,15,16,20,24,28,32,40,48,56,64").split(",")]
+TRIALS = int(os.environ.get("FACTOR_TRIALS", 5))  # distinct moduli per size
+TIME_BUDGET = float(os.environ.get("FACTOR_TIME_BUDGET", 0.25))  # a method is dropped for larger sizes after an attempt this slow (s)
+CSV_PATH = os.environ.get("FACTOR_CSV")
+STATEVECTOR_RAM = 512 * 1024 ** 2  # enough for N < 256 (24 qubits) at complex64
+
+def factors_of(n, factor):
+    return None if factor is None else tuple(sorted((factor, n // factor)))
+
+def statevector_shor(simulator, n, max_attempts=5):
+    # simulate_shors_algorithm's loop with every period taken from the simulation
+    # itself; MemoryError when n needs more qubits than the simulator's budget
+    if n % 2 == 0:
+        return 2, n // 2
+    for _ in range(max_attempts):
+        a = random.randint(2, n - 1)
+        d = gcd(a, n)
+        if d > 1:
+            return d, n // d
+        r = simulator.find_period(a, n)
+        if not r or r % 2:
+            continue
+        y = pow(a, r // 2, n)
+        if y == n - 1:
+            continue
+        for candidate in (gcd(y - 1, n), gcd(y + 1, n)):
+            if 1 < candidate < n:
+                return candidate, n // candidate
+    return None, None
+
+def methods():
+    found = {
+        "trial division": lambda n: factors_of(n, trial_division(n)),
+        "pollard rho": lambda n: factors_of(n, pollard_rho(n)),
+        "pollard p-1": lambda n: factors_of(n, pollard_p_minus_1(n)),
+        # One random base per call, as in user_socket.attacker before the parallel runner
+        "shor scan": lambda n: shors_algorithm(n, "scan"),
+        "shor bsgs": lambda n: shors_algorithm(n, "bsgs"),
+    }
+    if QuantumCryptography is not None:
+        found["simulate bsgs"] = lambda n: QuantumCryptography.simulate_shors_algorithm(n, order_method="bsgs")
+    if np is not None:
+        simulator = StatevectorShor(dtype=np.complex64, ram_budget=STATEVECTOR_RAM)
+        found["simulate statevector"] = lambda n: statevector_shor(simulator, n)
+    return found
+
+def attempt(method, n):
+    # Wall time of an untraced run, then peak memory of a second, traced one
+    # (tracemalloc slows pure-Python arithmetic several times over)
+    start = time.perf_counter()
+    try:
+        result = method(n)
+    except MemoryError:
+        return None  # the statevector does not fit
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    method(n)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    solved = result is not None and None not in result and result[0] * result[1] == n and 1 < result[0] < n
+    return elapsed, peak, solved
+
+def run():
+    # Yields one row per (size, method); the 15-bit size is the demo's own n = 32639
+    active = methods()
+    for bits in MODULUS_BITS:
+        moduli = [32639] * TRIALS if bits == 15 else [sample_modulus(bits) for _ in range(TRIALS)]
+        for name, method in list(active.items()):
+            results = [attempt(method, n) for n in moduli]
+            if None in results:
+                del active[name]
+                yield {'bits': bits, 'method': name, 'runs': 0}
+                continue
+            times = sorted(elapsed for elapsed, _, _ in results)
+            if times[-1] > TIME_BUDGET:
+                del active[name]  # every method here grows at least 2x per extra bit or two
+            yield {'bits': bits, 'method': name, 'runs': TRIALS,
+                   'solved': sum(solved for _, _, solved in results),
+                   'median_ms': round(times[len(times) // 2] * 1000, 3), 'max_ms': round(times[-1] * 1000, 3),
+                   'peak_kib': round(max(peak for _, peak, _ in results) / 1024, 1)}
+
+if __name__ == "__main__":
+    fields = ['bits', 'method', 'runs', 'solved', 'median_ms', 'max_ms', 'peak_kib']
+    if CSV_PATH:
+        out = sys.stdout if CSV_PATH == "-" else open(CSV_PATH, "w", newline="")
+        writer = csv.DictWriter(out, fieldnames=fields)
+        writer.writeheader()
+        for row in run():
+            writer.writerow(row)
+            out.flush()
+        if out is not sys.stdout:
+            out.close()
+    else:
+        if QuantumCryptography is None:
+            print("hershith unavailable; skipping simulate bsgs")
+        if np is None:
+            print("numpy unavailable; skipping simulate statevector")
+        print(f"{'bits':>5} {'method':>21} {'solved':>7} {'median ms':>11} {'max ms':>11} {'peak KiB':>10}")
+        for row in run():
+            if not row['runs']:
+                print(f"{row['bits']:>5} {row['method']:>21} {'too many qubits':>42}")
+                continue
+            print(f"{row['bits']:>5} {row['method']:>21} {row['solved']:>4}/{row['runs']} {row['median_ms']:>11.2f} "
+                  f"{row['max_ms']:>11.2f} {row['peak_kib']:>10.1f}")
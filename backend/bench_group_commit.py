@@ -0,0 +1,50 @@
+import contextlib
+import io
+import threading
+import time
+from bank import Bank
+from rsa_keygen import bank_key
+
+KEY = bank_key()  # passed to Bank too, so the payments are encrypted to the key it decrypts with
+PUBLIC_KEY = (KEY['e'], KEY['n'])
+THREADS = 32
+TRANSACTIONS_PER_THREAD = 50
+
+def encrypt(msg, pub_key):
+    e, n = pub_key
+    return [pow(ord(char), e, n) for char in msg]
+
+def setup(bank):
+    # One payer/merchant pair per thread so the benchmark measures persistence, not contention
+    pairs = []
+    for i in range(THREADS):
+        mmid, _ = bank.register_user(f"payer{i}", "SBIN0001234", "pass", "1234", f"9{i:09d}", 10 ** 6)
+        mid = bank.register_merchant(f"shop{i}", "HDFC0002345", f"pass{i}")
+        pairs.append((encrypt(mmid, PUBLIC_KEY), encrypt("1234", PUBLIC_KEY), mid))
+    return pairs
+
+def pay(bank, pair):
+    enc_mmid, enc_pin, mid = pair
+    for _ in range(TRANSACTIONS_PER_THREAD):
+        bank.process_transaction(enc_mmid, enc_pin, mid, 1)
+
+def run(group_commit):
+    db_name = f"bench_group_commit_{int(group_commit)}"
+    with contextlib.redirect_stdout(io.StringIO()):
+        bank = Bank(db_name=db_name, group_commit=group_commit, rsa_key=KEY)
+        pairs = setup(bank)
+        threads = [threading.Thread(target=pay, args=(bank, pair)) for pair in pairs]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+    bank.storage.drop()
+    return THREADS * TRANSACTIONS_PER_THREAD / elapsed
+
+if __name__ == "__main__":
+    per_call = run(False)
+    grouped = run(True)
+    print(f"per-call writes: {per_call:8.0f} tx/s")
+    print(f"group commit:    {grouped:8.0f} tx/s  ({grouped / per_call:.1f}x)")
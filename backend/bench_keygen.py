@@ -0,0 +1,44 @@
+import random
+import time
+from bench_order import is_prime
+from rsa_keygen import generate_keypair, is_probable_prime, random_prime
+
+PRIME_BITS = (16, 24, 32, 40, 48, 64, 128, 512, 1024)
+KEY_BITS = (1024, 2048, 3072, 4096)
+KEYS_PER_SIZE = 3
+TIME_BUDGET = 0.1  # trial division is skipped for larger sizes once a prime takes longer than this (~16x per 8 bits)
+
+def trial_division_prime(bits):
+    # What shor.generate_prime did: random odd candidates tested by trial division
+    while True:
+        p = random.getrandbits(bits) | (1 << (bits - 1)) | 1
+        if is_prime(p):
+            return p
+
+if __name__ == "__main__":
+    print(f"{'prime bits':>10} {'trial division ms':>18} {'sieve + Miller-Rabin ms':>24}")
+    trial_active = True
+    for bits in PRIME_BITS:
+        column = f"{'skipped':>18}"
+        if trial_active:
+            start = time.perf_counter()
+            p = trial_division_prime(bits)
+            elapsed = time.perf_counter() - start
+            assert is_probable_prime(p)
+            trial_active = elapsed <= TIME_BUDGET
+            column = f"{elapsed * 1000:>18.2f}"
+        start = time.perf_counter()
+        random_prime(bits)
+        print(f"{bits:>10} {column} {(time.perf_counter() - start) * 1000:>24.2f}")
+
+    print()
+    print(f"{'key bits':>8} {'median ms':>10} {'max ms':>10}")
+    for bits in KEY_BITS:
+        times = []
+        for _ in range(KEYS_PER_SIZE):
+            start = time.perf_counter()
+            key = generate_keypair(bits)
+            times.append(time.perf_counter() - start)
+            assert key['n'].bit_length() == bits and pow(pow(42, key['e'], key['n']), key['d'], key['n']) == 42
+        times.sort()
+        print(f"{bits:>8} {times[len(times) // 2] * 1000:>10.0f} {times[-1] * 1000:>10.0f}")
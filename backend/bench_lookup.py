@@ -0,0 +1,45 @@
+import contextlib
+import io
+import time
+from bank import Bank
+from storage import MemoryStorage
+
+ACCOUNTS = 100
+LOOKUPS = 100000
+
+def make_ifsc_codes(count):
+    return [f"BENC{i:07d}" for i in range(count)]
+
+def linear_find_user(bank, mmid):
+    # The lookup Bank.find_user used before the MMID index was added
+    for ifsc in bank.ifsc_codes:
+        if (ifsc, mmid) in bank.users:
+            return ifsc, bank.users[(ifsc, mmid)]
+    return None, None
+
+def time_lookups(find, mmids):
+    start = time.perf_counter()
+    for i in range(LOOKUPS):
+        find(mmids[i % len(mmids)])
+    return (time.perf_counter() - start) / LOOKUPS * 1e9
+
+def run(ifsc_count):
+    with contextlib.redirect_stdout(io.StringIO()):
+        bank = Bank(storage=MemoryStorage())
+        bank.ifsc_codes = make_ifsc_codes(ifsc_count)
+        bank.load_from_db()
+        # Put every account in the last IFSC, the worst case for a scan over ifsc_codes
+        ifsc = bank.ifsc_codes[-1]
+        mmids = []
+        for i in range(ACCOUNTS):
+            mmid, _ = bank.register_user(f"bench{i}", ifsc, "pass", "1234", f"9{i:09d}", 100)
+            mmids.append(mmid)
+    indexed = time_lookups(bank.find_user, mmids)
+    linear = time_lookups(lambda mmid: linear_find_user(bank, mmid), mmids)
+    return indexed, linear
+
+if __name__ == "__main__":
+    results = [(count, *run(count)) for count in (9, 500)]
+    print(f"{'IFSCs':>6} {'indexed ns/lookup':>18} {'linear ns/lookup':>17}")
+    for count, indexed, linear in results:
+        print(f"{count:>6} {indexed:>18.0f} {linear:>17.0f}")
@@ -0,0 +1,65 @@
+import random
+import time
+from math import gcd
+from order_finding import order_bsgs, order_scan
+
+MODULUS_BITS = (16, 20, 24, 28, 32, 36, 40)
+TRIALS = 3
+TIME_BUDGET = 0.5  # a method is dropped for larger moduli once one trial takes longer than this (~16x per step)
+
+def pow_per_candidate(a, n):
+    # The original find_period: a fresh modular exponentiation for every candidate r
+    for r in range(1, n):
+        if pow(a, r, n) == 1:
+            return r
+    return None
+
+def is_prime(n):
+    if n < 2:
+        return False
+    i = 2
+    while i * i <= n:
+        if n % i == 0:
+            return False
+        i += 1
+    return True
+
+def random_prime(bits):
+    while True:
+        p = random.getrandbits(bits) | (1 << (bits - 1)) | 1
+        if is_prime(p):
+            return p
+
+def sample_modulus(bits):
+    # An RSA-style modulus with the demo's shape (p=127, q=257 gives n=32639, 15 bits)
+    while True:
+        p, q = random_prime(bits // 2), random_prime(bits - bits // 2)
+        if p != q:
+            return p * q
+
+if __name__ == "__main__":
+    methods = {"pow per r": pow_per_candidate, "scan": order_scan, "bsgs": order_bsgs}
+    active = set(methods)
+    print(f"{'bits':>5} {'n':>15} {'order':>14} " + " ".join(f"{name + ' ms':>12}" for name in methods))
+    for bits in MODULUS_BITS:
+        n = sample_modulus(bits)
+        cases = []
+        for _ in range(TRIALS):
+            a = random.randrange(2, n)
+            while gcd(a, n) != 1:
+                a = random.randrange(2, n)
+            cases.append(a)
+        orders = [order_bsgs(a, n) for a in cases]
+        columns = []
+        for name, finder in methods.items():
+            if name not in active:
+                columns.append(f"{'skipped':>12}")
+                continue
+            start = time.perf_counter()
+            for a, order in zip(cases, orders):
+                assert finder(a, n) == order, f"{name} disagrees on a={a}, n={n}"
+            per_trial = (time.perf_counter() - start) / TRIALS
+            if per_trial > TIME_BUDGET:
+                active.discard(name)
+            columns.append(f"{per_trial * 1000:>12.2f}")
+        print(f"{bits:>5} {n:>15} {max(orders):>14} " + " ".join(columns))
@@ -0,0 +1,56 @@
+import random
+import time
+from rsa_engine import RSADecryptor
+from rsa_keygen import bank_key
+
+KEY = bank_key()  # the key Bank decrypts with: BANK_RSA_KEY, or the demo key
+PUBLIC_KEY = (KEY['e'], KEY['n'])
+PRIVATE_KEY = (KEY['d'], KEY['n'])
+# A full-size private exponent makes the naive path thousands of times slower than the demo key's
+TRANSACTIONS = 2000 if KEY['n'].bit_length() <= 64 else 20
+
+def encrypt(msg, pub_key):
+    e, n = pub_key
+    return [pow(ord(char), e, n) for char in msg]
+
+def naive_decrypt(cipher, priv_key):
+    # What Bank.decrypt did before the engine: one full pow per character
+    d, n = priv_key
+    return ''.join([chr(pow(char, d, n)) for char in cipher])
+
+def make_transactions(count):
+    transactions = []
+    for _ in range(count):
+        mmid = format(random.getrandbits(64), '016x')
+        pin = f"{random.randrange(10000):04d}"
+        transactions.append((encrypt(mmid, PUBLIC_KEY), encrypt(pin, PUBLIC_KEY)))
+    return transactions
+
+def per_transaction_us(decrypt, transactions):
+    start = time.perf_counter()
+    for enc_mmid, enc_pin in transactions:
+        decrypt(enc_mmid)
+        decrypt(enc_pin)
+    return (time.perf_counter() - start) / len(transactions) * 1e6
+
+def batch_throughput(decryptor, transactions):
+    ciphers = [cipher for transaction in transactions for cipher in transaction]
+    start = time.perf_counter()
+    decryptor.decrypt_many(ciphers)
+    return len(transactions) / (time.perf_counter() - start)
+
+if __name__ == "__main__":
+    transactions = make_transactions(TRANSACTIONS)
+    crt_only = RSADecryptor(p=KEY['p'], q=KEY['q'], d=KEY['d'], alphabet=None)
+    codebook = RSADecryptor(p=KEY['p'], q=KEY['q'], d=KEY['d'])
+    expected = [naive_decrypt(c, PRIVATE_KEY) for transaction in transactions for c in transaction]
+    assert [codebook.decrypt(c) for transaction in transactions for c in transaction] == expected
+    assert [crt_only.decrypt(c) for transaction in transactions for c in transaction] == expected
+
+    print("Latency per transaction (MMID + PIN)")
+    print(f"  naive pow: {per_transaction_us(lambda c: naive_decrypt(c, PRIVATE_KEY), transactions):8.1f} us")
+    print(f"  CRT:       {per_transaction_us(crt_only.decrypt, transactions):8.1f} us")
+    print(f"  codebook:  {per_transaction_us(codebook.decrypt, transactions):8.1f} us")
+    print("Batch decryption throughput")
+    print(f"  CRT:       {batch_throughput(crt_only, transactions):8.0f} tx/s")
+    print(f"  codebook:  {batch_throughput(codebook, transactions):8.0f} tx/s")
@@ -0,0 +1,24 @@
+import os
+from bench_order import sample_modulus
+from shor_runner import run_sequential, run_shor
+
+MODULUS_BITS = (15, 20, 24, 28, 32, 36)
+ROUNDS = 3  # independent runs per modulus, with different random bases
+
+def summarize(runs):
+    attempts = sum(run['attempts'] for run in runs) / len(runs)
+    wall = sum(run['wall_s'] for run in runs) / len(runs)
+    solved = sum(run['factors'] is not None for run in runs)
+    return attempts, wall, solved
+
+if __name__ == "__main__":
+    workers = os.cpu_count() or 1
+    print(f"{workers} worker processes")
+    print(f"{'bits':>5} {'n':>13} {'runner':>10} {'order':>6} {'solved':>7} {'avg attempts':>13} {'avg wall ms':>12}")
+    for bits in MODULUS_BITS:
+        n = 32639 if bits == 15 else sample_modulus(bits)
+        for order_method in ("bsgs", "scan") if bits <= 24 else ("bsgs",):
+            for label, runner in (("sequential", run_sequential), ("parallel", run_shor)):
+                runs = [runner(n, order_method=order_method, seed=seed) for seed in range(ROUNDS)]
+                attempts, wall, solved = summarize(runs)
+                print(f"{bits:>5} {n:>13} {label:>10} {order_method:>6} {solved:>4}/{ROUNDS} {attempts:>13.1f} {wall * 1000:>12.1f}")
@@ -0,0 +1,30 @@
+import random
+import time
+import speck
+from speck import SpeckCipher
+
+BATCH_SIZES = (1, 1000, 1000000)
+SCALAR_LIMIT = 100000  # the scalar loop is timed on at most this many blocks per batch
+
+def blocks_per_second(function, blocks, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function(blocks)
+    return len(blocks) * repeat / (time.perf_counter() - start)
+
+if __name__ == "__main__":
+    cipher = SpeckCipher()
+    print(f"{'batch':>8} {'scalar enc/s':>14} {'scalar dec/s':>14} {'numpy enc/s':>14} {'numpy dec/s':>14}")
+    for size in BATCH_SIZES:
+        blocks = [random.getrandbits(32) for _ in range(size)]
+        sample = blocks[:SCALAR_LIMIT]
+        repeat = max(1, 20000 // size)
+        scalar_enc = blocks_per_second(lambda b: [cipher.encrypt_block(x) for x in b], sample, repeat)
+        scalar_dec = blocks_per_second(lambda b: [cipher.decrypt_block(x) for x in b], sample, repeat)
+        if speck.np is not None:
+            array = speck.np.array(blocks, dtype=speck.np.uint32)
+            numpy_enc = f"{blocks_per_second(cipher.encrypt_blocks, array, repeat):>14,.0f}"
+            numpy_dec = f"{blocks_per_second(cipher.decrypt_blocks, array, repeat):>14,.0f}"
+        else:
+            numpy_enc = numpy_dec = f"{'no numpy':>14}"
+        print(f"{size:>8} {scalar_enc:>14,.0f} {scalar_dec:>14,.0f} {numpy_enc} {numpy_dec}")
@@ -0,0 +1,47 @@
+import random
+import time
+import tracemalloc
+from math import gcd
+import numpy as np
+from order_finding import order_bsgs
+from statevector import StatevectorShor, max_qubits, register_sizes
+
+# One odd composite per register size: 12, 15, 18, 21 and 24 qubits
+MODULI = (15, 21, 35, 77, 143)
+CONFIGS = (("complex128", "gates"), ("complex64", "gates"), ("complex128", "fft"))
+RAM_BUDGETS_GIB = (1, 8, 64)
+SHOTS = 16
+
+def pick_base(n, rng):
+    while True:
+        a = rng.randrange(2, n - 1)
+        if gcd(a, n) == 1:
+            return a
+
+if __name__ == "__main__":
+    rng = random.Random(1)
+    print(f"{'N':>5} {'qubits':>6} {'dtype':>10} {'qft':>5} {'modexp ms':>10} {'qft ms':>10} "
+          f"{'measure ms':>10} {'peak MiB':>9} {'period':>7}")
+    for n in MODULI:
+        a = pick_base(n, rng)
+        for dtype, qft in CONFIGS:
+            simulator = StatevectorShor(dtype=np.dtype(dtype), qft=qft, shots=SHOTS, seed=1)
+            tracemalloc.start()
+            start = time.perf_counter()
+            stats = simulator.run(a, n)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            timings = stats['timings']
+            # The sampled period is correct with high probability; flag the rare miss
+            period = stats['period'] if stats['period'] == order_bsgs(a, n) else f"{stats['period']}!"
+            print(f"{n:>5} {stats['qubits']:>6} {dtype:>10} {qft:>5} {timings['modexp'] * 1000:>10.1f} "
+                  f"{timings['qft'] * 1000:>10.1f} {timings['measure'] * 1000:>10.1f} "
+                  f"{peak / 2 ** 20:>9.1f} {str(period):>7}")
+
+    print()
+    for gib in RAM_BUDGETS_GIB:
+        limits = {dtype: max_qubits(gib * 1024 ** 3, np.dtype(dtype).itemsize) for dtype in ("complex64", "complex128")}
+        largest = {dtype: max(N for N in range(3, 1 << 12) if sum(register_sizes(N)) <= q)
+                   for dtype, q in limits.items()}
+        print(f"{gib:>3} GiB: " + ", ".join(f"{dtype} {q} qubits (N < {largest[dtype] + 1})"
+                                             for dtype, q in limits.items()))
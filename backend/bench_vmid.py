@@ -0,0 +1,41 @@
+import random
+import time
+from speck import cipher_for
+from vmid_verifier import VmidVerifier, vmid_timestamp
+
+MERCHANTS = 1000
+WINDOW = 120
+LOOKUPS = 2000
+
+def brute_force(cipher, mids, vmid, now):
+    # What verification costs without the table: one decrypt, then a scan of every second
+    decrypted = cipher.decrypt64(int(vmid, 16))
+    for second in range(now + 5, now - WINDOW - 1, -1):
+        timestamp = vmid_timestamp(second)
+        mid = format((decrypted ^ int(timestamp)) & 0xFFFFFFFFFFFFFFFF, '016x')
+        if mid in mids:
+            return mid, timestamp
+    return None, None
+
+if __name__ == "__main__":
+    cipher = cipher_for()
+    mids = {format(random.getrandbits(64), '016x') for _ in range(MERCHANTS)}
+    now = int(time.time())
+    vmids = [format(cipher.encrypt64((int(mid, 16) ^ int(vmid_timestamp(now - random.randint(0, WINDOW - 1))))
+                                     & 0xFFFFFFFFFFFFFFFF), '016x') for mid in random.choices(sorted(mids), k=LOOKUPS)]
+
+    start = time.perf_counter()
+    verifier = VmidVerifier(mids, window=WINDOW)
+    verifier.verify(vmids[0], now)
+    print(f"table build: {len(verifier.table)} VMIDs in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    start = time.perf_counter()
+    verifier.verify(vmids[0], now + 1)
+    print(f"advance one second: {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    for label, verify in (("table lookup", lambda vmid: verifier.verify(vmid, now + 1)),
+                          ("decrypt + scan", lambda vmid: brute_force(cipher, mids, vmid, now))):
+        start = time.perf_counter()
+        found = sum(verify(vmid)[0] is not None for vmid in vmids)
+        elapsed = time.perf_counter() - start
+        print(f"{label:>15}: {LOOKUPS / elapsed:>12,.0f} verifications/s ({found}/{LOOKUPS} found)")
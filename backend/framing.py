@@ -0,0 +1,168 @@
+import asyncio
+import itertools
+import socket
+import struct
+import threading
+import weakref
+from concurrent.futures import Future
+from codec import BINARY, CODECS, JSON
+
+# Every message is a frame: 4-byte payload length, 4-byte request ID, then the
+# payload. Responses carry the ID of the request they answer, so a client can
+# have many requests in flight on one connection. Payloads are JSON until the
+# client negotiates another codec with a 'hello' request (see negotiate).
+HEADER = struct.Struct(">II")
+MAX_FRAME = 16 * 1024 * 1024
+
+socket_codecs = weakref.WeakKeyDictionary()  # socket -> codec agreed for it
+
+class ConnectionClosed(ConnectionError):
+    # An OSError, so handlers that catch socket errors also catch a peer closing mid-frame
+    pass
+
+def recv_exact(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 65536))
+        if not chunk:
+            raise ConnectionClosed("Connection closed by peer")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+def codec_for(sock):
+    return socket_codecs.get(sock, JSON)
+
+def set_codec(sock, codec):
+    socket_codecs[sock] = codec
+
+def send_frame(sock, request_id, message, codec=None):
+    payload = (codec or codec_for(sock)).encode(message)
+    sock.sendall(HEADER.pack(len(payload), request_id) + payload)
+
+def recv_frame(sock, codec=None):
+    # Returns (request_id, message), or (None, None) once the peer has closed cleanly,
+    # i.e. between frames; a close inside a frame, even inside its header, raises ConnectionClosed
+    header = sock.recv(HEADER.size)
+    if not header:
+        return None, None
+    if len(header) < HEADER.size:
+        header += recv_exact(sock, HEADER.size - len(header))
+    length, request_id = HEADER.unpack(header)
+    if length > MAX_FRAME:
+        raise ValueError(f"Frame of {length} bytes exceeds the {MAX_FRAME} byte limit")
+    return request_id, (codec or codec_for(sock)).decode(recv_exact(sock, length))
+
+def hello_response(request):
+    # Server side of negotiation: pick the first codec we support from the client's list.
+    # The reply itself is still JSON; the chosen codec applies from the next frame on.
+    codecs = request.get('codecs')
+    for name in codecs if isinstance(codecs, list) else ():
+        if isinstance(name, str) and name in CODECS:
+            return {'status': 'success', 'codec': name}, CODECS[name]
+    return {'status': 'success', 'codec': JSON.name}, JSON
+
+def negotiate(sock, codecs=(BINARY.name, JSON.name)):
+    # Client side: servers that predate negotiation answer with an error and we stay on JSON
+    response = send_request(sock, {'type': 'hello', 'codecs': list(codecs)})
+    codec = CODECS.get(response.get('codec'), JSON) if response.get('status') == 'success' else JSON
+    set_codec(sock, codec)
+    return codec
+
+async def read_frame(reader, codec=JSON):
+    # asyncio counterpart of recv_frame
+    try:
+        header = await reader.readexactly(HEADER.size)
+    except asyncio.IncompleteReadError as e:
+        if e.partial:
+            raise ConnectionClosed("Connection closed mid-frame")
+        return None, None
+    length, request_id = HEADER.unpack(header)
+    if length > MAX_FRAME:
+        raise ValueError(f"Frame of {length} bytes exceeds the {MAX_FRAME} byte limit")
+    try:
+        payload = await reader.readexactly(length)
+    except asyncio.IncompleteReadError:
+        raise ConnectionClosed("Connection closed mid-frame")
+    return request_id, codec.decode(payload)
+
+def write_frame(writer, request_id, message, codec=JSON):
+    payload = codec.encode(message)
+    writer.write(HEADER.pack(len(payload), request_id) + payload)
+
+def send_request(sock, request):
+    # One request, one response; for pipelining use PipelinedClient
+    send_frame(sock, 0, request)
+    _, response = recv_frame(sock)
+    if response is None:
+        raise ConnectionClosed("Received no response from server")
+    return response
+
+class PipelinedClient:
+    """
+    Sends framed requests on one connection without waiting for earlier
+    replies. submit() returns a Future that a reader thread resolves when the
+    response with the matching request ID arrives.
+    """
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.ids = itertools.count(1)
+        self.pending = {}
+        self.error = None  # set once the reader has stopped; later submits fail with it
+        self.send_lock = threading.Lock()
+        self.pending_lock = threading.Lock()
+        self.reader = threading.Thread(target=self._read_responses, daemon=True)
+        self.reader.start()
+
+    @classmethod
+    def connect(cls, address, codecs=(BINARY.name, JSON.name)):
+        sock = socket.create_connection(address)
+        negotiate(sock, codecs)
+        return cls(sock)
+
+    def submit(self, request):
+        future = Future()
+        request_id = next(self.ids) & 0xFFFFFFFF
+        with self.pending_lock:
+            if self.error is not None:
+                future.set_exception(self.error)
+                return future
+            self.pending[request_id] = future
+        try:
+            with self.send_lock:
+                send_frame(self.sock, request_id, request)
+        except OSError as e:
+            with self.pending_lock:
+                self.pending.pop(request_id, None)
+            future.set_exception(e)
+        return future
+
+    def request(self, request, timeout=None):
+        return self.submit(request).result(timeout)
+
+    def _read_responses(self):
+        error = ConnectionClosed("Connection closed by peer")
+        try:
+            while True:
+                request_id, response = recv_frame(self.sock)
+                if response is None:
+                    break
+                with self.pending_lock:
+                    future = self.pending.pop(request_id, None)
+                if future is not None:
+                    future.set_result(response)
+        except Exception as e:  # whatever stops the reader must still fail the waiting requests
+            error = e
+        with self.pending_lock:
+            self.error = error
+            pending, self.pending = self.pending, {}
+        for future in pending.values():
+            future.set_exception(error)
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
@@ -0,0 +1,88 @@
+import threading
+import time
+
+class PendingCommit:
+    def __init__(self, updates, blocks):
+        self.updates = updates  # [(kind, ifsc, key, document)]
+        self.blocks = blocks
+        self.error = None
+        self.done = threading.Event()
+
+    def wait(self):
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+
+class GroupCommitter:
+    """
+    Collects balance updates and blockchain blocks from concurrent transactions
+    and writes them to storage as bulk writes. A batch is flushed once it holds
+    batch_size transactions or window seconds after its first transaction.
+    When a flush fails, on_failure(batch, error) is called before the batch's
+    waiters are released; commits queued behind it can be failed with drain().
+    Balances are written before blocks, so a failed flush may still have stored
+    the batch's balances; waiters write their reverted values back with a
+    later commit (see Bank.revert_transfers).
+    """
+
+    def __init__(self, storage, batch_size=64, window=0.005, on_failure=None):
+        self.storage = storage
+        self.batch_size = batch_size
+        self.window = window
+        self.on_failure = on_failure
+        self.pending = []
+        self.cond = threading.Condition()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, updates, blocks=()):
+        # Documents are copied so later in-memory changes do not leak into this batch
+        commit = PendingCommit([(kind, ifsc, key, dict(data)) for kind, ifsc, key, data in updates], list(blocks))
+        with self.cond:
+            self.pending.append(commit)
+            self.cond.notify()
+        return commit
+
+    def drain(self, error):
+        # Fails every commit still waiting to be flushed
+        with self.cond:
+            pending, self.pending = self.pending, []
+        for commit in pending:
+            commit.error = error
+            commit.done.set()
+        return len(pending)
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.pending:
+                    self.cond.wait()
+                deadline = time.monotonic() + self.window
+                while len(self.pending) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.cond.wait(remaining)
+                batch = self.pending[:self.batch_size]
+                del self.pending[:self.batch_size]
+            self._flush(batch)
+
+    def _flush(self, batch):
+        error = None
+        try:
+            writes = {}
+            for commit in batch:
+                for kind, ifsc, key, data in commit.updates:
+                    writes[(kind, ifsc, key)] = data  # last write per account wins
+            self.storage.save_accounts([(kind, ifsc, key, data) for (kind, ifsc, key), data in writes.items()])
+            blocks = [block for commit in batch for block in commit.blocks]
+            if blocks:
+                self.storage.insert_blocks(blocks)
+        except Exception as e:
+            print(f"Group commit failed: {e}")
+            error = e
+            if self.on_failure is not None:
+                self.on_failure(batch, error)
+        for commit in batch:
+            commit.error = error
+            commit.done.set()
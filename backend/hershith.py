@@ -7,6 +7,8 @@ import sympy
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 from cryptography.hazmat.primitives import padding
 from cryptography.hazmat.backends import default_backend
+from order_finding import find_order
+from statevector import StatevectorShor
 
 class SHA256:
     @staticmethod
@@ -30,32 +32,33 @@ class QuantumCryptography:
         return a
 
     @staticmethod
-    def find_period(x, n):
+    def find_period(x, n, method="scan"):
         """
         Simulate finding the period of f(a) = x^a mod n
         In a real quantum computer, this would use quantum Fourier transform
         """
-        # This is a classical simulation - in a quantum setting this would be much faster
-        a = 1
-        values = {}
-        max_iterations = 10000  # Prevent infinite loops
+        # This is a classical simulation - in a quantum setting this would be much faster.
+        # method is "scan" or "bsgs" (see order_finding)
+        r = find_order(x, n, method)
 
-        for i in range(max_iterations):
-            val = pow(x, a, n)
-            if val in values:
-                return a - values[val]
-            values[val] = a
-            a += 1
-
-        # If no period found, return a large number
-        return -1
+        # If no period found, return -1
+        return -1 if r is None else r
 
     @staticmethod
-    def simulate_shors_algorithm(n, max_attempts=5):
+    def simulate_shors_algorithm(n, max_attempts=5, order_method="scan", backend="classical", statevector=None):
         """
         Simulate Shor's algorithm to find the prime factors of n
         This is a simplified version for educational purposes
+        backend="statevector" finds periods with the circuit simulation in statevector.py
+        and raises MemoryError when n is too large for it; backend="auto" uses the
+        simulation when n fits and the classical order finder otherwise.
+        statevector can pass a configured StatevectorShor
         """
+        if backend not in ("classical", "statevector", "auto"):
+            raise ValueError(f"Unknown backend {backend!r}; use 'classical', 'statevector' or 'auto'")
+        if backend != "classical" and statevector is None:
+            statevector = StatevectorShor()
+
         if n % 2 == 0:
             return 2, n // 2
 
@@ -70,7 +73,17 @@ class QuantumCryptography:
                 return g, n // g
 
             # Try to find the period of f(a) = x^a mod n
-            r = QuantumCryptography.find_period(x, n)
+            if backend == "statevector":
+                r = statevector.find_period(x, n) or -1
+            elif backend == "auto":
+                try:
+                    r = statevector.find_period(x, n) or -1
+                except MemoryError as e:
+                    # Only once per call: every later base uses the classical order finder
+                    print(f"{e}; using classical order finding instead")
+                    backend = "classical"
+            if backend == "classical":
+                r = QuantumCryptography.find_period(x, n, order_method)
 
             if r == -1 or r % 2 != 0:
                 # No period found or period is odd, try again
@@ -99,7 +112,7 @@ class QuantumCryptography:
 # Added Main Method for RSA Encryption and Breaking a 4-Digit PIN
 # --------------------------------------------
 
-if _name_ == "_main_":
+if __name__ == "__main__":
     print("=== RSA Encryption and Quantum Attack Simulation ===\n")
 
     # --- RSA SETUP ---
@@ -0,0 +1,126 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from rsa_engine import RSADecryptor
+
+# Next to this module, so every attacker entry point shares one store whatever the working directory
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recovered_keys.jsonl")
+_default = None
+_default_lock = threading.Lock()
+
+class KeyRecoveryCache:
+    """
+    Recovered RSA keys by public key (e, n): the factors p and q and the private
+    exponent d. The most recently used entries stay in memory, at most capacity
+    of them, evicting the least recently used. With a path, every recovered key
+    is also appended to a JSON-lines file and looked up there by offset after
+    eviction or a restart, so a modulus is factored once per store, not once
+    per attack.
+    """
+
+    def __init__(self, path=None, capacity=128):
+        self.path = path
+        self.capacity = capacity
+        self.entries = OrderedDict()  # (e, n) -> entry, least recently used first
+        self.offsets = {}  # (e, n) -> byte offset of its line in path
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0, 'factor_s': 0.0}
+        if path and os.path.exists(path):
+            self._index()
+
+    def _index(self):
+        # Offsets of every stored key; a torn last line from an interrupted write is cut off the file
+        with open(self.path, "rb+") as f:
+            while True:
+                offset = f.tell()
+                line = f.readline()
+                if not line:
+                    return
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("incomplete entry")
+                    entry = json.loads(line)
+                except ValueError:
+                    f.truncate(offset)
+                    return
+                self.offsets[(entry['e'], entry['n'])] = offset
+
+    def _read(self, key):
+        with open(self.path, "rb") as f:
+            f.seek(self.offsets[key])
+            return json.loads(f.readline())
+
+    def _remember(self, key, entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def get(self, e, n):
+        key = (e, n)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return entry
+            if key in self.offsets:
+                entry = self._read(key)
+                self._remember(key, entry)
+                self.stats['disk_hits'] += 1
+                return entry
+            self.stats['misses'] += 1
+            return None
+
+    def put(self, e, n, p, q):
+        if p * q != n or not 1 < p < n:
+            raise ValueError(f"{p} * {q} is not a factorization of {n}")
+        p, q = sorted((p, q))
+        entry = {'e': e, 'n': n, 'p': p, 'q': q, 'd': pow(e, -1, (p - 1) * (q - 1))}
+        key = (e, n)
+        with self.lock:
+            if self.path and key not in self.offsets:
+                line = json.dumps(entry, separators=(",", ":")).encode() + b"\n"
+                with open(self.path, "ab") as f:
+                    self.offsets[key] = f.tell()
+                    f.write(line)
+            self._remember(key, entry)
+        return entry
+
+    def recover(self, e, n, factor):
+        """
+        The entry for (e, n), calling factor(n) -> (p, q) only on a miss. Returns
+        None when factoring fails (factor returns None or (None, None)); failures
+        are not cached, so the next call tries again.
+        """
+        entry = self.get(e, n)
+        if entry is not None:
+            return entry
+        start = time.perf_counter()
+        factors = factor(n)
+        with self.lock:
+            self.stats['factor_s'] += time.perf_counter() - start
+        if not factors or None in factors:
+            return None
+        return self.put(e, n, *factors)
+
+    def decryptor(self, e, n, factor):
+        # An RSADecryptor (CRT plus codebook) for the recovered key, or None
+        entry = self.recover(e, n, factor)
+        if entry is None:
+            return None
+        return RSADecryptor(p=entry['p'], q=entry['q'], d=entry['d'], e=e)
+
+def default_cache():
+    """
+    The process-wide cache, created on first use: ATTACK_KEY_CACHE names its
+    file (empty keeps keys in memory only), otherwise DEFAULT_PATH.
+    """
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = KeyRecoveryCache(os.environ.get("ATTACK_KEY_CACHE", DEFAULT_PATH) or None)
+        return _default
@@ -0,0 +1,224 @@
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+
+GENESIS_HASH = "0" * 64
+
+def block_leaf(block):
+    # Leaves commit to the whole stored block, not just its ID
+    return hashlib.sha256(json.dumps(block, sort_keys=True, separators=(",", ":")).encode()).digest()
+
+def hash_pair(left, right):
+    return hashlib.sha256(b"\x01" + left + right).digest()
+
+class MerkleTree:
+    """
+    Append-only Merkle tree over block leaves. All levels are kept so an append
+    only rehashes the path from the new leaf to the root, and an inclusion
+    proof is one sibling per level. A node without a sibling is carried up
+    unchanged.
+    """
+
+    def __init__(self):
+        self.levels = [[]]
+
+    def __len__(self):
+        return len(self.levels[0])
+
+    def append(self, leaf):
+        self.levels[0].append(leaf)
+        index = len(self.levels[0]) - 1
+        level = 0
+        while len(self.levels[level]) > 1:
+            parent = index // 2
+            nodes = self.levels[level]
+            node = hash_pair(nodes[2 * parent], nodes[2 * parent + 1]) if 2 * parent + 1 < len(nodes) else nodes[2 * parent]
+            if level + 1 == len(self.levels):
+                self.levels.append([])
+            if parent < len(self.levels[level + 1]):
+                self.levels[level + 1][parent] = node
+            else:
+                self.levels[level + 1].append(node)
+            index = parent
+            level += 1
+
+    def root(self):
+        return self.levels[-1][0] if self.levels[0] else b"\x00" * 32
+
+    def proof(self, index):
+        # [(side of the sibling, sibling hash)] from the leaf up
+        path = []
+        for nodes in self.levels[:-1]:
+            sibling = index ^ 1
+            if sibling < len(nodes):
+                path.append(("left" if sibling < index else "right", nodes[sibling]))
+            index //= 2
+        return path
+
+def verify_proof(leaf_hex, proof, root_hex):
+    node = bytes.fromhex(leaf_hex)
+    for side, sibling_hex in proof:
+        sibling = bytes.fromhex(sibling_hex)
+        node = hash_pair(sibling, node) if side == "left" else hash_pair(node, sibling)
+    return node.hex() == root_hex
+
+class LedgerVerifier:
+    """
+    Incremental blockchain auditor. Each run checks only the blocks appended
+    since the last verified block: that every block links to the one before it,
+    and that its leaf extends the Merkle tree. Every checkpoint_every blocks an
+    HMAC-signed checkpoint (height, block hash, Merkle root) is written to
+    state_dir together with the leaves it covers, so a restart resumes from the
+    last checkpoint instead of rescanning the ledger. The leaf file holds one
+    64-byte record per block: the raw transaction ID followed by its leaf.
+    The HMAC key comes from signing_key or LEDGER_CHECKPOINT_KEY; there is no
+    default, since a key in the source would let anyone forge checkpoints.
+    Blocks are read chunk at a time outside the lock and verified under it,
+    so proofs stay available during a long first scan.
+    """
+
+    def __init__(self, storage, state_dir="ledger_state", checkpoint_every=1000, signing_key=None, chunk=1000):
+        self.storage = storage
+        self.state_dir = state_dir
+        self.checkpoint_every = checkpoint_every
+        self.chunk = chunk
+        if signing_key is None:
+            signing_key = os.environ.get("LEDGER_CHECKPOINT_KEY")
+        if not signing_key:
+            raise ValueError("A checkpoint signing key is required: pass signing_key or set LEDGER_CHECKPOINT_KEY")
+        self.signing_key = signing_key.encode() if isinstance(signing_key, str) else signing_key
+        self.tree = MerkleTree()
+        self.leaf_ids = []  # tx_id of each leaf
+        self.positions = {}  # tx_id -> leaf index
+        self.tip_block = None  # last verified block
+        self.checkpoints = []
+        self.lock = threading.Lock()
+        os.makedirs(state_dir, exist_ok=True)
+        self.checkpoints_path = os.path.join(state_dir, "checkpoints.jsonl")
+        self.leaves_path = os.path.join(state_dir, "leaves.bin")
+        self._load_state()
+
+    def _sign(self, height, block_hash, root):
+        return hmac.new(self.signing_key, f"{height}:{block_hash}:{root}".encode(), hashlib.sha256).hexdigest()
+
+    def _load_state(self):
+        if not os.path.exists(self.checkpoints_path):
+            return
+        with open(self.checkpoints_path) as f:
+            self.checkpoints = [json.loads(line) for line in f if line.strip()]
+        if not self.checkpoints:
+            return
+        checkpoint = self.checkpoints[-1]
+        height = checkpoint["height"]
+        if not hmac.compare_digest(checkpoint["signature"], self._sign(height, checkpoint["block_hash"], checkpoint["root"])):
+            raise ValueError("Ledger checkpoint signature does not match")
+        with open(self.leaves_path, "rb") as f:
+            records = f.read(64 * height)
+        for i in range(height):
+            self._add_leaf(records[64 * i:64 * i + 32].hex(), records[64 * i + 32:64 * (i + 1)])
+        if self.tree.root().hex() != checkpoint["root"]:
+            raise ValueError("Stored Merkle leaves do not match the last checkpoint")
+        self.tip_block = self.storage.find_block(checkpoint["block_hash"])
+        if self.tip_block is None:
+            raise ValueError(f"Checkpointed block {checkpoint['block_hash']} is missing from the ledger")
+
+    def _add_leaf(self, tx_id, leaf):
+        self.positions[tx_id] = len(self.leaf_ids)
+        self.leaf_ids.append(tx_id)
+        self.tree.append(leaf)
+
+    def _write_checkpoint(self):
+        height = len(self.tree)
+        previous = self.checkpoints[-1]["height"] if self.checkpoints else 0
+        records = b"".join(bytes.fromhex(self.leaf_ids[i]) + self.tree.levels[0][i] for i in range(previous, height))
+        with open(self.leaves_path, "ab") as f:
+            f.truncate(64 * previous)  # drop records left by a checkpoint that never completed
+            f.write(records)
+            f.flush()
+            os.fsync(f.fileno())
+        root = self.tree.root().hex()
+        checkpoint = {
+            "height": height,
+            "block_hash": self.tip_block["_id"],
+            "root": root,
+            "time": time.time(),
+            "signature": self._sign(height, self.tip_block["_id"], root)
+        }
+        with open(self.checkpoints_path, "a") as f:
+            f.write(json.dumps(checkpoint) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.checkpoints.append(checkpoint)
+        print(f"Ledger: checkpoint at height {height}")
+
+    def verify_new_blocks(self):
+        """Returns (number of newly verified blocks, error message or None)."""
+        verified = 0
+        while True:
+            with self.lock:
+                tip = self.tip_block
+            # Read outside the lock; the chunk is dropped if another run moved the tip meanwhile
+            blocks = list(self.storage.find_blocks(tip, limit=self.chunk))
+            with self.lock:
+                if self.tip_block is not tip:
+                    continue
+                previous_hash = tip["_id"] if tip is not None else GENESIS_HASH
+                for block in blocks:
+                    if block["Previous Block Hash"] != previous_hash:
+                        return verified, f"Block {block['_id']} does not link to {previous_hash}"
+                    if block["_id"] in self.positions:
+                        return verified, f"Block {block['_id']} appears twice"
+                    self._add_leaf(block["_id"], block_leaf(block))
+                    self.tip_block = block
+                    previous_hash = block["_id"]
+                    verified += 1
+                    if len(self.tree) % self.checkpoint_every == 0:
+                        self._write_checkpoint()
+            if len(blocks) < self.chunk:
+                return verified, None
+
+    def caught_up(self):
+        # True once every block stored so far has been verified
+        latest = self.storage.latest_block()
+        with self.lock:
+            tip = self.tip_block
+        return latest is None or (tip is not None and tip["_id"] == latest["_id"])
+
+    def inclusion_proof(self, tx_id):
+        # Proof that a transaction's block is in the tree; None if it is not verified yet
+        with self.lock:
+            index = self.positions.get(tx_id)
+            if index is None:
+                return None
+            return {
+                "tx_id": tx_id,
+                "index": index,
+                "height": len(self.tree),
+                "leaf": self.tree.levels[0][index].hex(),
+                "proof": [[side, sibling.hex()] for side, sibling in self.tree.proof(index)],
+                "root": self.tree.root().hex()
+            }
+
+    def verify_block(self, tx_id):
+        # Spot-checks a stored block against the tree without rescanning the ledger
+        proof = self.inclusion_proof(tx_id)
+        block = self.storage.find_block(tx_id)
+        if proof is None or block is None:
+            return False
+        return block_leaf(block).hex() == proof["leaf"] and verify_proof(proof["leaf"], proof["proof"], proof["root"])
+
+    def run(self, interval=5):
+        while True:
+            verified, error = self.verify_new_blocks()
+            if error is not None:
+                print(f"Ledger verification failed: {error}")
+            elif verified:
+                print(f"Ledger: verified {verified} new blocks, height {len(self.tree)}")
+            time.sleep(interval)
+
+if __name__ == "__main__":
+    from storage import MongoStorage
+    LedgerVerifier(MongoStorage()).run()
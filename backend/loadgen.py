@@ -0,0 +1,196 @@
+import itertools
+import os
+import subprocess
+import sys
+import threading
+import time
+from rsa_keygen import client_public_key
+
+# Headless end-to-end load test: payer -> machine -> bank through the real socket code.
+# Configured through the environment; with LOAD_SPAWN=1 (the default) it starts a bank
+# (BANK_STORAGE, default memory) and a multi-terminal machine on localhost.
+USERS = int(os.environ.get("LOAD_USERS", 50))
+MERCHANTS = int(os.environ.get("LOAD_MERCHANTS", 5))
+PAYMENTS = int(os.environ.get("LOAD_PAYMENTS", 2000))
+CONCURRENCY = int(os.environ.get("LOAD_CONCURRENCY", 16))
+RATE = float(os.environ.get("LOAD_RATE", 0))  # payments/s; 0 runs closed-loop at CONCURRENCY
+SPAWN = os.environ.get("LOAD_SPAWN", "1") == "1"
+MAX_P99_MS = float(os.environ.get("LOAD_MAX_P99_MS", 0))  # fail the run above this end-to-end p99
+INITIAL_BALANCE = 10 ** 9
+PUBLIC_KEY = client_public_key()
+STAGES = ("encrypt", "session", "machine_hop", "bank_hop", "decrypt", "validate", "persist", "chain", "total")
+
+if SPAWN:
+    # Must be set before user_socket is imported, which reads the addresses
+    os.environ.update(BANK_HOST="127.0.0.1", BANK_PORT=os.environ.get("LOAD_BANK_PORT", "5700"),
+                      MACHINE_HOST="127.0.0.1", MACHINE_PORT=os.environ.get("LOAD_MACHINE_PORT", "5701"))
+
+import user_socket
+from user_socket import connect_to_bank, connect_to_machine, encrypt, send_request
+
+def wait_for(address):
+    for _ in range(200):
+        try:
+            user_socket.socket.create_connection(address).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"Nothing is listening on {address}")
+
+def start_servers():
+    env = dict(os.environ, BANK_STORAGE=os.environ.get("BANK_STORAGE", "memory"), BANK_BACKLOG="1024",
+               MACHINE_SERVER="multi", BANK_POOL_SIZE=str(max(CONCURRENCY, 8)))
+    here = os.path.dirname(os.path.abspath(__file__))
+    servers = [subprocess.Popen([sys.executable, "bank_socket.py"], env=env, cwd=here, stdout=subprocess.DEVNULL)]
+    wait_for(user_socket.BANK_ADDRESS)
+    servers.append(subprocess.Popen([sys.executable, "machine_socket.py"], env=env, cwd=here,
+                                    stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL))
+    wait_for(user_socket.MACHINE_ADDRESS)
+    return servers
+
+def register_accounts():
+    bank = connect_to_bank()
+    ifsc = "SBIN0001234"
+    users = []
+    for i in range(USERS):
+        response = send_request(bank, {'type': 'register_user', 'name': f"load{i}", 'ifsc': ifsc, 'password': "load",
+                                       'pin': f"{i % 10000:04d}", 'mobile': f"9{i:09d}", 'balance': str(INITIAL_BALANCE)})
+        if response['status'] != 'success':
+            raise RuntimeError(f"Could not register a user: {response['message']}")
+        users.append((response['mmid'], f"{i % 10000:04d}"))
+    merchants = []
+    for i in range(MERCHANTS):
+        response = send_request(bank, {'type': 'register_merchant', 'name': f"shop{i}", 'ifsc': ifsc,
+                                       'password': "load", 'balance': "0"})
+        if response['status'] != 'success':
+            raise RuntimeError(f"Could not register a merchant: {response['message']}")
+        merchants.append(response['mid'])
+    bank.close()
+    return users, merchants
+
+class LoadRun:
+    def __init__(self, users, merchants):
+        self.users = users
+        self.merchants = merchants
+        self.next_payment = itertools.count()
+        self.samples = {stage: [] for stage in STAGES}
+        self.errors = {}
+        self.lock = threading.Lock()
+
+    def record(self, sample, error=None):
+        with self.lock:
+            if error is not None:
+                self.errors[error] = self.errors.get(error, 0) + 1
+                return
+            for stage, ms in sample.items():
+                self.samples[stage].append(ms)
+
+    def worker(self, start):
+        machine = connect_to_machine()
+        while True:
+            i = next(self.next_payment)
+            if i >= PAYMENTS:
+                break
+            due = start + i / RATE if RATE else time.perf_counter()
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            mmid, pin = self.users[i % len(self.users)]
+            mid = self.merchants[i % len(self.merchants)]
+            try:
+                t0 = time.perf_counter()
+                session = send_request(machine, {'type': 'create_session', 'mid': mid, 'name': "load"})
+                t1 = time.perf_counter()
+                request = {
+                    'type': 'transaction',
+                    'session': session['session'],
+                    'encrypted_sender_mmid': encrypt(mmid, PUBLIC_KEY),
+                    'encrypted_sender_pin': encrypt(pin, PUBLIC_KEY),
+                    'encrypted_receiver_mid': session['vmid'],
+                    'amount': 1,
+                    'trace': True
+                }
+                t2 = time.perf_counter()
+                response = send_request(machine, request)
+                t3 = time.perf_counter()
+            except Exception as e:
+                self.record(None, str(e))
+                continue
+            if response['status'] != 'success':
+                self.record(None, response['message'])
+                continue
+            timings = response.get('timings', {})
+            sample = {stage: timings[stage] for stage in ("bank_hop", "decrypt", "validate", "persist", "chain")
+                      if stage in timings}
+            sample['session'] = (t1 - t0) * 1000
+            sample['encrypt'] = (t2 - t1) * 1000
+            sample['machine_hop'] = (t3 - t2) * 1000 - timings.get('bank_hop', 0)
+            # Measured from the scheduled time in rate mode, so a backed-up run cannot hide its queueing
+            sample['total'] = (t3 - min(due, t0)) * 1000
+            self.record(sample)
+        machine.close()
+
+    def run(self):
+        start = time.perf_counter()
+        threads = [threading.Thread(target=self.worker, args=(start,)) for _ in range(CONCURRENCY)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - start
+
+def replay_check(users, merchants):
+    # A paid VMID must not pay again, with its session token or without one (the bank alone would accept it)
+    machine = connect_to_machine()
+    mmid, pin = users[0]
+    session = send_request(machine, {'type': 'create_session', 'mid': merchants[0], 'name': "replay"})
+    payment = {'type': 'transaction', 'encrypted_sender_mmid': encrypt(mmid, PUBLIC_KEY),
+               'encrypted_sender_pin': encrypt(pin, PUBLIC_KEY), 'encrypted_receiver_mid': session['vmid'], 'amount': 1}
+    failures = []
+    first = send_request(machine, dict(payment, session=session['session']))
+    if first['status'] != 'success':
+        failures.append(f"first payment failed: {first['message']}")
+    for label, replay in (("with its session", dict(payment, session=session['session'])), ("by VMID alone", payment)):
+        response = send_request(machine, replay)
+        if response['status'] == 'success':
+            failures.append(f"replay {label} was accepted")
+    machine.close()
+    return failures
+
+def percentile(sorted_values, p):
+    # Nearest-rank percentile
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[int(rank) - 1]
+
+def report(run, elapsed):
+    completed = len(run.samples['total'])
+    print(f"{completed} payments in {elapsed:.2f}s = {completed / elapsed:.1f} payments/s "
+          f"({CONCURRENCY} workers{f', target {RATE:g}/s' if RATE else ''})")
+    print(f"{'stage':>12} {'count':>7} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for stage in STAGES:
+        values = sorted(run.samples[stage])
+        if not values:
+            continue
+        print(f"{stage:>12} {len(values):>7} {sum(values) / len(values):>9.3f} {percentile(values, 50):>9.3f} "
+              f"{percentile(values, 95):>9.3f} {percentile(values, 99):>9.3f}")
+    for error, count in sorted(run.errors.items(), key=lambda item: -item[1]):
+        print(f"error x{count}: {error}")
+    return percentile(sorted(run.samples['total']), 99)
+
+if __name__ == "__main__":
+    servers = start_servers() if SPAWN else []
+    try:
+        users, merchants = register_accounts()
+        run = LoadRun(users, merchants)
+        p99 = report(run, run.run())
+        replay_failures = replay_check(users, merchants)
+        for failure in replay_failures:
+            print(f"replay check: {failure}")
+    finally:
+        for server in servers:
+            server.kill()
+            server.wait()
+    if run.errors or replay_failures or (MAX_P99_MS and p99 > MAX_P99_MS):
+        sys.exit(1)
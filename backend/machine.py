@@ -1,34 +1,20 @@
 import qrcode
 from PIL import Image
 import os
+from speck import cipher_for
 
 class Machine:
     def __init__(self):
         self.merchant_qr_codes = {}
         self.speck_key = 0x1918111009080100
+        self.cipher = cipher_for(self.speck_key)
         self.qr_dir = os.path.join(os.path.dirname(__file__), 'qr_codes')
         if not os.path.exists(self.qr_dir):
             os.makedirs(self.qr_dir)
 
-    def _speck_encrypt(self, plaintext, key):
-        x = (plaintext >> 16) & 0xFFFF
-        y = plaintext & 0xFFFF
-        k = [key & 0xFFFF, (key >> 16) & 0xFFFF, (key >> 32) & 0xFFFF, (key >> 48) & 0xFFFF]
-        for i in range(22):
-            x = (x >> 7 | x << 9) & 0xFFFF
-            x = (x + y) & 0xFFFF
-            x = x ^ k[i % 4]
-            y = (y << 2 | y >> 14) & 0xFFFF
-            y = y ^ x
-        return (x << 16) | y
-
     def encrypt_mid(self, data):
         data_int = int(data, 16)  # Assumes data is a 16-character hex string
-        block1 = (data_int >> 32) & 0xFFFFFFFF
-        block2 = data_int & 0xFFFFFFFF
-        enc_block1 = self._speck_encrypt(block1, self.speck_key)
-        enc_block2 = self._speck_encrypt(block2, self.speck_key)
-        return format((enc_block1 << 32) | enc_block2, '016x')
+        return format(self.cipher.encrypt64(data_int), '016x')
 
     def makeQR(self, mid, name):
         encrypted_mid = self.encrypt_mid(mid)
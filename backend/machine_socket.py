@@ -1,47 +1,38 @@
 import socket
 import threading
-import json
-import qrcode
 import os
 import datetime
+import time
+from bank_pool import BankConnectionPool
+from framing import ConnectionClosed, hello_response, recv_frame, send_frame, set_codec
+from payment_sessions import UNKNOWN_SESSION, SessionTable
+from speck import SPECK_KEY, cipher_for
 
-def connect_to_bank():
-    client = socket.socket()
-    client.connect(('172.16.122.54', 5000))  # Bank's IP
-    return client
+try:
+    import qrcode
+except ImportError:  # the headless server hands out VMIDs instead of QR images
+    qrcode = None
 
-def send_request(client, request):
-    client.send(json.dumps(request).encode('utf-8'))
-    response = client.recv(1024).decode('utf-8')
+BANK_ADDRESS = (os.environ.get("BANK_HOST", "172.16.122.54"), int(os.environ.get("BANK_PORT", 5000)))  # Bank's IP
+# Warm connections shared by every payment session; nothing connects until the first request
+bank_pool = BankConnectionPool(BANK_ADDRESS, size=int(os.environ.get("BANK_POOL_SIZE", 8)))
+MACHINE_HOST = os.environ.get("MACHINE_HOST", "172.16.122.54")  # Machine IP
+MACHINE_PORT = int(os.environ.get("MACHINE_PORT", 5001))
+PAYER_IDLE_TIMEOUT = float(os.environ.get("MACHINE_IDLE_TIMEOUT", 120))
+# VMIDs stay refused for as long as the bank would accept them (its VMID_WINDOW plus VMID_SKEW)
+sessions = SessionTable(timeout=float(os.environ.get("MACHINE_SESSION_TIMEOUT", 300)),
+                        vmid_window=int(os.environ.get("VMID_WINDOW", 120)) + int(os.environ.get("VMID_SKEW", 5)))
+speck_cipher = cipher_for(SPECK_KEY)
+
+def send_request(request):
     try:
-        return json.loads(response)
-    except json.JSONDecodeError:
+        return bank_pool.request(request)
+    except (ConnectionClosed, ValueError):
         print("Error: Invalid response from server")
         return {'status': 'error', 'message': 'Invalid server response'}
-
-def speck_encrypt(plaintext, key):
-    x = (plaintext >> 16) & 0xFFFF
-    y = plaintext & 0xFFFF
-    k = [key & 0xFFFF, (key >> 16) & 0xFFFF, (key >> 32) & 0xFFFF, (key >> 48) & 0xFFFF]
-    for i in range(22):
-        x = (x >> 7 | x << 9) & 0xFFFF
-        x = (x + y) & 0xFFFF
-        x = x ^ k[i % 4]
-        y = (y << 2 | y >> 14) & 0xFFFF
-        y = y ^ x
-    return (x << 16) | y
-
-def speck_decrypt(ciphertext, key):
-    x = (ciphertext >> 16) & 0xFFFF
-    y = ciphertext & 0xFFFF
-    k = [key & 0xFFFF, (key >> 16) & 0xFFFF, (key >> 32) & 0xFFFF, (key >> 48) & 0xFFFF]
-    for i in range(21, -1, -1):
-        y = y ^ x
-        y = (y >> 2 | y << 14) & 0xFFFF
-        x = x ^ k[i % 4]
-        x = (x - y) & 0xFFFF
-        x = (x << 7 | x >> 9) & 0xFFFF
-    return (x << 16) | y
+    except OSError as e:
+        print(f"Error: Bank unreachable: {e}")
+        return {'status': 'error', 'message': 'Bank unreachable'}
 
 def encrypt_mid(data):
     current_datetime = datetime.datetime.now()
@@ -49,23 +40,13 @@ def encrypt_mid(data):
     datetime_int = int(datetime_str, 10)
     data_int = int(data, 16)
     combined_data = (data_int ^ datetime_int) & 0xFFFFFFFFFFFFFFFF
-    speck_key = 0x1918111009080100
-    block1 = (combined_data >> 32) & 0xFFFFFFFF
-    block2 = combined_data & 0xFFFFFFFF
-    enc_block1 = speck_encrypt(block1, speck_key)
-    enc_block2 = speck_encrypt(block2, speck_key)
-    encrypted_result = (enc_block1 << 32) | enc_block2
+    encrypted_result = speck_cipher.encrypt64(combined_data)
     return format(encrypted_result, '016x'), datetime_str
 
 def decrypt_mid(encrypted_mid, timestamp):
     try:
         enc_int = int(encrypted_mid, 16)
-        speck_key = 0x1918111009080100
-        block1 = (enc_int >> 32) & 0xFFFFFFFF
-        block2 = enc_int & 0xFFFFFFFF
-        dec_block1 = speck_decrypt(block1, speck_key)
-        dec_block2 = speck_decrypt(block2, speck_key)
-        decrypted_int = (dec_block1 << 32) | dec_block2
+        decrypted_int = speck_cipher.decrypt64(enc_int)
         timestamp_int = int(timestamp, 10)
         original_mid = (decrypted_int ^ timestamp_int) & 0xFFFFFFFFFFFFFFFF
         return format(original_mid, '016x')
@@ -74,6 +55,8 @@ def decrypt_mid(encrypted_mid, timestamp):
         return None
 
 def makeQR(mid, name):
+    if qrcode is None:
+        raise ImportError("qrcode is required to generate QR images")
     encrypted_mid, timestamp = encrypt_mid(mid)
     print(f"VMID is {encrypted_mid}")
     qr = qrcode.QRCode(version=1, error_correction=qrcode.constants.ERROR_CORRECT_L, box_size=10, border=4)
@@ -84,15 +67,19 @@ def makeQR(mid, name):
     qr_img = qr.make_image(fill_color="black", back_color="white")
     qr_path = os.path.join(qr_dir, f"merchant_{name}_{mid}_qr.png")
     qr_img.save(qr_path)
-    return qr_path, timestamp
+    return qr_path, encrypted_mid, timestamp
 
 def generate_qr(mid, name):
-    qr_path, timestamp = makeQR(mid, name)
+    qr_path, encrypted_mid, timestamp = makeQR(mid, name)
     print(f"QR code generated for {mid}")
-    return qr_path, timestamp 
+    return qr_path, encrypted_mid, timestamp
+
+def open_session(mid, name):
+    # Headless counterpart of generate_qr: the merchant's terminal renders the VMID itself
+    encrypted_mid, timestamp = encrypt_mid(mid)
+    return sessions.create(mid, name, encrypted_mid, timestamp)
 
 def register_merchant():
-    client = connect_to_bank()
     name = input("Enter the merchant's name: ")
     isfc = input("Enter the bank's ISFC code: ")
     password = input("Enter your account's password: ")
@@ -104,80 +91,154 @@ def register_merchant():
         'password': password,
         'balance': balance
     }
-    response = send_request(client, request)
+    response = send_request(request)
     if response['status'] == 'success':
         new_mid = response['mid']
         print(f"Merchant registered with MID: {new_mid}\n")
     else:
         print(f"Failed to register: {response['message']}")
-    client.close()
-    
-def get_merchant_balance(client):
+
+def get_merchant_balance():
     mid = input("Enter the VMID from the QR code: ")
     request = {
         'type': 'get_balance_merchant',
         'mid': mid
     }
-    response = send_request(client, request)
+    response = send_request(request)
     if response['status'] == 'success':
         print(f"Balance left = {response['balance']}")
     else:
         print(f"{response['message']}")
 
-def handle_client(client_socket, address, time):
-    bank_client = connect_to_bank()
+def pay_without_session(request):
+    # A QR code this machine never issued: the bank resolves the VMID itself (see vmid_verifier)
+    bank_request = {
+        'type': 'transaction',
+        'encrypted_sender_mmid': request['encrypted_sender_mmid'],
+        'encrypted_sender_pin': request['encrypted_sender_pin'],
+        'encrypted_receiver_mid': request['encrypted_receiver_mid'],
+        'amount': request['amount']
+    }
+    start = time.perf_counter()
+    result = send_request(bank_request)
+    sessions.record_payment(result['status'] == 'success', time.perf_counter() - start)
+    return result
+
+def pay(request):
+    # Routes a payer's transaction to its QR session and forwards it to the bank
+    session, error = sessions.claim(request.get('session'), vmid=request['encrypted_receiver_mid'])
+    if error is not None:
+        if request.get('session') is None and error == UNKNOWN_SESSION:
+            return pay_without_session(request)
+        return {'status': 'error', 'message': error}
+    success, bank_time = False, 0.0
+    try:
+        receiver_mid = decrypt_mid(request['encrypted_receiver_mid'], session.timestamp)
+        if receiver_mid != session.mid:
+            return {'status': 'error', 'message': 'Invalid QR code'}
+        bank_request = {
+            'type': 'transaction',
+            'encrypted_sender_mmid': request['encrypted_sender_mmid'],
+            'encrypted_sender_pin': request['encrypted_sender_pin'],
+            'receiver_mid': receiver_mid,
+            'amount': request['amount']
+        }
+        if request.get('trace'):
+            bank_request['trace'] = True
+        start = time.perf_counter()
+        result = send_request(bank_request)
+        bank_time = time.perf_counter() - start
+        if request.get('trace'):
+            result.setdefault('timings', {})['bank_hop'] = round(bank_time * 1000, 3)
+        success = result['status'] == 'success'
+        if success:
+            print(f"Transaction Successful for {session.name}\n")
+        else:
+            print(f"Transaction Failed: {result['message']}\n")
+        return result
+    finally:
+        sessions.finish(session, success, bank_time)
+
+def handle_request(request):
+    if request['type'] == 'transaction':
+        return pay(request)
+    if request['type'] == 'create_session':
+        session = open_session(request['mid'], request.get('name', ''))
+        return {'status': 'success', 'session': session.token, 'vmid': session.vmid,
+                'expires_in': round(session.expires_at - time.monotonic())}
+    if request['type'] == 'metrics':
+        return {'status': 'success', 'metrics': sessions.metrics()}
+    return {'status': 'error', 'message': f"Unknown request type {request.get('type')}"}
+
+def handle_client(client_socket, address):
+    # One payer terminal; it may pay any number of open sessions over this connection
+    client_socket.settimeout(PAYER_IDLE_TIMEOUT)
     while True:
-        data = client_socket.recv(1024).decode('utf-8')
-        if not data:
+        try:
+            request_id, request = recv_frame(client_socket)
+        except (OSError, ValueError) as e:
+            print(f"Error with {address}: {e}")
+            break
+        if request is None:
             break
         try:
-            request = json.loads(data)
-            if request['type'] == 'transaction':
-                receiver_mid = decrypt_mid(request['encrypted_receiver_mid'], time)
-                if receiver_mid is None:
-                    client_socket.send(json.dumps({'status': 'error', 'message': 'Invalid QR code'}).encode('utf-8'))
-                    break
-                bank_request = {
-                    'type': 'transaction',
-                    'encrypted_sender_mmid': request['encrypted_sender_mmid'],
-                    'encrypted_sender_pin': request['encrypted_sender_pin'],
-                    'receiver_mid': receiver_mid,
-                    'amount': request['amount']
-                }
-                result = send_request(bank_client, bank_request)
-                client_socket.send(json.dumps(result).encode('utf-8'))
-                if result['status'] == 'success':
-                    print("Transaction Successful\n")
-                    bank_client.close()
-                    client_socket.close()
-                    break
-                else:
-                    print(f"Transaction Failed: {result['message']}\n")
+            if request['type'] == 'hello':
+                response, codec = hello_response(request)
+                send_frame(client_socket, request_id, response)
+                set_codec(client_socket, codec)
+                continue
+            response = handle_request(request)
         except Exception as e:
             print(f"Error handling client: {e}")
-            client_socket.send(json.dumps({'status': 'error', 'message': str(e)}).encode('utf-8'))
+            response = {'status': 'error', 'message': str(e)}
+        try:
+            send_frame(client_socket, request_id, response)
+        except OSError as e:
+            print(f"Error with {address}: {e}")
             break
     client_socket.close()
 
+def start_machine_server(host=MACHINE_HOST, port=MACHINE_PORT, backlog=128, report_interval=10):
+    # Serves many payers and QR sessions at once; sessions come from 'create_session' requests
+    server = socket.socket()
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind((host, port))
+    server.listen(backlog)
+    threading.Thread(target=sessions.run_reaper, args=(report_interval,), daemon=True).start()
+    print("Merchant server is running")
+
+    while True:
+        client_socket, address = server.accept()
+        thread = threading.Thread(target=handle_client, args=(client_socket, address), daemon=True)
+        thread.start()
+
 def forward_transaction():
     server = socket.socket()
-    server.bind(('172.16.122.54', 5001))  # Machine IP
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind((MACHINE_HOST, MACHINE_PORT))
     server.listen(5)
     print("Merchant server is running")
     mid = input("Enter Merchant's MID: ")
     name = input("Enter merchant's name: ")
-    qr_path, time = generate_qr(mid, name)
+    qr_path, encrypted_mid, timestamp = generate_qr(mid, name)
+    sessions.create(mid, name, encrypted_mid, timestamp)
     print(f"QR generated in the qr_codes folder\n")
     client_socket, address = server.accept()
-    handle_client(client_socket, address, time)
-
-while True:
-    func = int(input("Type 1 to register a merchant\nType 2 to initiate a transaction\nType 3 to turn the server off: "))
-    if func == 1:
-        register_merchant()
-    elif func == 2:
-        forward_transaction()
-    elif func == 3:
-        break
+    server.close()
+    handle_client(client_socket, address)
+
+if __name__ == "__main__":
+    # MACHINE_SERVER=multi runs a long-lived server for many terminals without reading stdin
+    if os.environ.get("MACHINE_SERVER") == "multi":
+        start_machine_server(report_interval=float(os.environ.get("MACHINE_REPORT_INTERVAL", 10)))
     else:
-        print("Please enter 1, 2, or 3\n")
\ No newline at end of file
+        while True:
+            func = int(input("Type 1 to register a merchant\nType 2 to initiate a transaction\nType 3 to turn the server off: "))
+            if func == 1:
+                register_merchant()
+            elif func == 2:
+                forward_transaction()
+            elif func == 3:
+                break
+            else:
+                print("Please enter 1, 2, or 3\n")
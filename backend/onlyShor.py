@@ -1,5 +1,6 @@
 import random
 import math
+from order_finding import find_order
 
 def gcd(a, b):
     while b:
@@ -16,20 +17,18 @@ def modular_exponentiation(base, exponent, modulus):
         exponent >>= 1
     return result
 
-def find_period(a, N):
-    for r in range(1, N):
-        if modular_exponentiation(a, r, N) == 1:
-            return r
-    return None
+def find_period(a, N, method="scan"):
+    # method: "scan" (multiply by a until 1) or "bsgs" (baby-step giant-step), see order_finding
+    return find_order(a, N, method)
 
-def shors_algorithm(N):
+def shors_algorithm(N, order_method="scan"):
     if N % 2 == 0:
         return 2, N // 2
     a = random.randrange(2, N)
     d = gcd(a, N)
     if d > 1:
         return d, N // d
-    r = find_period(a, N)
+    r = find_period(a, N, order_method)
     if r and r % 2 == 0:
         r_half = r // 2
         if modular_exponentiation(a, r_half, N) != N - 1:
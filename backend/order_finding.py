@@ -0,0 +1,61 @@
+from math import gcd, isqrt
+
+# Order finding for the classical Shor simulations: the smallest r > 0 with
+# a^r = 1 (mod n). Both methods return None when gcd(a, n) != 1, since then
+# no such r exists.
+
+def order_scan(a, n, limit=None):
+    # Multiplies by a until the value returns to 1: r multiplications, O(1) memory
+    if n < 2 or gcd(a, n) != 1:
+        return None
+    a %= n
+    value = a
+    r = 1
+    limit = limit or n
+    while value != 1:
+        value = value * a % n
+        r += 1
+        if r > limit:
+            return None
+    return r
+
+def order_bsgs(a, n):
+    """
+    Baby-step giant-step: with m = ceil(sqrt(n)), every r < n is i*m + j with
+    0 <= j < m, and a^r = 1 exactly when a^j = a^(-i*m). The baby steps store
+    a^j for each j, keeping the smallest j per value; the giant steps then walk
+    i upwards, so the first hit is the smallest r. O(sqrt(n)) time and memory.
+    """
+    if n < 2 or gcd(a, n) != 1:
+        return None
+    a %= n
+    if n == 2 or a == 1:
+        return 1
+    m = isqrt(n - 1) + 1
+    baby = {}
+    value = 1
+    for j in range(m):
+        if j and value == 1:
+            return j  # the order is below m; found during the baby steps
+        baby.setdefault(value, j)
+        value = value * a % n
+    giant = pow(a, -m, n)  # a^(-m)
+    gamma = 1
+    for i in range(1, m + 1):
+        gamma = gamma * giant % n
+        j = baby.get(gamma)
+        if j is not None:
+            return i * m + j
+    return None
+
+ORDER_METHODS = {
+    "scan": order_scan,
+    "bsgs": order_bsgs,
+}
+
+def find_order(a, n, method="scan"):
+    try:
+        finder = ORDER_METHODS[method]
+    except KeyError:
+        raise ValueError(f"Unknown order-finding method {method!r}; use one of {', '.join(ORDER_METHODS)}")
+    return finder(a, n)
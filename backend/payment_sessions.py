@@ -0,0 +1,130 @@
+import secrets
+import threading
+import time
+
+UNKNOWN_SESSION = 'Unknown or finished payment session'
+USED_VMID = 'This QR code was already used or has expired'
+
+class PaymentSession:
+    def __init__(self, token, mid, name, vmid, timestamp, expires_at):
+        self.token = token
+        self.mid = mid
+        self.name = name
+        self.vmid = vmid
+        self.timestamp = timestamp  # the VMID was derived from this; needed to decrypt it
+        self.expires_at = expires_at
+        self.in_flight = False
+        self.completed = False
+
+class SessionTable:
+    """
+    Active QR sessions of a payment machine. A session is created per QR code
+    and found by its token, or by its VMID for payers that only know the QR
+    contents. Like the single-payer flow, a session ends with its first
+    successful payment; unpaid sessions expire timeout seconds after creation.
+    claim() lets only one payment per session be in flight at a time. Every
+    VMID the table issued is remembered until the bank would reject it anyway
+    (vmid_window seconds, or the session timeout if longer), so a VMID whose
+    session is gone is refused rather than mistaken for another machine's. The
+    table also keeps the counters behind the machine's throughput metrics.
+    """
+
+    def __init__(self, timeout=300, vmid_window=125):
+        self.timeout = timeout
+        self.vmid_window = vmid_window
+        self.sessions = {}  # token -> PaymentSession
+        self.by_vmid = {}  # vmid -> token
+        self.issued = {}  # vmid -> monotonic time until which it is remembered
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.counters = {'sessions_created': 0, 'sessions_expired': 0, 'payments_ok': 0, 'payments_failed': 0}
+        self.bank_time = 0.0  # seconds spent waiting on the bank, over all payments
+
+    def create(self, mid, name, vmid, timestamp, timeout=None):
+        token = secrets.token_hex(8)
+        now = time.monotonic()
+        session = PaymentSession(token, mid, name, vmid, timestamp,
+                                 now + (timeout if timeout is not None else self.timeout))
+        with self.lock:
+            self.sessions[token] = session
+            self.by_vmid[vmid] = token  # a later session for the same VMID takes over the lookup
+            self.issued[vmid] = max(self.issued.get(vmid, 0), session.expires_at, now + self.vmid_window)
+            self.counters['sessions_created'] += 1
+        return session
+
+    def _remove(self, session):
+        del self.sessions[session.token]
+        if self.by_vmid.get(session.vmid) == session.token:
+            del self.by_vmid[session.vmid]
+
+    def claim(self, token=None, vmid=None):
+        # Returns (session, error); the session stays claimed until finish()
+        with self.lock:
+            if token is None:
+                token = self.by_vmid.get(vmid)
+            session = self.sessions.get(token)
+            if session is None:
+                if token is None and self.issued.get(vmid, 0) > time.monotonic():
+                    return None, USED_VMID
+                return None, UNKNOWN_SESSION
+            if time.monotonic() >= session.expires_at:
+                self._remove(session)
+                self.counters['sessions_expired'] += 1
+                return None, 'Payment session expired'
+            if session.in_flight:
+                return None, 'A payment for this session is already in progress'
+            session.in_flight = True
+            return session, None
+
+    def finish(self, session, success, bank_time=0.0):
+        with self.lock:
+            session.in_flight = False
+            if success:
+                session.completed = True
+                self._remove(session)
+            self._count_payment(success, bank_time)
+
+    def record_payment(self, success, bank_time=0.0):
+        # For payments that did not go through a session
+        with self.lock:
+            self._count_payment(success, bank_time)
+
+    def _count_payment(self, success, bank_time):
+        self.bank_time += bank_time
+        self.counters['payments_ok' if success else 'payments_failed'] += 1
+
+    def expire(self):
+        now = time.monotonic()
+        with self.lock:
+            expired = [s for s in self.sessions.values() if now >= s.expires_at and not s.in_flight]
+            for session in expired:
+                self._remove(session)
+            self.counters['sessions_expired'] += len(expired)
+            for vmid in [vmid for vmid, until in self.issued.items() if now >= until]:
+                del self.issued[vmid]
+        return len(expired)
+
+    def metrics(self):
+        now = time.monotonic()
+        with self.lock:
+            metrics = dict(self.counters)
+            metrics['active_sessions'] = len(self.sessions)
+            payments = metrics['payments_ok'] + metrics['payments_failed']
+            metrics['avg_bank_ms'] = round(self.bank_time / payments * 1000, 2) if payments else 0.0
+            metrics['uptime_s'] = round(now - self.started, 1)
+            metrics['payments_per_s'] = round(metrics['payments_ok'] / max(now - self.started, 1e-9), 2)
+        return metrics
+
+    def run_reaper(self, interval=10, report=True):
+        # Expires idle sessions and prints throughput every interval seconds
+        last_ok = 0
+        while True:
+            time.sleep(interval)
+            self.expire()
+            if report:
+                metrics = self.metrics()
+                rate = (metrics['payments_ok'] - last_ok) / interval
+                last_ok = metrics['payments_ok']
+                print(f"Machine: {metrics['payments_ok']} paid, {metrics['payments_failed']} failed, "
+                      f"{metrics['active_sessions']} active sessions, {rate:.1f} payments/s, "
+                      f"bank {metrics['avg_bank_ms']} ms avg")
@@ -0,0 +1,57 @@
+import string
+
+class RSADecryptor:
+    """
+    Per-character RSA decryption for a fixed keypair. Keeps the CRT parameters
+    (dp, dq, qinv) for the key and, optionally, a codebook from the ciphertext of
+    every character in the alphabet back to that character, so the usual MMID/PIN
+    characters cost one dict lookup instead of a modular exponentiation.
+    """
+
+    def __init__(self, p, q, d=None, e=None, alphabet=string.printable):
+        self.p = p
+        self.q = q
+        self.n = p * q
+        phi = (p - 1) * (q - 1)
+        if d is None and e is None:
+            raise ValueError("Either d or e is required")
+        self.d = d if d is not None else pow(e, -1, phi)
+        self.e = e if e is not None else pow(self.d, -1, phi)
+        self.dp = self.d % (p - 1)
+        self.dq = self.d % (q - 1)
+        self.qinv = pow(q, -1, p)
+        self.codebook = {}
+        if alphabet:
+            self.codebook = {pow(ord(char), self.e, self.n): char for char in alphabet}
+
+    @property
+    def private_key(self):
+        return self.d, self.n
+
+    @property
+    def public_key(self):
+        return self.e, self.n
+
+    def decrypt_int(self, c):
+        m1 = pow(c, self.dp, self.p)
+        m2 = pow(c, self.dq, self.q)
+        h = (self.qinv * (m1 - m2)) % self.p
+        return m2 + h * self.q
+
+    def decrypt(self, cipher):
+        codebook = self.codebook
+        return ''.join([codebook.get(c) or chr(self.decrypt_int(c)) for c in cipher])
+
+    def decrypt_many(self, ciphers):
+        # Characters outside the codebook are decrypted once per call, not once per occurrence
+        codebook = dict(self.codebook)
+        result = []
+        for cipher in ciphers:
+            chars = []
+            for c in cipher:
+                char = codebook.get(c)
+                if char is None:
+                    char = codebook[c] = chr(self.decrypt_int(c))
+                chars.append(char)
+            result.append(''.join(chars))
+        return result
@@ -0,0 +1,201 @@
+import json
+import os
+import random
+import sys
+import time
+from math import gcd
+from factoring import small_primes
+
+try:
+    import gmpy2
+except ImportError:  # the builtin pow() is used instead, which is slower on large moduli
+    gmpy2 = None
+
+# RSA key generation and key files. Keys are dicts with the public key (e, n),
+# the private exponent d, the primes and the CRT parameters dp, dq and qinv
+# used by rsa_engine.RSADecryptor. The bank loads its private key from the file
+# named by BANK_RSA_KEY and clients their public key from RSA_PUBLIC_KEY (the
+# private key file works too; only e and n are read). Without them everything
+# falls back to the demo key p=127, q=257, which Shor's demo can still break.
+#
+# Nearly all the time goes to Miller-Rabin on sieve survivors, one modular
+# exponentiation each, and the number of survivors before a prime varies
+# widely. With the builtin pow(), 30 4096-bit keys took 4 s on average and
+# 0.7 s to 8.3 s each, and 2048-bit keys 0.2 s to 1 s; expect a slow outlier
+# now and then. When gmpy2 is installed (pip install gmpy2) powmod uses it.
+#
+#   python rsa_keygen.py 2048 bank_key.json public_key.json
+
+DEMO_KEY = {'e': 353, 'n': 32639, 'd': 6305, 'p': 127, 'q': 257}
+SIEVE_PRIMES = small_primes(1 << 16)[1:]  # odd primes only
+# Primes of at least WIDE_SIEVE_BITS bits are sieved with every prime below
+# WIDE_SIEVE_LIMIT, which leaves 30% fewer Miller-Rabin runs; below that size
+# the larger sieve costs more than the runs it saves
+WIDE_SIEVE_BITS = 1536
+WIDE_SIEVE_LIMIT = 1 << 20
+_wide_primes = None
+# Bases that make Miller-Rabin deterministic for every n below 3.3 * 10^24
+DETERMINISTIC_BASES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+DETERMINISTIC_LIMIT = 3317044064679887385961981
+
+def mr_rounds(bits):
+    # Random bases needed for a 2^-100 error on a random candidate (FIPS 186-4, table C.3)
+    if bits >= 1536:
+        return 3
+    if bits >= 1024:
+        return 4
+    if bits >= 512:
+        return 7
+    return 40
+
+def powmod(base, exponent, modulus):
+    if gmpy2 is not None:
+        return gmpy2.powmod(base, exponent, modulus)
+    return pow(base, exponent, modulus)
+
+def miller_rabin(n, bases):
+    # n odd and > 3; True when every base is a strong liar or n is prime
+    d = n - 1
+    s = (d & -d).bit_length() - 1
+    d >>= s
+    for a in bases:
+        x = powmod(a, d, n)
+        if x == 1 or x == n - 1:
+            continue
+        for _ in range(s - 1):
+            x = powmod(x, 2, n)
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+def is_probable_prime(n, rounds=None, rng=None):
+    """
+    Trial division by the primes below 2^16, then Miller-Rabin: deterministic
+    below 3.3 * 10^24, otherwise base 2 followed by random bases (mr_rounds of
+    them unless rounds is given).
+    """
+    if n < 2:
+        return False
+    for p in (2,) + SIEVE_PRIMES:
+        if n % p == 0:
+            return n == p
+        if p * p > n:
+            return True
+    return passes_miller_rabin(n, rounds, rng)
+
+def passes_miller_rabin(n, rounds=None, rng=None):
+    # For odd n without small factors; base 2 first, since most composites fail it
+    if n < DETERMINISTIC_LIMIT:
+        return miller_rabin(n, DETERMINISTIC_BASES)
+    rng = rng or random.SystemRandom()
+    rounds = rounds or mr_rounds(n.bit_length())
+    return miller_rabin(n, (2,)) and miller_rabin(n, [rng.randrange(3, n - 1) for _ in range(rounds)])
+
+def sieve_primes(bits):
+    # The odd primes random_prime sieves with; the wide list is built on first use
+    global _wide_primes
+    if bits < WIDE_SIEVE_BITS:
+        return SIEVE_PRIMES
+    if _wide_primes is None:
+        _wide_primes = small_primes(WIDE_SIEVE_LIMIT)[1:]
+    return _wide_primes
+
+def sieve_window(start, size, primes=SIEVE_PRIMES):
+    # marks[i] is 1 when start + 2i (start odd) has no factor in primes other than itself
+    marks = bytearray([1]) * size
+    for p in primes:
+        i = (p - start % p) * ((p + 1) // 2) % p  # start + 2i = 0 (mod p)
+        if start + 2 * i == p:
+            i += p
+        if i < size:
+            marks[i::p] = bytes(len(range(i, size, p)))
+    return marks
+
+def random_prime(bits, e=65537, rng=None):
+    """
+    A random prime of exactly bits bits with its top two bits set (so the
+    product of two has exactly twice the bits) and gcd(e, p - 1) = 1. Sieves
+    windows of 2 * bits odd numbers upward from a random start with every
+    prime below 2^16 (2^20 from WIDE_SIEVE_BITS), so Miller-Rabin only runs on
+    the one candidate in ten (thirteen) that survives. The search starts over
+    at a new random start only if it runs past bits bits.
+    """
+    if bits < 8:
+        raise ValueError("bits must be at least 8")
+    rng = rng or random.SystemRandom()
+    window = max(2 * bits, 64)
+    primes = sieve_primes(bits)
+    while True:
+        start = rng.getrandbits(bits) | (3 << (bits - 2)) | 1
+        while start.bit_length() == bits:
+            for i, survivor in enumerate(sieve_window(start, window, primes)):
+                candidate = start + 2 * i
+                if candidate.bit_length() > bits:
+                    break
+                if survivor and gcd(e, candidate - 1) == 1 and passes_miller_rabin(candidate, rng=rng):
+                    return candidate
+            start += 2 * window
+
+def key_from_primes(p, q, e=65537):
+    if p == q:
+        raise ValueError("p and q must differ")
+    p, q = max(p, q), min(p, q)
+    phi = (p - 1) * (q - 1)
+    d = pow(e, -1, phi)
+    return {'e': e, 'n': p * q, 'd': d, 'p': p, 'q': q,
+            'dp': d % (p - 1), 'dq': d % (q - 1), 'qinv': pow(q, -1, p)}
+
+def generate_keypair(bits=2048, e=65537, rng=None):
+    # A key whose modulus has exactly bits bits, with CRT parameters
+    if bits < 16:
+        raise ValueError("bits must be at least 16")
+    rng = rng or random.SystemRandom()
+    p = random_prime(bits - bits // 2, e, rng)
+    q = random_prime(bits // 2, e, rng)
+    while q == p:
+        q = random_prime(bits // 2, e, rng)
+    return key_from_primes(p, q, e)
+
+def save_key(path, key, public_only=False):
+    data = {'e': key['e'], 'n': key['n']} if public_only else key
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+        f.write("\n")
+
+def load_key(path):
+    # A private key file; d and the CRT parameters are recomputed from p, q and e
+    with open(path) as f:
+        stored = json.load(f)
+    key = key_from_primes(stored['p'], stored['q'], stored['e'])
+    if stored.get('n', key['n']) != key['n']:
+        raise ValueError(f"{path}: n is not p * q")
+    return key
+
+def load_public_key(path):
+    with open(path) as f:
+        key = json.load(f)
+    return key['e'], key['n']
+
+def bank_key():
+    # The bank's private key: BANK_RSA_KEY if set, else the demo key
+    path = os.environ.get("BANK_RSA_KEY")
+    return load_key(path) if path else key_from_primes(DEMO_KEY['p'], DEMO_KEY['q'], DEMO_KEY['e'])
+
+def client_public_key():
+    # The public key clients encrypt to: RSA_PUBLIC_KEY if set, else the demo key
+    path = os.environ.get("RSA_PUBLIC_KEY")
+    return load_public_key(path) if path else (DEMO_KEY['e'], DEMO_KEY['n'])
+
+if __name__ == "__main__":
+    bits = int(sys.argv[1]) if len(sys.argv) > 1 else 2048
+    start = time.perf_counter()
+    key = generate_keypair(bits)
+    print(f"{bits}-bit key generated in {(time.perf_counter() - start) * 1000:.0f} ms")
+    if len(sys.argv) > 2:
+        save_key(sys.argv[2], key)
+        print(f"private key (with CRT parameters) written to {sys.argv[2]}")
+    if len(sys.argv) > 3:
+        save_key(sys.argv[3], key, public_only=True)
+        print(f"public key written to {sys.argv[3]}")
@@ -1,16 +1,25 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory
 from flask_cors import CORS
 from bank import Bank
 from machine import Machine
 from user import User
 from merchant import Merchant
+from ledger_verifier import LedgerVerifier
 import os
+import json
+import threading
 
 app = Flask(__name__, static_folder='static')  # Set static folder
 CORS(app)  # Allow cross-origin requests
 
 shared_bank = Bank()
 upi_machine = Machine(shared_bank)
+# Checkpoints are signed with LEDGER_CHECKPOINT_KEY; without it the ledger endpoints are disabled
+ledger_verifier = LedgerVerifier(shared_bank.storage) if os.environ.get("LEDGER_CHECKPOINT_KEY") else None
+if ledger_verifier is not None:
+    # Verification runs off the request path; a cold start can take a full ledger scan
+    threading.Thread(target=ledger_verifier.run, args=(float(os.environ.get("LEDGER_VERIFY_INTERVAL", 5)),),
+                     daemon=True).start()
 
 @app.route('/api/user/create', methods=['POST'])
 def create_user():
@@ -54,17 +63,66 @@ def merchant_balance():
         return jsonify({"message": f"Current Balance: {shared_bank.merchants[mid]['Balance']}"})
     return jsonify({"message": "Merchant not found"})
 
+MAX_BLOCKS_PAGE = 1000
+
+def format_block(block):
+    # Rename fields to match frontend expectation; Hash is what cursor/since take
+    block['Hash'] = str(block.pop('_id'))
+    block['SenderMMID'] = block.pop('Sender MMID')
+    block['ReceiverMID'] = block.pop('Receiver MID')
+    return block
+
+def stream_json_array(blocks):
+    yield '['
+    for i, block in enumerate(blocks):
+        yield (',' if i else '') + json.dumps(format_block(block))
+    yield ']'
+
 @app.route('/api/bank/blockchain', methods=['GET'])
 def blockchain():
-    blocks = list(shared_bank.blockchain.find())
-    for block in blocks:
-        block['_id'] = str(block['_id'])  # Convert ObjectId to string
-        block.pop('_id', None)  # Remove MongoDB ObjectId
-        # Rename fields to match frontend expectation
-        block['SenderMMID'] = block.pop('Sender MMID')
-        block['ReceiverMID'] = block.pop('Receiver MID')
-        block['Amount'] = block['Amount']
-    return jsonify(blocks)
+    # ?cursor=<hash> or ?since=<hash>: only blocks after that block
+    # ?limit=N: one page as {"blocks": [...], "next_cursor": <hash or null>}
+    # ?format=ndjson: one block per line
+    # Blocks are streamed from a storage cursor, so memory stays bounded by the page
+    after_hash = request.args.get('cursor') or request.args.get('since')
+    after = None
+    if after_hash:
+        after = shared_bank.storage.find_block(after_hash)
+        if after is None:
+            return jsonify({"message": "Unknown block"}), 404
+    limit = request.args.get('limit', type=int)
+    if limit is not None:
+        limit = max(1, min(limit, MAX_BLOCKS_PAGE))
+    blocks = shared_bank.storage.find_blocks(after, limit or 0)
+
+    if request.args.get('format') == 'ndjson':
+        return Response((json.dumps(format_block(block)) + '\n' for block in blocks), mimetype='application/x-ndjson')
+    if limit is not None:
+        page = [format_block(block) for block in blocks]
+        return jsonify({"blocks": page, "next_cursor": page[-1]['Hash'] if len(page) == limit else None})
+    return Response(stream_json_array(blocks), mimetype='application/json')
+
+@app.route('/api/bank/ledger/verify', methods=['GET'])
+def verify_ledger():
+    # Checks only the blocks added since the last verified block
+    if ledger_verifier is None:
+        return jsonify({"message": "Ledger verification needs LEDGER_CHECKPOINT_KEY"}), 503
+    verified, error = ledger_verifier.verify_new_blocks()
+    checkpoint = ledger_verifier.checkpoints[-1] if ledger_verifier.checkpoints else None
+    return jsonify({"verified": verified, "height": len(ledger_verifier.tree), "error": error,
+                    "root": ledger_verifier.tree.root().hex(), "checkpoint": checkpoint}), 200 if error is None else 409
+
+@app.route('/api/bank/ledger/proof/<tx_id>', methods=['GET'])
+def ledger_proof(tx_id):
+    if ledger_verifier is None:
+        return jsonify({"message": "Ledger verification needs LEDGER_CHECKPOINT_KEY"}), 503
+    # Served from the tree the background verifier maintains; never scans the ledger here
+    proof = ledger_verifier.inclusion_proof(tx_id)
+    if proof is None:
+        if not ledger_verifier.caught_up():
+            return jsonify({"message": "Ledger verification is catching up; try again shortly"}), 503
+        return jsonify({"message": "Transaction not found in verified ledger"}), 404
+    return jsonify(proof)
 
 # Serve static files (QR images)
 @app.route('/static/<path:filename>')
@@ -1,5 +1,8 @@
 import random
 from math import gcd
+from key_cache import default_cache
+from order_finding import find_order
+from rsa_keygen import DEMO_KEY, generate_keypair, is_probable_prime, key_from_primes
 
 def modular_exponentiation(base, exponent, modulus):
     result = 1
@@ -11,20 +14,18 @@ def modular_exponentiation(base, exponent, modulus):
         exponent >>= 1
     return result
 
-def find_period(a, N):
-    for r in range(1, N):
-        if modular_exponentiation(a, r, N) == 1:
-            return r
-    return None
+def find_period(a, N, method="scan"):
+    # method: "scan" (multiply by a until 1) or "bsgs" (baby-step giant-step), see order_finding
+    return find_order(a, N, method)
 
-def shors_algorithm(N):
+def shors_algorithm(N, order_method="scan"):
     if N % 2 == 0:
         return 2, N // 2
     a = random.randrange(2, N)
     d = gcd(a, N)
     if d > 1:
         return d, N // d
-    r = find_period(a, N)
+    r = find_period(a, N, order_method)
     if r and r % 2 == 0:
         r_half = r // 2
         if modular_exponentiation(a, r_half, N) != N - 1:
@@ -35,18 +36,8 @@ def shors_algorithm(N):
     return None, None
 
 def is_prime(n):
-    if n <= 1:
-        return False
-    if n <= 3:
-        return True
-    if n % 2 == 0 or n % 3 == 0:
-        return False
-    i = 5
-    while i * i <= n:
-        if n % i == 0 or n % (i + 2) == 0:
-            return False
-        i += 6
-    return True
+    # Miller-Rabin (see rsa_keygen); trial division does not scale past a few dozen bits
+    return is_probable_prime(n)
 
 def generate_prime(start=100, end=300):
     while True:
@@ -67,22 +58,12 @@ def mod_inverse(e, phi):
         raise Exception('Modular inverse does not exist')
     return x % phi
 
-def generate_keys():
-    p = 127
-    q = 257
-    while p == q:
-        q = generate_prime()
-    n = p * q
-    phi = (p - 1) * (q - 1)
-    e = generate_prime(3,phi-1)
-    print(f"p={p},q={q},n={n}")
-    if gcd(e, phi) != 1:
-        e = 3
-        while gcd(e, phi) != 1:
-            e += 2
-    d = mod_inverse(e, phi)
-    print(f"d={d}")
-    return (e, n), (d, n)
+def generate_keys(bits=None):
+    # The demo primes p=127, q=257 (small enough for the attacker) unless bits asks for a real key
+    key = generate_keypair(bits) if bits else key_from_primes(DEMO_KEY['p'], DEMO_KEY['q'], DEMO_KEY['e'])
+    print(f"p={key['p']},q={key['q']},n={key['n']}")
+    print(f"d={key['d']}")
+    return (key['e'], key['n']), (key['d'], key['n'])
 
 def encrypt(msg, pub_key):
     e, n = pub_key
@@ -92,11 +73,13 @@ def decrypt(cipher, priv_key):
     d, n = priv_key
     return ''.join([chr(pow(char, d, n)) for char in cipher])
 
-def attacker(public_key,ciphertext):
-    p,q = shors_algorithm(public_key[1])
-    phi = (p - 1) * (q - 1)
-    d=mod_inverse(public_key[0],phi)
-    key=d,p*q
+def attacker(public_key,ciphertext,order_method="scan"):
+    # Factors n only if this public key has not been broken before
+    entry = default_cache().recover(*public_key, lambda n: shors_algorithm(n, order_method))
+    if entry is None:
+        print("Failed to factorize modulus")
+        return
+    key=entry['d'],entry['n']
     decrypted=decrypt(ciphertext,key)
     print(f"Decrypted text by the attacker: {decrypted}")
 
@@ -0,0 +1,81 @@
+import multiprocessing
+import os
+import random
+import time
+from math import gcd
+from order_finding import find_order
+
+OUTCOMES = ("factored", "gcd", "odd period", "trivial root", "no factor", "no order")
+
+def try_base(n, a, order_method="bsgs"):
+    """One classical Shor round for base a. Returns (a, outcome, factors or None, period or None)."""
+    d = gcd(a, n)
+    if d > 1:
+        return a, "gcd", (d, n // d), None
+    r = find_order(a, n, order_method)
+    if r is None:
+        return a, "no order", None, None
+    if r % 2:
+        return a, "odd period", None, r
+    y = pow(a, r // 2, n)
+    if y == n - 1:
+        return a, "trivial root", None, r
+    for candidate in (gcd(y - 1, n), gcd(y + 1, n)):
+        if 1 < candidate < n:
+            return a, "factored", (candidate, n // candidate), r
+    return a, "no factor", None, r
+
+def _try_base(args):
+    return try_base(*args)
+
+def candidate_bases(n, count, rng):
+    if n - 3 <= count:
+        bases = list(range(2, n - 1))
+        rng.shuffle(bases)
+        return bases
+    return rng.sample(range(2, n - 1), count)
+
+def run_shor(n, workers=None, max_attempts=None, order_method="bsgs", seed=None):
+    """
+    Tries up to max_attempts distinct random bases for n on a pool of worker
+    processes and returns as soon as one of them factors n; the pool is then
+    terminated, which also stops bases that are still running. Returns a dict
+    with the factors (None if every base failed), the winning base and
+    period, how many bases finished, a count per outcome and the wall time.
+    """
+    workers = workers or os.cpu_count() or 1
+    max_attempts = max_attempts or 64 * workers
+    start = time.perf_counter()
+    stats = {'n': n, 'factors': None, 'base': None, 'period': None, 'attempts': 0, 'workers': workers,
+             'outcomes': dict.fromkeys(OUTCOMES, 0)}
+    if n % 2 == 0:
+        stats.update(factors=(2, n // 2), base=2, attempts=1)
+        stats['outcomes']['gcd'] += 1
+        stats['wall_s'] = time.perf_counter() - start
+        return stats
+    bases = candidate_bases(n, max_attempts, random.Random(seed))
+    with multiprocessing.Pool(workers) as pool:
+        # The context manager's exit calls terminate(), cancelling whatever is still queued or running
+        for a, outcome, factors, r in pool.imap_unordered(_try_base, ((n, a, order_method) for a in bases)):
+            stats['attempts'] += 1
+            stats['outcomes'][outcome] += 1
+            if factors is not None:
+                stats.update(factors=tuple(sorted(factors)), base=a, period=r)
+                break
+    stats['wall_s'] = time.perf_counter() - start
+    return stats
+
+def run_sequential(n, max_attempts=None, order_method="bsgs", seed=None):
+    # Same statistics as run_shor, one base after another in this process
+    start = time.perf_counter()
+    stats = {'n': n, 'factors': None, 'base': None, 'period': None, 'attempts': 0, 'workers': 1,
+             'outcomes': dict.fromkeys(OUTCOMES, 0)}
+    for a in candidate_bases(n, max_attempts or 64, random.Random(seed)):
+        a, outcome, factors, r = try_base(n, a, order_method)
+        stats['attempts'] += 1
+        stats['outcomes'][outcome] += 1
+        if factors is not None:
+            stats.update(factors=tuple(sorted(factors)), base=a, period=r)
+            break
+    stats['wall_s'] = time.perf_counter() - start
+    return stats
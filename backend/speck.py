@@ -0,0 +1,101 @@
+from functools import lru_cache
+
+try:
+    import numpy as np
+except ImportError:  # the scalar API and list inputs work without NumPy
+    np = None
+
+ROUNDS = 22
+SPECK_KEY = 0x1918111009080100
+
+class SpeckCipher:
+    """
+    Speck32/64 as used for VMIDs: 16-bit words, rotations of 7 and 2, and 22
+    rounds. Round keys are the four 16-bit words of the key taken in turn,
+    which is what the original per-module implementations did; they are
+    computed once here. encrypt_block/decrypt_block work on one 32-bit block,
+    and encrypt_blocks/decrypt_blocks on a whole array at once using NumPy
+    when it is installed. encrypt64/decrypt64 handle the two-block 64-bit
+    values that VMIDs are made of.
+    """
+
+    def __init__(self, key=SPECK_KEY):
+        self.key = key
+        words = [(key >> shift) & 0xFFFF for shift in (0, 16, 32, 48)]
+        self.round_keys = tuple(words[i % 4] for i in range(ROUNDS))
+        self.reversed_keys = self.round_keys[::-1]
+
+    def encrypt_block(self, plaintext):
+        x = (plaintext >> 16) & 0xFFFF
+        y = plaintext & 0xFFFF
+        for k in self.round_keys:
+            x = ((x >> 7 | x << 9) & 0xFFFF) + y & 0xFFFF ^ k
+            y = (y << 2 | y >> 14) & 0xFFFF ^ x
+        return (x << 16) | y
+
+    def decrypt_block(self, ciphertext):
+        x = (ciphertext >> 16) & 0xFFFF
+        y = ciphertext & 0xFFFF
+        for k in self.reversed_keys:
+            y ^= x
+            y = (y >> 2 | y << 14) & 0xFFFF
+            x = (x ^ k) - y & 0xFFFF
+            x = (x << 7 | x >> 9) & 0xFFFF
+        return (x << 16) | y
+
+    def encrypt_blocks(self, blocks):
+        # blocks: a sequence or array of 32-bit ints; returns a uint32 array (a list without NumPy)
+        if np is None:
+            return [self.encrypt_block(block) for block in blocks]
+        blocks = np.asarray(blocks, dtype=np.uint32)
+        x = (blocks >> 16).astype(np.uint16)
+        y = blocks.astype(np.uint16)  # keeps the low 16 bits
+        for k in self.round_keys:
+            x = (x >> 7) | (x << 9)
+            x += y
+            x ^= k
+            y = (y << 2) | (y >> 14)
+            y ^= x
+        return (x.astype(np.uint32) << 16) | y
+
+    def decrypt_blocks(self, blocks):
+        if np is None:
+            return [self.decrypt_block(block) for block in blocks]
+        blocks = np.asarray(blocks, dtype=np.uint32)
+        x = (blocks >> 16).astype(np.uint16)
+        y = blocks.astype(np.uint16)
+        for k in self.reversed_keys:
+            y ^= x
+            y = (y >> 2) | (y << 14)
+            x ^= k
+            x -= y
+            x = (x << 7) | (x >> 9)
+        return (x.astype(np.uint32) << 16) | y
+
+    def encrypt64(self, value):
+        # The high and low 32-bit halves are encrypted as independent blocks
+        return (self.encrypt_block((value >> 32) & 0xFFFFFFFF) << 32) | self.encrypt_block(value & 0xFFFFFFFF)
+
+    def decrypt64(self, value):
+        return (self.decrypt_block((value >> 32) & 0xFFFFFFFF) << 32) | self.decrypt_block(value & 0xFFFFFFFF)
+
+    def encrypt64_many(self, values):
+        if np is None:
+            return [self.encrypt64(value) for value in values]
+        values = np.asarray(values, dtype=np.uint64)
+        halves = self.encrypt_blocks(np.concatenate([values >> 32, values & 0xFFFFFFFF]).astype(np.uint32))
+        high, low = halves[:len(values)], halves[len(values):]
+        return (high.astype(np.uint64) << 32) | low
+
+    def decrypt64_many(self, values):
+        if np is None:
+            return [self.decrypt64(value) for value in values]
+        values = np.asarray(values, dtype=np.uint64)
+        halves = self.decrypt_blocks(np.concatenate([values >> 32, values & 0xFFFFFFFF]).astype(np.uint32))
+        high, low = halves[:len(values)], halves[len(values):]
+        return (high.astype(np.uint64) << 32) | low
+
+@lru_cache(maxsize=64)
+def cipher_for(key=SPECK_KEY):
+    # One engine, and one round-key schedule, per key for the whole process
+    return SpeckCipher(key)
@@ -0,0 +1,174 @@
+import os
+import time
+from fractions import Fraction
+from math import gcd
+
+try:
+    import numpy as np
+except ImportError:  # only StatevectorShor needs NumPy
+    np = None
+
+def register_sizes(N):
+    # (counting qubits, work qubits): the work register holds values below N, the
+    # counting register has twice as many qubits so continued fractions can find r
+    n = N.bit_length()
+    return 2 * n, n
+
+def state_bytes(qubits, itemsize):
+    # The statevector plus the int64/float64 arrays kept per counting-register value
+    # while preparing and measuring (about 40 bytes per value at the peak)
+    n = qubits // 3
+    return 2 ** qubits * itemsize + 2 ** (qubits - n) * 40
+
+def max_qubits(ram_bytes, itemsize=16):
+    qubits = 0
+    while state_bytes(qubits + 1, itemsize) <= ram_bytes:
+        qubits += 1
+    return qubits
+
+def default_ram_budget():
+    try:
+        return os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") // 2
+    except (ValueError, OSError, AttributeError):
+        return 2 * 1024 ** 3
+
+def reduce_order(a, r, N):
+    # r is a multiple of the order of a; strip prime factors while a^(r/p) is still 1
+    p = 2
+    remaining = r
+    while p * p <= remaining:
+        while remaining % p == 0:
+            remaining //= p
+            while r % p == 0 and pow(a, r // p, N) == 1:
+                r //= p
+        p += 1
+    if remaining > 1 and r % remaining == 0 and pow(a, r // remaining, N) == 1:
+        r //= remaining
+    return r
+
+class StatevectorShor:
+    """
+    Circuit-level simulation of Shor's period finding for small moduli.
+
+    The state has a counting register of t = 2n qubits and a work register of
+    n qubits, n being the bit length of N, stored as a (2^t, 2^n) array. The
+    controlled-U^(2^j) modular exponentiation leaves every counting value x
+    paired with a^x mod N in the work register. The QFT on the counting
+    register is then applied qubit by qubit: an in-place Hadamard followed by
+    one broadcast multiply that combines all of that qubit's controlled phase
+    rotations. The final swaps are left out, and sampled outcomes are
+    bit-reversed instead. qft="fft" applies the same transform with NumPy's
+    FFT, as a cross-check (it briefly holds a second copy of the state, which
+    the RAM budget does not count). Measurements are sampled from the counting
+    register's marginal distribution, and each outcome c gives a candidate
+    period through the continued fraction of c / 2^t.
+
+    Amplitudes are left unnormalized until the probabilities are taken, which
+    saves t full passes over the state. With dtype=np.complex64 the state
+    needs half the memory. A modulus whose registers would not fit in
+    ram_budget bytes (by default half the physical memory) is refused.
+    """
+
+    def __init__(self, dtype=None, qft="gates", shots=16, ram_budget=None, seed=None):
+        if np is None:
+            raise ImportError("numpy is required for StatevectorShor")
+        if qft not in ("gates", "fft"):
+            raise ValueError(f"Unknown QFT implementation {qft!r}; use 'gates' or 'fft'")
+        self.dtype = np.dtype(dtype or np.complex128)
+        self.qft = qft
+        self.shots = shots
+        self.ram_budget = ram_budget or default_ram_budget()
+        self.rng = np.random.default_rng(seed)
+        self.last_run = None  # statistics of the most recent run()
+
+    def max_qubits(self):
+        return max_qubits(self.ram_budget, self.dtype.itemsize)
+
+    def prepare(self, a, N):
+        # Hadamards on the counting register, then controlled multiplications by a^(2^j) mod N
+        t, n = register_sizes(N)
+        x = np.arange(2 ** t, dtype=np.int64)
+        values = np.ones(2 ** t, dtype=np.int64)
+        factor = a % N
+        for j in range(t):
+            control = ((x >> j) & 1).astype(bool)
+            values[control] = values[control] * factor % N
+            factor = factor * factor % N
+        state = np.zeros((2 ** t, 2 ** n), dtype=self.dtype)
+        state[x, values] = 1
+        return state
+
+    def apply_qft(self, state):
+        rows = state.shape[0]
+        t = rows.bit_length() - 1
+        if self.qft == "fft":
+            state[:] = np.fft.ifft(state, axis=0)  # ifft(out=) needs NumPy 2
+            return False  # outcomes come out in natural bit order
+        for j in range(t - 1, -1, -1):
+            view = state.reshape(rows >> (j + 1), 2, 1 << j, state.shape[1])
+            low, high = view[:, 0], view[:, 1]
+            low += high  # unnormalized Hadamard: (a, b) -> (a + b, a - b)
+            high *= -2
+            high += low
+            if j:
+                # Controlled R_m from every lower qubit k: phase 2*pi*x_k*2^k / 2^(j+1)
+                phases = np.exp(2j * np.pi * np.arange(1 << j) / (1 << (j + 1))).astype(self.dtype)
+                high *= phases[None, :, None]
+        return True  # the missing swaps leave the outcome bits reversed
+
+    def counting_probabilities(self, state, chunk=1 << 14):
+        probabilities = np.empty(state.shape[0], dtype=np.float64)
+        for start in range(0, state.shape[0], chunk):
+            block = state[start:start + chunk]
+            probabilities[start:start + chunk] = (block.real ** 2 + block.imag ** 2).sum(axis=1)
+        probabilities /= probabilities.sum()
+        return probabilities
+
+    def candidate_period(self, c, t, a, N):
+        if c == 0:
+            return None
+        r = Fraction(c, 2 ** t).limit_denominator(N - 1).denominator
+        # The fraction may have lost a factor of r to gcd(s, r); small multiples recover it
+        for multiple in range(1, N):
+            if r * multiple >= N:
+                return None
+            if pow(a, r * multiple, N) == 1:
+                return r * multiple
+        return None
+
+    def run(self, a, N):
+        if N < 3 or gcd(a, N) != 1:
+            raise ValueError(f"a={a} must be coprime to N={N} > 2")
+        t, n = register_sizes(N)
+        needed = state_bytes(t + n, self.dtype.itemsize)
+        if needed > self.ram_budget:
+            raise MemoryError(f"N={N} needs {t + n} qubits ({needed / 2 ** 20:.0f} MiB); "
+                              f"at most {self.max_qubits()} fit in the RAM budget")
+        timings = {}
+        start = time.perf_counter()
+        state = self.prepare(a, N)
+        timings['modexp'] = time.perf_counter() - start
+        start = time.perf_counter()
+        reversed_bits = self.apply_qft(state)
+        timings['qft'] = time.perf_counter() - start
+        start = time.perf_counter()
+        probabilities = self.counting_probabilities(state)
+        del state
+        outcomes = self.rng.choice(len(probabilities), size=self.shots, p=probabilities)
+        if reversed_bits:
+            outcomes = [int(format(int(c), f"0{t}b")[::-1], 2) for c in outcomes]
+        period = None
+        for c in outcomes:
+            r = self.candidate_period(int(c), t, a, N)
+            if r is not None:
+                # Every valid candidate is a multiple of the order, and so is their gcd
+                period = r if period is None else gcd(period, r)
+        if period is not None:
+            period = reduce_order(a, period, N)
+        timings['measure'] = time.perf_counter() - start
+        self.last_run = {'N': N, 'a': a, 'qubits': t + n, 'state_bytes': needed, 'period': period,
+                         'outcomes': [int(c) for c in outcomes], 'timings': timings}
+        return self.last_run
+
+    def find_period(self, a, N):
+        return self.run(a, N)['period']
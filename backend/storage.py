@@ -0,0 +1,129 @@
+import threading
+
+try:
+    from pymongo import MongoClient, UpdateOne
+except ImportError:  # MemoryStorage does not need pymongo
+    MongoClient = UpdateOne = None
+
+ACCOUNT_KINDS = ("users", "merchants")
+
+class MongoStorage:
+    """
+    Bank storage on MongoDB: one users_<IFSC> and one merchants_<IFSC>
+    collection per bank branch, plus a single blockchain collection.
+    """
+
+    def __init__(self, mongo_uri="mongodb://localhost:27017/", db_name="bank_db"):
+        if MongoClient is None:
+            raise ImportError("pymongo is required for MongoStorage")
+        self.client = MongoClient(mongo_uri)
+        self.db_name = db_name
+        self.db = self.client[db_name]
+        self.blockchain = self.db["blockchain"]
+        self.blockchain.create_index([("Timestamp", 1), ("_id", 1)])
+
+    def collection(self, kind, ifsc):
+        return self.db[f"{kind}_{ifsc}"]
+
+    def load_accounts(self, kind, ifsc):
+        for doc in self.collection(kind, ifsc).find():
+            key = doc.pop("_id")
+            yield key, doc
+
+    def save_account(self, kind, ifsc, key, data):
+        self.collection(kind, ifsc).update_one({"_id": key}, {"$set": data}, upsert=True)
+
+    def save_accounts(self, updates):
+        # updates: [(kind, ifsc, key, data)], one bulk write per collection
+        by_collection = {}
+        for kind, ifsc, key, data in updates:
+            by_collection.setdefault((kind, ifsc), {})[key] = data
+        for (kind, ifsc), docs in by_collection.items():
+            ops = [UpdateOne({"_id": key}, {"$set": data}, upsert=True) for key, data in docs.items()]
+            self.collection(kind, ifsc).bulk_write(ops, ordered=False)
+
+    def insert_blocks(self, blocks):
+        if len(blocks) == 1:
+            self.blockchain.insert_one(blocks[0])
+        else:
+            self.blockchain.insert_many(blocks, ordered=True)
+
+    def latest_block(self):
+        return self.blockchain.find_one(sort=[("Timestamp", -1), ("_id", -1)], projection={"_id": 1, "Timestamp": 1})
+
+    def find_block(self, block_id):
+        return self.blockchain.find_one({"_id": block_id})
+
+    def find_blocks(self, after=None, limit=0):
+        # Blocks in chain order, starting after the given block; served from the (Timestamp, _id) index
+        query = {}
+        if after is not None:
+            query = {"$or": [
+                {"Timestamp": {"$gt": after["Timestamp"]}},
+                {"Timestamp": after["Timestamp"], "_id": {"$gt": after["_id"]}}
+            ]}
+        return self.blockchain.find(query, sort=[("Timestamp", 1), ("_id", 1)], limit=limit)
+
+    def drop(self):
+        self.client.drop_database(self.db_name)
+
+class MemoryStorage:
+    """
+    In-process storage with the same semantics as MongoStorage: saves are
+    upserts that merge fields, stored documents are copies, and block IDs are
+    unique. Nothing survives the process, so it is meant for benchmarks and load
+    tests.
+    """
+
+    def __init__(self):
+        self.accounts = {}  # (kind, ifsc) -> {key: doc}
+        self.blocks = []  # in chain order
+        self.block_index = {}  # _id -> position in self.blocks
+        self.lock = threading.Lock()
+
+    def load_accounts(self, kind, ifsc):
+        with self.lock:
+            docs = [(key, dict(doc)) for key, doc in self.accounts.get((kind, ifsc), {}).items()]
+        return iter(docs)
+
+    def save_account(self, kind, ifsc, key, data):
+        with self.lock:
+            self.accounts.setdefault((kind, ifsc), {}).setdefault(key, {}).update(data)
+
+    def save_accounts(self, updates):
+        with self.lock:
+            for kind, ifsc, key, data in updates:
+                self.accounts.setdefault((kind, ifsc), {}).setdefault(key, {}).update(data)
+
+    def insert_blocks(self, blocks):
+        with self.lock:
+            for block in blocks:
+                if block["_id"] in self.block_index:
+                    raise KeyError(f"Duplicate block {block['_id']}")
+            for block in blocks:
+                self.block_index[block["_id"]] = len(self.blocks)
+                self.blocks.append(dict(block))
+
+    def latest_block(self):
+        with self.lock:
+            if not self.blocks:
+                return None
+            return {"_id": self.blocks[-1]["_id"], "Timestamp": self.blocks[-1]["Timestamp"]}
+
+    def find_block(self, block_id):
+        with self.lock:
+            position = self.block_index.get(block_id)
+            return dict(self.blocks[position]) if position is not None else None
+
+    def find_blocks(self, after=None, limit=0):
+        with self.lock:
+            start = self.block_index[after["_id"]] + 1 if after is not None else 0
+            end = start + limit if limit else len(self.blocks)
+            blocks = [dict(block) for block in self.blocks[start:end]]
+        return iter(blocks)
+
+    def drop(self):
+        with self.lock:
+            self.accounts.clear()
+            self.blocks.clear()
+            self.block_index.clear()
@@ -0,0 +1,85 @@
+import contextlib
+import io
+import random
+import sys
+import threading
+from bank import Bank
+from rsa_keygen import bank_key
+from storage import MemoryStorage
+
+KEY = bank_key()  # passed to Bank too, so the payments are encrypted to the key it decrypts with
+PUBLIC_KEY = (KEY['e'], KEY['n'])
+PAYERS = 64
+HOT_MERCHANTS = 3
+PAYMENTS_PER_PAYER = 40
+INITIAL_BALANCE = 500
+
+def encrypt(msg, pub_key):
+    e, n = pub_key
+    return [pow(ord(char), e, n) for char in msg]
+
+def pay(bank, payer, mids, results):
+    enc_mmid, enc_pin = payer
+    for _ in range(PAYMENTS_PER_PAYER):
+        results.append(bank.process_transaction(enc_mmid, enc_pin, random.choice(mids), random.randint(1, 40)))
+
+def check(bank, mmids, mids):
+    # Every balance must equal its opening balance adjusted by the blocks that touch it
+    errors = []
+    sent = {mmid: 0 for mmid in mmids}
+    received = {mid: 0 for mid in mids}
+    blocks = {block["_id"]: block for block in bank.storage.find_blocks()}
+    for block in blocks.values():
+        sent[block["Sender MMID"]] += block["Amount"]
+        received[block["Receiver MID"]] += block["Amount"]
+    for mmid in mmids:
+        _, user = bank.find_user(mmid)
+        if user["Balance"] != INITIAL_BALANCE - sent[mmid]:
+            errors.append(f"user {mmid}: balance {user['Balance']}, blockchain says {INITIAL_BALANCE - sent[mmid]}")
+    for mid in mids:
+        _, merchant = bank.find_merchant(mid)
+        if merchant["Balance"] != received[mid]:
+            errors.append(f"merchant {mid}: balance {merchant['Balance']}, blockchain says {received[mid]}")
+    # The chain must be one unbroken line back to the genesis hash
+    prev_hashes = [block["Previous Block Hash"] for block in blocks.values()]
+    if len(set(prev_hashes)) != len(prev_hashes):
+        errors.append("blockchain forked: two blocks share a previous hash")
+    return errors, len(blocks)
+
+def run(group_commit):
+    with contextlib.redirect_stdout(io.StringIO()):
+        bank = Bank(storage=MemoryStorage(), group_commit=group_commit, rsa_key=KEY)
+        mmids = []
+        payers = []
+        for i in range(PAYERS):
+            mmid, _ = bank.register_user(f"payer{i}", bank.ifsc_codes[i % len(bank.ifsc_codes)],
+                                         "pass", "1234", f"9{i:09d}", INITIAL_BALANCE)
+            mmids.append(mmid)
+            payers.append((encrypt(mmid, PUBLIC_KEY), encrypt("1234", PUBLIC_KEY)))
+        mids = [bank.register_merchant(f"hot{i}", "HDFC0002345", f"pass{i}") for i in range(HOT_MERCHANTS)]
+        results = []
+        threads = [threading.Thread(target=pay, args=(bank, payer, mids, results)) for payer in payers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        errors, block_count = check(bank, mmids, mids)
+        # Reloading from storage must give the same answer as memory
+        bank.load_from_db()
+        db_errors, _ = check(bank, mmids, mids)
+    successes = results.count("Transaction successful")
+    mode = "group commit" if group_commit else "per-call writes"
+    print(f"{mode}: {successes} successful of {len(results)} payments, {block_count} blocks")
+    if successes != block_count:
+        errors.append(f"{successes} successful payments but {block_count} blocks")
+    if not successes:
+        # e.g. payments encrypted to a key the bank does not decrypt with
+        errors.append(f"{mode}: no payment succeeded; first result: {results[0] if results else None}")
+    return errors + [f"after reload: {error}" for error in db_errors]
+
+if __name__ == "__main__":
+    errors = run(False) + run(True)
+    for error in errors:
+        print(error)
+    print("FAILED" if errors else "OK: balances match the blockchain")
+    sys.exit(1 if errors else 0)
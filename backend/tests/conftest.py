@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The backend modules import each other as top-level modules, as they do when run from backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# bank_socket builds its bank at import time; keep it off MongoDB
+os.environ.setdefault("BANK_STORAGE", "memory")
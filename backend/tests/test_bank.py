@@ -0,0 +1,62 @@
+import contextlib
+import io
+import pytest
+from bank import SAVE_FAILED, Bank
+from rsa_keygen import DEMO_KEY, key_from_primes
+from storage import MemoryStorage
+
+IFSC = "SBIN0001234"
+
+class BlockFailingStorage(MemoryStorage):
+    # Saves balances, then fails the block insert while fail_blocks is set
+    fail_blocks = False
+
+    def insert_blocks(self, blocks):
+        if self.fail_blocks:
+            raise OSError("disk full")
+        super().insert_blocks(blocks)
+
+def encrypt(text):
+    return [pow(ord(char), DEMO_KEY['e'], DEMO_KEY['n']) for char in text]
+
+@pytest.fixture(params=[False, True], ids=["direct", "group-commit"])
+def setup(request):
+    storage = BlockFailingStorage()
+    with contextlib.redirect_stdout(io.StringIO()):
+        bank = Bank(storage=storage, group_commit=request.param,
+                    rsa_key=key_from_primes(DEMO_KEY['p'], DEMO_KEY['q'], DEMO_KEY['e']))
+        mmid, _ = bank.register_user("alice", IFSC, "pw", "1234", "9999999999", 100)
+        mid = bank.register_merchant("shop", IFSC, "pw", 0)
+    return bank, storage, mmid, mid
+
+def stored_balances(storage, mmid, mid):
+    return (storage.accounts[("users", IFSC)][mmid]["Balance"],
+            storage.accounts[("merchants", IFSC)][mid]["Balance"])
+
+def pay(bank, mmid, mid, amount):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return bank.process_transaction(encrypt(mmid), encrypt("1234"), mid, amount)
+
+def test_failed_block_insert_restores_stored_balances(setup):
+    bank, storage, mmid, mid = setup
+    assert pay(bank, mmid, mid, 10) == "Transaction successful"
+    tip = bank.chain_tip
+    storage.fail_blocks = True
+    assert pay(bank, mmid, mid, 30) == SAVE_FAILED
+    assert bank.users[(IFSC, mmid)]["Balance"] == 90
+    assert stored_balances(storage, mmid, mid) == (90, 10)
+    assert bank.chain_tip == tip
+    storage.fail_blocks = False
+    assert pay(bank, mmid, mid, 5) == "Transaction successful"
+    assert stored_balances(storage, mmid, mid) == (85, 15)
+    assert storage.blocks[-1]["Previous Block Hash"] == tip
+
+def test_failed_batch_restores_stored_balances(setup):
+    bank, storage, mmid, mid = setup
+    storage.fail_blocks = True
+    item = {'encrypted_sender_mmid': encrypt(mmid), 'encrypted_sender_pin': encrypt("1234"), 'receiver_mid': mid}
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = bank.process_transactions([dict(item, amount=20), dict(item, amount=500), dict(item, amount=30)])
+    assert results == [SAVE_FAILED, "Error: Insufficient balance", SAVE_FAILED]
+    assert stored_balances(storage, mmid, mid) == (100, 0)
+    assert storage.blocks == []
@@ -0,0 +1,46 @@
+import asyncio
+import socket
+import pytest
+import bank_socket
+from framing import HEADER, ConnectionClosed, read_frame, recv_frame, send_frame
+
+def run_handler(sock):
+    # Serves one connection with handle_connection until it returns
+    async def serve():
+        reader, writer = await asyncio.open_connection(sock=sock)
+        await asyncio.wait_for(bank_socket.handle_connection(reader, writer, None), timeout=5)
+    asyncio.run(serve())
+
+def test_async_handler_survives_client_closing_mid_frame():
+    server_sock, client_sock = socket.socketpair()
+    client_sock.sendall(HEADER.pack(100, 1) + b"x" * 10)
+    client_sock.close()
+    run_handler(server_sock)
+
+def read_one_frame(data):
+    async def read():
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        return await read_frame(reader)
+    return asyncio.run(read())
+
+@pytest.mark.parametrize("size", range(1, HEADER.size))
+def test_read_frame_close_inside_header_is_connection_error(size):
+    with pytest.raises(ConnectionClosed):
+        read_one_frame(HEADER.pack(100, 1)[:size])
+
+def test_read_frame_clean_close_returns_none():
+    assert read_one_frame(b"") == (None, None)
+
+def test_async_handler_answers_requests_before_the_close():
+    server_sock, client_sock = socket.socketpair()
+    send_frame(client_sock, 3, {'type': 'no_such_request'})
+    send_frame(client_sock, 4, {'type': 'no_such_request'})
+    client_sock.shutdown(socket.SHUT_WR)
+    run_handler(server_sock)
+    responses = [recv_frame(client_sock) for _ in range(2)]
+    assert [request_id for request_id, _ in responses] == [3, 4]
+    assert all(response['status'] == 'error' for _, response in responses)
+    assert recv_frame(client_sock) == (None, None)
+    client_sock.close()
@@ -0,0 +1,44 @@
+import json
+import pytest
+from codebook_attack import CodebookCracker, captured_transactions
+from rsa_engine import RSADecryptor
+from rsa_keygen import generate_keypair, key_from_primes
+
+DEMO = key_from_primes(127, 257, 353)
+
+def transaction(key, mmid, pin):
+    e, n = key['e'], key['n']
+    return {'type': 'transaction', 'encrypted_sender_mmid': [pow(ord(c), e, n) for c in mmid],
+            'encrypted_sender_pin': [pow(ord(c), e, n) for c in pin]}
+
+def decryptor(key):
+    return RSADecryptor(p=key['p'], q=key['q'], d=key['d'], e=key['e'], alphabet=None)
+
+@pytest.mark.parametrize("key, table_limit", [
+    (DEMO, 1 << 24),  # lookup table
+    (DEMO, 10),  # sorted arrays
+    (generate_keypair(64), 1 << 24),  # dict: ciphertexts beyond int64
+    (generate_keypair(512), 1 << 24),
+])
+def test_cracks_alphabet_and_decrypts_the_rest(key, table_limit):
+    transactions = [transaction(key, "0123abcd", "1234"), transaction(key, "xé€", "9")]
+    cracker = CodebookCracker((key['e'], key['n']), table_limit=table_limit)
+    assert cracker.crack(transactions)[0] == ("0123abcd", "1234")
+    assert "�" in cracker.crack(transactions)[1][0]
+    cracker = CodebookCracker((key['e'], key['n']), decryptor=decryptor(key), table_limit=table_limit)
+    for _ in range(2):
+        assert cracker.crack(transactions) == [("0123abcd", "1234"), ("xé€", "9")]
+    assert cracker.stats['decrypted'] == 2
+
+@pytest.mark.parametrize("key", [DEMO, generate_keypair(64)])
+def test_out_of_range_ciphertext_is_rejected(key):
+    cracker = CodebookCracker((key['e'], key['n']))
+    with pytest.raises(ValueError):
+        cracker.crack([{'encrypted_sender_mmid': [key['n']], 'encrypted_sender_pin': []}])
+
+def test_capture_skips_transactions_with_bad_ciphertexts():
+    good = transaction(DEMO, "ab", "12")
+    bad = [dict(good, encrypted_sender_pin=pin) for pin in ([DEMO['n']], [-1], ["3"], [True], [1.5], None)]
+    lines = [json.dumps(item) for item in [good] + bad]
+    lines += [json.dumps({'type': 'transaction_batch', 'transactions': [good] + bad}), "not json", "[]"]
+    assert list(captured_transactions(lines, DEMO['n'])) == [good, good]
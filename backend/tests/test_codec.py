@@ -0,0 +1,68 @@
+import socket
+import pytest
+import bank_socket
+from codec import BINARY, JSON
+from framing import HEADER, hello_response, recv_frame, send_frame, set_codec
+
+TRANSACTION = {'type': 'transaction', 'encrypted_sender_mmid': [1, 2, 30000], 'encrypted_sender_pin': [5],
+               'receiver_mid': 'ab' * 8, 'amount': 5}
+BATCH = {'type': 'transaction_batch', 'transactions': [
+    {'encrypted_sender_mmid': [1], 'encrypted_sender_pin': [2], 'receiver_mid': 'cd' * 8, 'amount': 1}] * 3}
+MESSAGES = (TRANSACTION, BATCH, {'status': 'success', 'message': 'ok'}, {'type': 'other', 'values': [1]})
+
+@pytest.mark.parametrize("message", MESSAGES)
+def test_binary_round_trip(message):
+    assert BINARY.decode(BINARY.encode(message)) == message
+
+@pytest.mark.parametrize("message", MESSAGES)
+def test_every_truncation_is_a_value_error(message):
+    data = BINARY.encode(message)
+    for cut in range(len(data)):
+        with pytest.raises(ValueError):
+            BINARY.decode(data[:cut])
+
+@pytest.mark.parametrize("data", [b"", b"\x00[]", b"\x00\xff", b"\x00{", b"\xfe", b"\x01" + b"\xff" * 40])
+def test_malformed_binary_is_a_value_error(data):
+    with pytest.raises(ValueError):
+        BINARY.decode(data)
+
+def test_trailing_bytes_are_rejected():
+    with pytest.raises(ValueError):
+        BINARY.decode(BINARY.encode(TRANSACTION) + b"\x00")
+
+@pytest.mark.parametrize("data", [b"[]", b"1", b'"hello"', b"null", b"\xff", b"{"])
+def test_malformed_json_is_a_value_error(data):
+    with pytest.raises(ValueError):
+        JSON.decode(data)
+
+@pytest.mark.parametrize("codecs", [None, 3, "binary", [1, ["binary"]]])
+def test_hello_with_bad_codec_list_falls_back_to_json(codecs):
+    response, codec = hello_response({'type': 'hello', 'codecs': codecs})
+    assert response['codec'] == 'json' and codec is JSON
+
+@pytest.mark.parametrize("payload", [b"[]", b"", b"\xff"])
+def test_bank_handler_closes_on_malformed_json_frame(payload):
+    server_sock, client_sock = socket.socketpair()
+    client_sock.sendall(HEADER.pack(len(payload), 1) + payload)
+    client_sock.shutdown(socket.SHUT_WR)
+    bank_socket.handle_client(server_sock, "test")
+    assert recv_frame(client_sock) == (None, None)
+    client_sock.close()
+
+def test_bank_handler_closes_on_truncated_binary_frame():
+    server_sock, client_sock = socket.socketpair()
+    set_codec(server_sock, BINARY)
+    payload = BINARY.encode(TRANSACTION)[:-3]
+    client_sock.sendall(HEADER.pack(len(payload), 1) + payload)
+    client_sock.shutdown(socket.SHUT_WR)
+    bank_socket.handle_client(server_sock, "test")
+    assert recv_frame(client_sock) == (None, None)
+    client_sock.close()
+
+def test_bank_handler_negotiates_binary():
+    server_sock, client_sock = socket.socketpair()
+    send_frame(client_sock, 1, {'type': 'hello', 'codecs': ['binary', 'json']})
+    client_sock.shutdown(socket.SHUT_WR)
+    bank_socket.handle_client(server_sock, "test")
+    assert recv_frame(client_sock)[1] == {'status': 'success', 'codec': 'binary'}
+    client_sock.close()
@@ -0,0 +1,78 @@
+import socket
+import threading
+import pytest
+import bank_socket
+from framing import HEADER, ConnectionClosed, PipelinedClient, recv_frame, send_frame
+
+def half_frame():
+    # A header promising 100 bytes followed by only 10 of them
+    return HEADER.pack(100, 1) + b"x" * 10
+
+def test_recv_frame_mid_frame_close_is_connection_error():
+    ours, theirs = socket.socketpair()
+    theirs.sendall(half_frame())
+    theirs.close()
+    with pytest.raises(ConnectionError):
+        recv_frame(ours)
+    ours.close()
+
+@pytest.mark.parametrize("size", range(1, HEADER.size))
+def test_recv_frame_close_inside_header_is_connection_error(size):
+    ours, theirs = socket.socketpair()
+    theirs.sendall(HEADER.pack(100, 1)[:size])
+    theirs.close()
+    with pytest.raises(ConnectionClosed):
+        recv_frame(ours)
+    ours.close()
+
+def test_recv_frame_clean_close_returns_none():
+    ours, theirs = socket.socketpair()
+    theirs.close()
+    assert recv_frame(ours) == (None, None)
+    ours.close()
+
+def test_pipelined_client_fails_pending_and_later_requests_on_mid_frame_close():
+    client_sock, server_sock = socket.socketpair()
+    client = PipelinedClient(client_sock)
+    first = client.submit({'type': 'ping'})
+    recv_frame(server_sock)
+    server_sock.sendall(half_frame())
+    server_sock.close()
+    with pytest.raises(ConnectionClosed):
+        first.result(timeout=5)
+    client.reader.join(timeout=5)
+    with pytest.raises(ConnectionClosed):
+        client.submit({'type': 'ping'}).result(timeout=5)
+    client_sock.close()
+
+def test_pipelined_client_matches_responses_by_request_id():
+    client_sock, server_sock = socket.socketpair()
+    client = PipelinedClient(client_sock)
+    futures = [client.submit({'type': 'ping', 'n': n}) for n in range(3)]
+    requests = [recv_frame(server_sock) for _ in futures]
+    for request_id, request in reversed(requests):
+        send_frame(server_sock, request_id, {'status': 'success', 'n': request['n']})
+    assert [future.result(timeout=5)['n'] for future in futures] == [0, 1, 2]
+    server_sock.close()
+    client_sock.close()
+
+def test_bank_handler_survives_client_closing_mid_frame():
+    server_sock, client_sock = socket.socketpair()
+    client_sock.sendall(half_frame())
+    client_sock.close()
+    # Runs in this thread, so an exception escaping the handler fails the test
+    bank_socket.handle_client(server_sock, "test")
+    assert server_sock.fileno() == -1
+
+def test_bank_handler_answers_then_stops_at_mid_frame_close():
+    server_sock, client_sock = socket.socketpair()
+    send_frame(client_sock, 7, {'type': 'no_such_request'})
+    client_sock.sendall(half_frame())
+    client_sock.shutdown(socket.SHUT_WR)
+    handler = threading.Thread(target=bank_socket.handle_client, args=(server_sock, "test"))
+    handler.start()
+    request_id, response = recv_frame(client_sock)
+    handler.join(timeout=5)
+    assert not handler.is_alive()
+    assert request_id == 7 and response['status'] == 'error'
+    client_sock.close()
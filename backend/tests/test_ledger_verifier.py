@@ -0,0 +1,59 @@
+import threading
+from ledger_verifier import GENESIS_HASH, LedgerVerifier, verify_proof
+from storage import MemoryStorage
+
+def make_chain(storage, count, start=0):
+    previous = storage.latest_block()["_id"] if storage.latest_block() else GENESIS_HASH
+    for i in range(start, start + count):
+        block = {"_id": f"{i:064x}", "Previous Block Hash": previous, "Timestamp": f"2026-01-01T00:00:{i:09d}",
+                 "Amount": i}
+        storage.insert_blocks([block])
+        previous = block["_id"]
+
+def verifier(storage, tmp_path, **kwargs):
+    return LedgerVerifier(storage, state_dir=str(tmp_path), signing_key="test-key", **kwargs)
+
+def test_chunked_verification_matches_a_single_pass(tmp_path):
+    storage = MemoryStorage()
+    make_chain(storage, 25)
+    chunked = verifier(storage, tmp_path / "chunked", chunk=4, checkpoint_every=10)
+    whole = verifier(storage, tmp_path / "whole", chunk=1000, checkpoint_every=10)
+    assert chunked.verify_new_blocks() == (25, None)
+    assert whole.verify_new_blocks() == (25, None)
+    assert chunked.tree.root() == whole.tree.root()
+    assert [c["height"] for c in chunked.checkpoints] == [10, 20]
+    make_chain(storage, 4, start=25)  # exactly one chunk more
+    assert chunked.verify_new_blocks() == (4, None)
+    assert chunked.verify_new_blocks() == (0, None)
+
+def test_caught_up_tracks_the_stored_tip(tmp_path):
+    storage = MemoryStorage()
+    ledger = verifier(storage, tmp_path)
+    assert ledger.caught_up()
+    make_chain(storage, 3)
+    assert not ledger.caught_up()
+    assert ledger.inclusion_proof(f"{0:064x}") is None
+    ledger.verify_new_blocks()
+    assert ledger.caught_up()
+    proof = ledger.inclusion_proof(f"{1:064x}")
+    assert verify_proof(proof["leaf"], proof["proof"], proof["root"])
+
+def test_proofs_are_served_between_chunks(tmp_path):
+    storage = MemoryStorage()
+    make_chain(storage, 20)
+    ledger = verifier(storage, tmp_path, chunk=5)
+    served = []
+    find_blocks = storage.find_blocks
+
+    def find_blocks_and_query(after=None, limit=0):
+        # Runs while the verifier is between chunks: a proof request must not block on the scan
+        if after is not None:
+            thread = threading.Thread(target=lambda: served.append(ledger.inclusion_proof(after["_id"])))
+            thread.start()
+            thread.join(timeout=5)
+            assert not thread.is_alive()
+        return find_blocks(after, limit)
+
+    storage.find_blocks = find_blocks_and_query
+    assert ledger.verify_new_blocks() == (20, None)
+    assert [proof["tx_id"] for proof in served] == [f"{i:064x}" for i in (4, 9, 14, 19)]
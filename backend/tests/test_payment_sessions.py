@@ -0,0 +1,68 @@
+import pytest
+import machine_socket
+from payment_sessions import UNKNOWN_SESSION, USED_VMID, SessionTable
+
+MID = "0123456789abcdef"
+
+def test_vmid_replay_after_successful_payment_is_refused():
+    table = SessionTable()
+    session = table.create(MID, "shop", "vmid-1", "20260101000000")
+    claimed, error = table.claim(vmid="vmid-1")
+    assert claimed is session and error is None
+    table.finish(claimed, success=True)
+    assert table.claim(vmid="vmid-1") == (None, USED_VMID)
+    assert table.claim(token=session.token) == (None, UNKNOWN_SESSION)
+
+def test_vmid_replay_after_expiry_is_refused():
+    table = SessionTable(vmid_window=60)
+    table.create(MID, "shop", "vmid-1", "20260101000000", timeout=0)
+    assert table.claim(vmid="vmid-1") == (None, 'Payment session expired')
+    assert table.claim(vmid="vmid-1") == (None, USED_VMID)
+    table.expire()
+    assert table.claim(vmid="vmid-1") == (None, USED_VMID)
+
+def test_vmid_is_forgotten_once_its_window_ends():
+    table = SessionTable(vmid_window=0)
+    table.create(MID, "shop", "vmid-1", "20260101000000", timeout=0)
+    table.expire()
+    assert table.issued == {}
+    assert table.claim(vmid="vmid-1") == (None, UNKNOWN_SESSION)
+
+def test_failed_payment_keeps_the_session_open():
+    table = SessionTable()
+    table.create(MID, "shop", "vmid-1", "20260101000000")
+    claimed, _ = table.claim(vmid="vmid-1")
+    assert table.claim(vmid="vmid-1")[1] == 'A payment for this session is already in progress'
+    table.finish(claimed, success=False)
+    assert table.claim(vmid="vmid-1")[0] is claimed
+
+@pytest.fixture
+def bank_requests(monkeypatch):
+    # Stands in for the bank: records what the machine forwards and approves it
+    requests = []
+    def send_request(request):
+        requests.append(request)
+        return {'status': 'success', 'message': 'Transaction Successful'}
+    monkeypatch.setattr(machine_socket, "send_request", send_request)
+    monkeypatch.setattr(machine_socket, "sessions", SessionTable())
+    return requests
+
+def payment(vmid, session=None):
+    request = {'type': 'transaction', 'encrypted_sender_mmid': [1], 'encrypted_sender_pin': [2],
+               'encrypted_receiver_mid': vmid, 'amount': 10}
+    if session is not None:
+        request['session'] = session
+    return request
+
+def test_machine_refuses_vmid_replay_instead_of_forwarding_it(bank_requests):
+    created = machine_socket.handle_request({'type': 'create_session', 'mid': MID, 'name': 'shop'})
+    assert machine_socket.handle_request(payment(created['vmid']))['status'] == 'success'
+    assert bank_requests[-1]['receiver_mid'] == MID
+    for replay in (payment(created['vmid']), payment(created['vmid'], created['session'])):
+        assert machine_socket.handle_request(replay)['status'] == 'error'
+    assert len(bank_requests) == 1
+
+def test_machine_forwards_vmids_it_never_issued(bank_requests):
+    assert machine_socket.handle_request(payment("fedcba9876543210"))['status'] == 'success'
+    assert bank_requests == [{'type': 'transaction', 'encrypted_sender_mmid': [1], 'encrypted_sender_pin': [2],
+                              'encrypted_receiver_mid': "fedcba9876543210", 'amount': 10}]
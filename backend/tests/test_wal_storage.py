@@ -0,0 +1,95 @@
+import os
+import time
+from wal_storage import WalStorage
+
+def account(balance, pin="1234"):
+    return {"Name": "alice", "PIN": pin, "Balance": balance}
+
+def block(n):
+    return {"_id": f"block-{n}", "Timestamp": f"2026-01-01 00:00:0{n}", "Amount": n}
+
+def accounts(storage):
+    return dict(storage.load_accounts("user", "SBIN0001234"))
+
+def test_recovery_truncates_a_torn_log_record(tmp_path):
+    storage = WalStorage(str(tmp_path), snapshot_every=1000)
+    storage.save_account("user", "SBIN0001234", "m1", account(100))
+    storage.save_accounts([("user", "SBIN0001234", "m1", account(70)),
+                           ("user", "SBIN0001234", "m2", account(5))])
+    storage.close()
+    log_path = storage._log_path(1)
+    intact = os.path.getsize(log_path)
+    with open(log_path, "ab") as f:
+        f.write(b'["B","user","SBIN0001234","m1",-5')  # crashed mid-write: no closing bracket or newline
+
+    recovered = WalStorage(str(tmp_path), snapshot_every=1000)
+    assert accounts(recovered) == {"m1": account(70), "m2": account(5)}
+    assert os.path.getsize(log_path) == intact
+    # Writes after recovery land after the cut and survive the next restart
+    recovered.save_account("user", "SBIN0001234", "m1", account(60))
+    recovered.close()
+    assert accounts(WalStorage(str(tmp_path)))["m1"] == account(60)
+
+def test_recovery_truncates_an_unparseable_last_line(tmp_path):
+    storage = WalStorage(str(tmp_path))
+    storage.save_account("user", "SBIN0001234", "m1", account(100))
+    storage.close()
+    with open(storage._log_path(1), "ab") as f:
+        f.write(b'["B","us\n')
+    assert accounts(WalStorage(str(tmp_path))) == {"m1": account(100)}
+
+def test_recovery_truncates_a_torn_ledger_block(tmp_path):
+    storage = WalStorage(str(tmp_path))
+    storage.insert_blocks([block(1), block(2)])
+    storage.close()
+    with open(os.path.join(str(tmp_path), "blocks.jsonl"), "ab") as f:
+        f.write(b'{"_id":"block-3","Times')
+
+    recovered = WalStorage(str(tmp_path))
+    assert recovered.latest_block() == {"_id": "block-2", "Timestamp": block(2)["Timestamp"]}
+    recovered.insert_blocks([block(3)])
+    assert [b["_id"] for b in recovered.find_blocks()] == ["block-1", "block-2", "block-3"]
+    assert recovered.find_block("block-3") == block(3)
+    recovered.close()
+
+def test_recovery_replays_the_log_tail_after_a_snapshot(tmp_path):
+    storage = WalStorage(str(tmp_path), snapshot_every=2)
+    for balance in (100, 90, 80):
+        storage.save_account("user", "SBIN0001234", "m1", account(balance))
+    storage.save_account("user", "SBIN0001234", "m1", account(80, pin="9999"))
+    storage.close()
+    assert storage.generation > 0
+    with open(storage._log_path(storage.generation + 1), "ab") as f:
+        f.write(b'["A","user"')
+    recovered = WalStorage(str(tmp_path), snapshot_every=2)
+    assert accounts(recovered) == {"m1": account(80, pin="9999")}
+    recovered.close()
+
+def test_write_inside_sync_interval_is_fsynced_when_the_interval_ends(tmp_path, monkeypatch):
+    synced = []
+    fsync = os.fsync
+    monkeypatch.setattr(os, "fsync", lambda fd: (synced.append(fd), fsync(fd)))
+    storage = WalStorage(str(tmp_path), sync_interval=0.2)
+    storage.save_account("user", "SBIN0001234", "m1", account(100))
+    assert synced == [storage.log.fileno()]
+    # Inside the interval: flushed, not yet fsynced, and no further write follows
+    storage.save_account("user", "SBIN0001234", "m1", account(90))
+    storage.insert_blocks([block(1)])
+    assert len(synced) == 1
+    deadline = time.monotonic() + 5
+    while len(synced) < 3 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert sorted(synced[1:]) == sorted([storage.log.fileno(), storage.ledger.fileno()])
+    storage.close()
+
+def test_close_fsyncs_writes_still_inside_the_interval(tmp_path, monkeypatch):
+    synced = []
+    monkeypatch.setattr(os, "fsync", synced.append)
+    storage = WalStorage(str(tmp_path), sync_interval=60)
+    storage.save_account("user", "SBIN0001234", "m1", account(100))
+    storage.save_account("user", "SBIN0001234", "m1", account(90))
+    log_fd = storage.log.fileno()
+    assert synced == [log_fd]
+    storage.close()
+    assert synced == [log_fd, log_fd]
+    assert storage.sync_timer is None
@@ -1,29 +1,16 @@
+from speck import cipher_for
+
 class User:
     def __init__(self, name, bank):
         self.Name = name
         self.bank = bank
         self.Accounts = []
         self.speck_key = 0x1918111009080100
-
-    def _speck_encrypt(self, plaintext, key):
-        x = (plaintext >> 16) & 0xFFFF
-        y = plaintext & 0xFFFF
-        k = [key & 0xFFFF, (key >> 16) & 0xFFFF, (key >> 32) & 0xFFFF, (key >> 48) & 0xFFFF]
-        for i in range(22):
-            x = (x >> 7 | x << 9) & 0xFFFF
-            x = (x + y) & 0xFFFF
-            x = x ^ k[i % 4]
-            y = (y << 2 | y >> 14) & 0xFFFF
-            y = y ^ x
-        return (x << 16) | y
+        self.cipher = cipher_for(self.speck_key)
 
     def encrypt_data(self, data):
         data_int = int(data)  # Convert string to integer directly
-        block1 = (data_int >> 32) & 0xFFFFFFFF
-        block2 = data_int & 0xFFFFFFFF
-        enc_block1 = self._speck_encrypt(block1, self.speck_key)
-        enc_block2 = self._speck_encrypt(block2, self.speck_key)
-        return format((enc_block1 << 32) | enc_block2, '016x')
+        return format(self.cipher.encrypt64(data_int), '016x')
 
     def create_account(self, ifsc, password, pin, mobile_number, initial_balance=0):
         for mmid in self.Accounts:
@@ -1,27 +1,38 @@
+import os
 import socket
-import json
 import random
 from math import gcd
+import framing
+from framing import ConnectionClosed
+from key_cache import default_cache
+from order_finding import find_order
+from rsa_keygen import client_public_key
+from shor_runner import run_shor
+
+BANK_ADDRESS = (os.environ.get("BANK_HOST", "172.16.122.54"), int(os.environ.get("BANK_PORT", 5000)))  # Bank's IP
+MACHINE_ADDRESS = (os.environ.get("MACHINE_HOST", "172.16.122.54"), int(os.environ.get("MACHINE_PORT", 5001)))  # Machine IP
+PUBLIC_KEY = client_public_key()  # the bank's key: RSA_PUBLIC_KEY, or the demo key p=127,q=257,n=32639
+SHOR_MAX_BITS = 40  # larger moduli are out of reach of the classical Shor simulation
 
 def connect_to_bank():
     client = socket.socket()
-    client.connect(('172.16.122.54', 5000))  # Bank's IP
+    client.connect(BANK_ADDRESS)
+    framing.negotiate(client)
     return client
 
 def connect_to_machine():
     client = socket.socket()
-    client.connect(('172.16.122.54', 5001))  # Machine IP
+    client.connect(MACHINE_ADDRESS)
+    framing.negotiate(client)
     return client
 
 def send_request(client, request):
-    client.send(json.dumps(request).encode('utf-8'))
-    response = client.recv(1024).decode('utf-8')
-    if not response:
-        raise Exception("Received empty response from server")
     try:
-        return json.loads(response)
-    except json.JSONDecodeError as e:
-        print(f"Error decoding response: {response}")
+        return framing.send_request(client, request)
+    except ConnectionClosed:
+        raise Exception("Received empty response from server")
+    except ValueError as e:
+        print(f"Error decoding response: {e}")
         raise Exception(f"Invalid JSON response: {e}")
 
 def register_user():
@@ -54,7 +65,7 @@ def encrypt(msg, pub_key):
     return [pow(ord(char), e, n) for char in msg]
 
 def trans():
-    public_key = (353, 32639)  # p=127,q=257,n=32639
+    public_key = PUBLIC_KEY
     client = connect_to_machine()
     mmid = input("Enter user's MMID: ")
     pin = input("Enter user's pin: ")
@@ -91,20 +102,18 @@ def modular_exponentiation(base, exponent, modulus):
         exponent >>= 1
     return result
 
-def find_period(a, N):
-    for r in range(1, N):
-        if modular_exponentiation(a, r, N) == 1:
-            return r
-    return None
+def find_period(a, N, method="scan"):
+    # method: "scan" (multiply by a until 1) or "bsgs" (baby-step giant-step), see order_finding
+    return find_order(a, N, method)
 
-def shors_algorithm(N):
+def shors_algorithm(N, order_method="scan"):
     if N % 2 == 0:
         return 2, N // 2
     a = random.randrange(2, N)
     d = gcd(a, N)
     if d > 1:
         return d, N // d
-    r = find_period(a, N)
+    r = find_period(a, N, order_method)
     if r and r % 2 == 0:
         r_half = r // 2
         if modular_exponentiation(a, r_half, N) != N - 1:
@@ -131,40 +140,50 @@ def decrypt(cipher, priv_key):
     d, n = priv_key
     return ''.join([chr(pow(char, d, n)) for char in cipher])
 
-def attacker(ciphertext1, ciphertext2):
-    public_key = (353, 32639)
+def attacker(ciphertext1, ciphertext2, order_method="scan"):
+    public_key = PUBLIC_KEY
     print(f"Encrypted MMID: {ciphertext1}")
     print(f"Encrypted Pin: {ciphertext2}")
+    # Keys the attacker has already broken (see key_cache.default_cache)
+    key_cache = default_cache()
+    if public_key[1].bit_length() > SHOR_MAX_BITS and key_cache.get(*public_key) is None:
+        print(f"A {public_key[1].bit_length()}-bit modulus is beyond the Shor simulation")
+        return
+    def factor(n):
+        # Many bases at once on all cores, instead of one random base that may have an odd period
+        stats = run_shor(n, order_method=order_method)
+        print(f"Tried {stats['attempts']} bases on {stats['workers']} processes in {stats['wall_s'] * 1000:.1f} ms")
+        return stats['factors']
+
     try:
-        p, q = shors_algorithm(public_key[1])
-        if p is None or q is None:
+        # Only the first attack on a public key factors it; later ones reuse the cached private key
+        decryptor = key_cache.decryptor(*public_key, factor)
+        if decryptor is None:
             print("Failed to factorize modulus")
             return
-        phi = (p - 1) * (q - 1)
-        d = mod_inverse(public_key[0], phi)
-        key = (d, p * q)
-        decrypted1 = decrypt(ciphertext1, key)
-        decrypted2 = decrypt(ciphertext2, key)
+        decrypted1 = decryptor.decrypt(ciphertext1)
+        decrypted2 = decryptor.decrypt(ciphertext2)
         print(f"Decrypted MMID by the attacker: {decrypted1}\nDecrypted Pin by the attacker: {decrypted2}")
     except Exception as e:
         print(f"Attack failed: {e}")
 
-emmid = []
-epin = []
-while True:
-    func = int(input("Type 1 to register a user\nType 2 to pay a merchant\nType 3 to show vulnerabilities in the encryption using Shor's\nType 4 to exit: "))
-    if func == 1:
-        register_user()
-    elif func == 2:
-        result = trans()
-        if result:
-            emmid, epin = result
-    elif func == 3:
-        if emmid and epin:
-            attacker(emmid, epin)
+if __name__ == "__main__":
+    emmid = []
+    epin = []
+    while True:
+        func = int(input("Type 1 to register a user\nType 2 to pay a merchant\nType 3 to show vulnerabilities in the encryption using Shor's\nType 4 to exit: "))
+        if func == 1:
+            register_user()
+        elif func == 2:
+            result = trans()
+            if result:
+                emmid, epin = result
+        elif func == 3:
+            if emmid and epin:
+                attacker(emmid, epin)
+            else:
+                print("No transaction data available to attack")
+        elif func == 4:
+            break
         else:
-            print("No transaction data available to attack")
-    elif func == 4:
-        break
-    else:
-        print("Please enter 1, 2, 3, or 4\n")
\ No newline at end of file
+            print("Please enter 1, 2, 3, or 4\n")
\ No newline at end of file
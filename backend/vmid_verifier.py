@@ -0,0 +1,105 @@
+import threading
+import time
+from datetime import datetime
+from speck import SPECK_KEY, cipher_for
+
+def vmid_timestamp(second):
+    # The clock format VMIDs are built from (local time, like machine_socket.encrypt_mid)
+    return datetime.fromtimestamp(second).strftime("%Y%m%d%H%M%S")
+
+class VmidVerifier:
+    """
+    Resolves a VMID to its merchant without knowing when the QR code was made.
+    A VMID is Speck(MID xor timestamp) for a timestamp in seconds, so for every
+    registered merchant and every second from window seconds ago to skew
+    seconds ahead the verifier keeps the VMID it would produce. Verifying is
+    then one dict lookup. The table moves forward one second at a time, adding
+    the VMIDs of the new second in one batch per second; it holds
+    merchants x (window + skew + 1) entries. Nothing here is per-session, so
+    any node with the merchant list accepts the same QR codes. It follows that
+    a VMID can be used more than once until it leaves the window.
+    """
+
+    def __init__(self, mids=(), window=120, skew=5, cipher=None):
+        self.window = window
+        self.skew = skew
+        self.cipher = cipher or cipher_for(SPECK_KEY)
+        self.mids = {}  # mid -> int value
+        self.table = {}  # vmid int -> (mid, timestamp)
+        self.seconds = {}  # epoch second -> [vmid ints added for it]
+        self.first = None  # oldest and newest second in the table
+        self.last = None
+        self.lock = threading.Lock()
+        for mid in mids:
+            try:
+                self.add_merchant(mid)
+            except ValueError:
+                pass  # not a hex MID, so no QR code can name it
+
+    def _add_second(self, second, mids):
+        timestamp = vmid_timestamp(second)
+        offset = int(timestamp)
+        vmids = self.cipher.encrypt64_many([(value ^ offset) & 0xFFFFFFFFFFFFFFFF for value in mids.values()])
+        added = self.seconds.setdefault(second, [])
+        for mid, vmid in zip(mids, vmids):
+            vmid = int(vmid)
+            self.table.setdefault(vmid, (mid, timestamp))
+            added.append(vmid)
+
+    def _drop_second(self, second):
+        for vmid in self.seconds.pop(second, ()):
+            self.table.pop(vmid, None)
+
+    def _advance(self, now):
+        low, high = int(now) - self.window, int(now) + self.skew
+        if self.first is None or low > self.last or high < self.first:
+            # First use, or the clock jumped past the whole window: start over
+            self.table.clear()
+            self.seconds.clear()
+            for second in range(low, high + 1):
+                self._add_second(second, self.mids)
+        else:
+            # Usually one new second at the top and one old one at the bottom; a clock
+            # that stepped back a little is handled by the same range arithmetic
+            for second in list(range(self.first, min(low, self.last + 1))) + list(range(max(high + 1, self.first), self.last + 1)):
+                self._drop_second(second)
+            for second in list(range(low, min(self.first, high + 1))) + list(range(max(self.last + 1, low), high + 1)):
+                self._add_second(second, self.mids)
+        self.first, self.last = low, high
+
+    def add_merchant(self, mid):
+        value = int(mid, 16)
+        with self.lock:
+            if mid in self.mids:
+                return
+            self.mids[mid] = value
+            if self.first is None:
+                return
+            # Every second already in the window, in one batch for this merchant
+            seconds = range(self.first, self.last + 1)
+            timestamps = [vmid_timestamp(second) for second in seconds]
+            vmids = self.cipher.encrypt64_many([(value ^ int(ts)) & 0xFFFFFFFFFFFFFFFF for ts in timestamps])
+            for second, timestamp, vmid in zip(seconds, timestamps, vmids):
+                vmid = int(vmid)
+                self.table.setdefault(vmid, (mid, timestamp))
+                self.seconds[second].append(vmid)
+
+    def remove_merchant(self, mid):
+        with self.lock:
+            if self.mids.pop(mid, None) is None:
+                return
+            stale = {vmid for vmid, (owner, _) in self.table.items() if owner == mid}
+            for vmid in stale:
+                del self.table[vmid]
+            for second, vmids in self.seconds.items():
+                self.seconds[second] = [vmid for vmid in vmids if vmid not in stale]
+
+    def verify(self, vmid, now=None):
+        # Returns (mid, timestamp) for a VMID made within the window, else (None, None)
+        try:
+            value = int(vmid, 16)
+        except (TypeError, ValueError):
+            return None, None
+        with self.lock:
+            self._advance(time.time() if now is None else now)
+            return self.table.get(value, (None, None))
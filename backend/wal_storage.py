@@ -0,0 +1,265 @@
+import json
+import os
+import threading
+import time
+
+class WalStorage:
+    """
+    Local durable bank storage without a database server.
+
+    Account changes are appended to a write-ahead log: a change that only moves
+    the balance is logged as a compact delta record, anything else as the full
+    document. Every snapshot_every records the in-memory account maps are
+    written to a snapshot and the log is rotated, so recovery reads one
+    snapshot plus a short log tail. Blocks go to an append-only ledger file;
+    the block ID to file offset index used for paging is built on first use.
+    Each write call is fsynced once, which batches naturally with the bank's
+    group-commit mode. With sync_interval set, fsyncs run at most that often: a
+    write inside the interval is fsynced by a timer when the interval ends, so
+    no write stays unsynced longer than sync_interval seconds.
+    Block IDs are SHA-256 digests and are not re-checked for uniqueness here.
+    """
+
+    def __init__(self, data_dir="bank_data", snapshot_every=10000, sync_interval=0):
+        self.data_dir = data_dir
+        self.snapshot_every = snapshot_every
+        self.sync_interval = sync_interval
+        self.accounts = {}  # (kind, ifsc) -> {key: doc}
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.records_since_snapshot = 0
+        self.last_sync = 0.0
+        self.unsynced = set()  # files flushed but not fsynced, waiting for sync_timer
+        self.sync_timer = None
+        self.tip = None  # {"_id", "Timestamp"} of the last block
+        self.block_offsets = None  # _id -> byte offset in the ledger
+        os.makedirs(data_dir, exist_ok=True)
+        self.snapshot_path = os.path.join(data_dir, "snapshot.json")
+        self.ledger_path = os.path.join(data_dir, "blocks.jsonl")
+        self._recover()
+        self.log = open(self._log_path(self.generation + 1), "ab")
+        self.ledger = open(self.ledger_path, "ab")
+        self.ledger_size = self.ledger.tell()
+
+    def _log_path(self, generation):
+        return os.path.join(self.data_dir, f"wal-{generation}.log")
+
+    def _log_generations(self):
+        generations = []
+        for name in os.listdir(self.data_dir):
+            if name.startswith("wal-") and name.endswith(".log"):
+                generations.append(int(name[4:-4]))
+        return sorted(generations)
+
+    def _read_records(self, path, offset=0):
+        # Yields parsed lines; a torn last line from a crash is cut off the file
+        with open(path, "rb+") as f:
+            f.seek(offset)
+            while True:
+                start = f.tell()
+                line = f.readline()
+                if not line:
+                    return
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("incomplete record")
+                    record = json.loads(line)
+                except ValueError:
+                    print(f"WAL: truncating torn record in {path} at byte {start}")
+                    f.truncate(start)
+                    return
+                yield record
+
+    def _recover(self):
+        ledger_offset = 0
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path) as f:
+                snapshot = json.load(f)
+            self.generation = snapshot["generation"]
+            self.tip = snapshot["tip"]
+            ledger_offset = snapshot["ledger_offset"]
+            for kind, ifsc, key, doc in snapshot["accounts"]:
+                self.accounts.setdefault((kind, ifsc), {})[key] = doc
+        for generation in self._log_generations():
+            if generation <= self.generation:
+                continue
+            for record in self._read_records(self._log_path(generation)):
+                self._apply(record)
+                self.records_since_snapshot += 1
+        if os.path.exists(self.ledger_path):
+            for block in self._read_records(self.ledger_path, ledger_offset):
+                self.tip = {"_id": block["_id"], "Timestamp": block["Timestamp"]}
+
+    def _apply(self, record):
+        op, kind, ifsc, key, value = record
+        doc = self.accounts.setdefault((kind, ifsc), {}).setdefault(key, {})
+        if op == "B":
+            doc["Balance"] += value
+        else:
+            doc.update(value)
+
+    def _record_for(self, kind, ifsc, key, data):
+        current = self.accounts.get((kind, ifsc), {}).get(key)
+        if current is not None and "Balance" in current and "Balance" in data and all(
+                current.get(field) == value for field, value in data.items() if field != "Balance"):
+            delta = data["Balance"] - current["Balance"]
+            return ["B", kind, ifsc, key, delta] if delta else None
+        return ["A", kind, ifsc, key, dict(data)]
+
+    def _sync(self, f):
+        # Caller holds self.lock
+        f.flush()
+        now = time.monotonic()
+        if self.sync_interval and now - self.last_sync < self.sync_interval:
+            self.unsynced.add(f)
+            if self.sync_timer is None:
+                self.sync_timer = threading.Timer(self.last_sync + self.sync_interval - now, self._sync_deferred)
+                self.sync_timer.daemon = True
+                self.sync_timer.start()
+            return
+        os.fsync(f.fileno())
+        self.unsynced.discard(f)
+        self.last_sync = now
+
+    def _sync_deferred(self):
+        with self.lock:
+            self.sync_timer = None
+            self._sync_pending()
+
+    def _sync_pending(self):
+        # Caller holds self.lock
+        if self.sync_timer is not None:
+            self.sync_timer.cancel()
+            self.sync_timer = None
+        for f in self.unsynced:
+            if not f.closed:
+                os.fsync(f.fileno())
+        self.unsynced.clear()
+        self.last_sync = time.monotonic()
+
+    def _write_accounts(self, updates):
+        lines = []
+        for kind, ifsc, key, data in updates:
+            record = self._record_for(kind, ifsc, key, data)
+            if record is None:
+                continue
+            self._apply(record)
+            lines.append(json.dumps(record, separators=(",", ":")).encode() + b"\n")
+        if not lines:
+            return
+        self.log.write(b"".join(lines))
+        self._sync(self.log)
+        self.records_since_snapshot += len(lines)
+        if self.records_since_snapshot >= self.snapshot_every:
+            self._snapshot()
+
+    def _snapshot(self):
+        # The snapshot covers every log up to the current one, which is then rotated out
+        self._sync_pending()  # ledger_offset below must not point past fsynced blocks
+        self.log.close()
+        covered = self.generation + 1
+        snapshot = {
+            "generation": covered,
+            "tip": self.tip,
+            "ledger_offset": self.ledger_size,
+            "accounts": [[kind, ifsc, key, doc] for (kind, ifsc), docs in self.accounts.items()
+                         for key, doc in docs.items()]
+        }
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(snapshot, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        self.generation = covered
+        for generation in self._log_generations():
+            if generation <= covered:
+                os.remove(self._log_path(generation))
+        self.log = open(self._log_path(covered + 1), "ab")
+        self.records_since_snapshot = 0
+        print(f"WAL: snapshot {covered} written")
+
+    def snapshot(self):
+        with self.lock:
+            self._snapshot()
+
+    def load_accounts(self, kind, ifsc):
+        with self.lock:
+            docs = [(key, dict(doc)) for key, doc in self.accounts.get((kind, ifsc), {}).items()]
+        return iter(docs)
+
+    def save_account(self, kind, ifsc, key, data):
+        with self.lock:
+            self._write_accounts([(kind, ifsc, key, data)])
+
+    def save_accounts(self, updates):
+        with self.lock:
+            self._write_accounts(updates)
+
+    def insert_blocks(self, blocks):
+        with self.lock:
+            lines = [json.dumps(block, separators=(",", ":")).encode() + b"\n" for block in blocks]
+            self.ledger.write(b"".join(lines))
+            self._sync(self.ledger)
+            if self.block_offsets is not None:
+                offset = self.ledger_size
+                for block, line in zip(blocks, lines):
+                    self.block_offsets[block["_id"]] = offset
+                    offset += len(line)
+            self.ledger_size = self.ledger.tell()
+            self.tip = {"_id": blocks[-1]["_id"], "Timestamp": blocks[-1]["Timestamp"]}
+
+    def _offsets(self):
+        with self.lock:
+            if self.block_offsets is None:
+                offsets = {}
+                with open(self.ledger_path, "rb") as f:
+                    while f.tell() < self.ledger_size:
+                        offset = f.tell()
+                        offsets[json.loads(f.readline())["_id"]] = offset
+                self.block_offsets = offsets
+            return self.block_offsets
+
+    def latest_block(self):
+        with self.lock:
+            return dict(self.tip) if self.tip is not None else None
+
+    def find_block(self, block_id):
+        offset = self._offsets().get(block_id)
+        if offset is None:
+            return None
+        with open(self.ledger_path, "rb") as f:
+            f.seek(offset)
+            return json.loads(f.readline())
+
+    def find_blocks(self, after=None, limit=0):
+        end = self.ledger_size  # blocks written after this call started are not yielded
+        count = 0
+        with open(self.ledger_path, "rb") as f:
+            if after is not None:
+                f.seek(self._offsets()[after["_id"]])
+                f.readline()
+            while f.tell() < end and (not limit or count < limit):
+                yield json.loads(f.readline())
+                count += 1
+
+    def close(self):
+        with self.lock:
+            self._sync_pending()
+            self.log.close()
+            self.ledger.close()
+
+    def drop(self):
+        with self.lock:
+            if self.sync_timer is not None:
+                self.sync_timer.cancel()
+                self.sync_timer = None
+            self.unsynced.clear()
+            self.log.close()
+            self.ledger.close()
+            for name in os.listdir(self.data_dir):
+                os.remove(os.path.join(self.data_dir, name))
+            os.rmdir(self.data_dir)
+            self.accounts.clear()
+            self.tip = None
+            self.block_offsets = None